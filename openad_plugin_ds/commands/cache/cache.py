@@ -0,0 +1,74 @@
+import os
+import pandas as pd
+
+# OpenAD
+from openad.app.global_var_lib import GLOBAL_SETTINGS
+
+# OpenAD tools
+from openad_tools.helpers import pretty_nr
+from openad_tools.output import output_text, output_table, output_success
+
+# Plugin
+from openad_plugin_ds.plugin_settings import get_setting
+from openad_plugin_ds.plugin_result_cache import get_result_cache
+
+
+def cache_stats(cmd_pointer, cmd: dict):
+    """
+    Display statistics for the result cache of the current workspace.
+
+    Parameters
+    ----------
+    cmd_pointer : object
+        The command pointer object.
+    cmd : dict
+        The command dictionary.
+    """
+
+    stats = get_result_cache(cmd_pointer).stats()
+    df = pd.DataFrame(
+        [
+            {"Query Type": query_type, "Entries": entries, "Size (kB)": round(size / 1024, 1)}
+            for query_type, entries, size in stats["per_type"]
+        ],
+        columns=["Query Type", "Entries", "Size (kB)"],
+    )
+
+    # Return data for API
+    if GLOBAL_SETTINGS["display"] == "api":
+        return df
+
+    # Display results in CLI & Notebook
+    ttl = get_setting("result_cache_ttl")
+    output_text(
+        "\n".join(
+            [
+                "<h1>Deep Search Result Cache</h1>",
+                f"<yellow>Location  </yellow> {os.path.relpath(stats['path'], cmd_pointer.workspace_path())}",
+                f"<yellow>Entries   </yellow> {pretty_nr(stats['entries'])}",
+                f"<yellow>Size      </yellow> {round(stats['size'] / 1024 / 1024, 2)} / {get_setting('result_cache_max_mb')} MB",
+                f"<yellow>Expiry    </yellow> {f'{round(ttl / 3600, 1)} hours' if ttl > 0 else 'Disabled'}",
+                f"<yellow>Session   </yellow> {stats['hits']} hits / {stats['misses']} misses",
+            ]
+        ),
+        return_val=False,
+        pad=1,
+    )
+    if not df.empty:
+        output_table(df, is_data=False, return_val=False)
+
+
+def cache_clear(cmd_pointer, cmd: dict):
+    """
+    Clear the result cache of the current workspace.
+
+    Parameters
+    ----------
+    cmd_pointer : object
+        The command pointer object.
+    cmd : dict
+        The command dictionary.
+    """
+
+    count = get_result_cache(cmd_pointer).clear()
+    output_success(f"The Deep Search result cache was cleared, {count} cached results were removed", return_val=False)
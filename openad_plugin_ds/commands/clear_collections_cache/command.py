@@ -0,0 +1,53 @@
+import os
+import pyparsing as py
+
+# OpenAD
+from openad.core.help import help_dict_create_v2
+
+# Plugin
+from openad_plugin_ds.plugin_grammar_def import clear, collections, cache
+from openad_plugin_ds.plugin_params import PLUGIN_NAME, PLUGIN_KEY, PLUGIN_NAMESPACE
+
+
+class PluginCommand:
+    """Clear collections cache"""
+
+    category: str  # Category of command
+    index: int  # Order in help
+    name: str  # Name of command = command dir name
+    parser_id: str  # Internal unique identifier
+
+    def __init__(self):
+        self.category = "System"
+        self.index = 1
+        self.name = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+        self.parser_id = f"plugin_{PLUGIN_KEY}_{self.name}"
+
+    def add_grammar(self, statements: list, grammar_help: list):
+        """Create the command definition & documentation"""
+
+        # Command definition
+        statements.append(
+            py.Forward(py.CaselessKeyword(PLUGIN_NAMESPACE) + clear + collections + cache)(self.parser_id)
+        )
+
+        # Command help
+        grammar_help.append(
+            help_dict_create_v2(
+                plugin_name=PLUGIN_NAME,
+                plugin_namespace=PLUGIN_NAMESPACE,
+                category=self.category,
+                command=f"""{PLUGIN_NAMESPACE} clear collections cache""",
+                description_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "description.txt"),
+            )
+        )
+
+    def exec_command(self, cmd_pointer, parser):
+        """Execute the command"""
+
+        # Lazy imports: only loaded when the command is run for the first time
+        from openad_tools.output import output_success
+        from openad_plugin_ds.plugin_catalog import clear_catalog_cache
+
+        clear_catalog_cache()
+        output_success("The collections cache was cleared", return_val=False)
@@ -5,14 +5,12 @@ import pyparsing as py
 from openad.core.help import help_dict_create_v2
 
 # OpenAD tools
-from openad_tools.grammar_def import molecules, list_quoted, str_quoted, str_strict, clause_save_as
+from openad_tools.grammar_def import molecules, list_quoted, str_quoted, str_strict, clause_using, clause_save_as
 
 # Plugin
-from openad_plugin_ds.plugin_grammar_def import search_for, i_n, patents, f_rom, l_ist, file, dataframe
+from openad_plugin_ds.plugin_grammar_def import search_for, i_n, patents, f_rom, l_ist, file, dataframe, clause_stream
 from openad_plugin_ds.plugin_params import PLUGIN_NAME, PLUGIN_KEY, PLUGIN_NAMESPACE
-from openad_plugin_ds.commands.find_mols_in_patents.find_mols_in_patents import find_molecules_in_patents
 from openad_plugin_ds.commands.find_mols_in_patents.description import description
-from openad_plugin_ds.plugin_login import login
 
 
 class PluginCommand:
@@ -46,6 +44,8 @@ class PluginCommand:
                     | (file + str_quoted("filename"))
                     | (dataframe + str_strict("df_name"))
                 )
+                + clause_using
+                + clause_stream
                 + clause_save_as
             )(self.parser_id)
         )
@@ -57,9 +57,9 @@ class PluginCommand:
                 plugin_namespace=PLUGIN_NAMESPACE,
                 category=self.category,
                 command=[
-                    f"{PLUGIN_NAMESPACE} search for molecules in patents from file '<filename.csv>' [ save as '<filename.csv>' ]",
-                    f"{PLUGIN_NAMESPACE} search for molecules in patents from list ['<patent_id>','<patent_id>',...] [ save as '<filename.csv>' ]",
-                    f"{PLUGIN_NAMESPACE} search for molecules in patents from dataframe <dataframe_name> [ save as '<filename.csv>' ]",
+                    f"{PLUGIN_NAMESPACE} search for molecules in patents from file '<filename.csv>' [ USING (batch_size=<integer> max_concurrency=<integer> limit=<integer>) ] [ stream ] [ save as '<filename.csv>' ]",
+                    f"{PLUGIN_NAMESPACE} search for molecules in patents from list ['<patent_id>','<patent_id>',...] [ USING (batch_size=<integer> max_concurrency=<integer> limit=<integer>) ] [ stream ] [ save as '<filename.csv>' ]",
+                    f"{PLUGIN_NAMESPACE} search for molecules in patents from dataframe <dataframe_name> [ USING (batch_size=<integer> max_concurrency=<integer> limit=<integer>) ] [ stream ] [ save as '<filename.csv>' ]",
                 ],
                 description=description,
             )
@@ -68,9 +68,16 @@ class PluginCommand:
     def exec_command(self, cmd_pointer, parser):
         """Execute the command"""
 
-        # Login
-        login(cmd_pointer)
+        # Lazy imports: the implementation and the Deep Search toolkit
+        # are only loaded when the command is run for the first time
+        from openad_plugin_ds.plugin_login import login
+        from openad_plugin_ds.plugin_profile import profile_command, span
+        from openad_plugin_ds.commands.find_mols_in_patents.find_mols_in_patents import find_molecules_in_patents
 
-        # Execute
-        cmd = parser.as_dict()
-        return find_molecules_in_patents(cmd_pointer, cmd)
+        # Login & execute, recording a profile of the command for `ds profile last`
+        # Streamed results keep the profile open until their pages are consumed
+        with profile_command(self.name) as profile:
+            with span("login"):
+                login(cmd_pointer)
+            cmd = parser.as_dict()
+            return profile.stream(find_molecules_in_patents(cmd_pointer, cmd))
@@ -5,10 +5,33 @@ When sourcing patents from a CSV or dataframe, there must be a column named "pat
 
 To find patent IDs, run <cmd>ds find patents ?</cmd>
 
+The molecules mentioned in the patents are returned deduplicated, up to the limit set in the USING clause, with a <cmd>patent_ids</cmd> column listing the patents each molecule was found in.
+
+<h1>The USING clause</h1>
+
+<cmd>batch_size=<integer></cmd>
+    The number of patents sent per query, defaults to 1.
+    Larger batches mean fewer queries, but the <cmd>patent_ids</cmd> column will then list every patent of the batch a molecule was found in.
+
+<cmd>max_concurrency=<integer></cmd>
+    The number of queries running at the same time, defaults to 8.
+
+{CLAUSES['using_limit'](10)}
+    The limit applies to the merged molecules of all patents.
+
+<h1>Clauses</h1>
+
+{CLAUSES['stream']}
+    Streamed molecules are not deduplicated across batches: a molecule found in several batches
+    has one row per batch, with the <cmd>patent_ids</cmd> of that batch.
+
 {CLAUSES['save_as']}
 
 Examples:
 - <cmd>ds search for molecules in patents from list ['CN108473493B','US20190023713A1']</cmd>
 - <cmd>ds search for molecules in patents from file 'my_patents.csv'</cmd>
+- <cmd>ds search for molecules in patents from file 'my_patents.csv' USING (batch_size=10 max_concurrency=4)</cmd>
+- <cmd>ds search for molecules in patents from file 'my_patents.csv' USING (limit=0)</cmd>
+- <cmd>ds search for molecules in patents from file 'my_patents.csv' USING (limit=0) stream save as 'patent_mols.jsonl'</cmd>
 - <cmd>ds search for molecules in patents from dataframe my_patents_df</cmd> <soft>(Jupyter Notebook only)</soft>
 """
@@ -4,12 +4,12 @@ import pandas as pd
 from openad.app.global_var_lib import GLOBAL_SETTINGS
 
 # OpenAD tools
-from openad_tools.jupyter import save_df_as_csv, col_from_df, csv_to_df
+from openad_tools.jupyter import save_df_as_csv
+from openad_tools.pyparsing import parse_using_clause
 from openad_tools.output import output_error, output_table, output_success, output_warning
 
 
 from deepsearch.chemistry.queries import (
-    query_chemistry,
     CompoundsBySubstructure,
     CompoundsBySimilarity,
     CompoundsBySmarts,
@@ -19,17 +19,33 @@ from deepsearch.chemistry.queries import (
 )
 
 # Plugin
+from openad_plugin_ds.plugin_profile import span
 from openad_plugin_ds.plugin_msg import msg as plugin_msg
-from openad_plugin_ds.plugin_params import PLUGIN_KEY
+from openad_plugin_ds.plugin_login import get_api
+from openad_plugin_ds.plugin_retry import with_retry_budget
+from openad_plugin_ds.plugin_input import parse_input_list
+from openad_plugin_ds.plugin_settings import get_setting
+from openad_plugin_ds.plugin_concurrency import map_concurrent
+from openad_plugin_ds.plugin_export import stream_pages
+from openad_plugin_ds.plugin_chemistry import (
+    DEFAULT_LIMIT,
+    DEFAULT_PAGE_SIZE,
+    fetch_chemistry_results,
+    iter_chemistry_batch_pages,
+)
 
 # Deep Search
 from deepsearch.chemistry.queries.molecules import MoleculesInPatentsQuery
 
 
+@with_retry_budget
 def find_molecules_in_patents(cmd_pointer, cmd: dict):
     """
     Search for mentions of a given molecules in a list of patents.
 
+    The patent IDs are split into batches that are queried concurrently,
+    and every batch is paged through until all molecules are fetched.
+
     Parameters
     ----------
     cmd_pointer:
@@ -38,60 +54,97 @@ def find_molecules_in_patents(cmd_pointer, cmd: dict):
         Parser inputs from pyparsing as a dictionary
     """
 
+    # TQDM progress bar
+    # Note: needs to be imported inside function to recognize notebook display context
+    if GLOBAL_SETTINGS["display"] == "notebook":
+        from tqdm.notebook import tqdm
+    else:
+        from tqdm import tqdm
+
     # Define the DeepSearch API
-    api = cmd_pointer.login_settings["toolkits_api"][cmd_pointer.login_settings["toolkits"].index(PLUGIN_KEY)]
+    api = get_api(cmd_pointer)
 
     # Parse a list of patent ids from the input
-    patent_id_list = None
-    if "list" in cmd:
-        patent_id_list = cmd["list"]
-    elif "filename" in cmd or "df_name" in cmd:
-        try:
-            if "filename" in cmd:
-                df = csv_to_df(cmd_pointer, cmd["filename"])
-            else:
-                df = cmd_pointer.api_variables[cmd["df_name"]]
-
-            df.columns = df.columns.str.lower()
-            patent_id_list = col_from_df(df, "patent id")
-            if not patent_id_list:
-                patent_id_list = col_from_df(df, "publication_id")
-            if not patent_id_list:
-                patent_id_list = col_from_df(df, "application_id")
-            if not patent_id_list:
-                patent_id_list = col_from_df(df, "title")
-            if not patent_id_list:
-                patent_id_list = col_from_df(df, "patent_id")
-            if not patent_id_list:
-                patent_id_list = col_from_df(df, "patentid")
-            if not patent_id_list:
-                raise ValueError("No patent ID column found (patent id, patent_id, patentid)")
-            # raise FileNotFoundError("This is a test error")
-            # raise Exception("This is a test error")
-        except FileNotFoundError:
-            return output_error(plugin_msg("err_file_not_found", cmd["filename"]))
-        except Exception as err:  # pylint: disable=broad-exception-caught
-            src_type = "file" if "filename" in cmd else "dataframe"
-            return output_error([plugin_msg("err_no_patent_ids_found", src_type), err])
+    try:
+        patent_id_list = parse_input_list(
+            cmd_pointer,
+            cmd,
+            ["patent id", "publication_id", "application_id", "title", "patent_id", "patentid"],
+        )
+        # raise FileNotFoundError("This is a test error")
+        # raise Exception("This is a test error")
+    except FileNotFoundError:
+        return output_error(plugin_msg("err_file_not_found", cmd["filename"]))
+    except Exception as err:  # pylint: disable=broad-exception-caught
+        src_type = "file" if "filename" in cmd else "dataframe"
+        return output_error([plugin_msg("err_no_patent_ids_found", src_type), err])
 
     # Empty list
     if not patent_id_list:
         return
 
-    # Fetch results from API
-    try:
-        resp = query_chemistry(api, CompoundsIn(documents=DocumentsByIds(publication_ids=patent_id_list)), limit=20)
+    # Parse USING parameters
+    params = parse_using_clause(cmd.get("using"), allowed=["batch_size", "max_concurrency", "limit", "page_size"])
+    batch_size = max(1, int(params.get("batch_size", get_setting("patent_batch_size"))))
+    max_concurrency = int(params.get("max_concurrency", get_setting("max_concurrency")))
+    limit = int(params.get("limit", DEFAULT_LIMIT))
+    page_size = int(params.get("page_size", DEFAULT_PAGE_SIZE))
+    if page_size < 1:
+        return output_error(plugin_msg("err_invalid_page_size"))
+    if limit < 0:
+        return output_error(plugin_msg("err_invalid_limit"))
+
+    # Split the deduplicated patent IDs into batches
+    sorted_patent_ids = sorted(set(str(patent_id) for patent_id in patent_id_list))
+    batches = [sorted_patent_ids[i : i + batch_size] for i in range(0, len(sorted_patent_ids), batch_size)]
+
+    # Stream molecules page by page as they arrive, querying the batches concurrently
+    if "stream" in cmd:
+        pages = iter_chemistry_batch_pages(
+            cmd_pointer,
+            api,
+            batches,
+            lambda batch: CompoundsIn(documents=DocumentsByIds(publication_ids=batch)),
+            max_concurrency,
+            page_size=page_size,
+            max_results=limit,
+        )
+        return stream_pages(cmd_pointer, cmd, _batch_df_pages(pages, limit), GLOBAL_SETTINGS["display"] == "api")
+
+    def _fetch_batch(batch):
+        """
+        Fetch the molecules mentioned in a batch of patents, one page at a time.
+        Every batch fetches up to the limit, so the merged molecules reach it even when batches overlap.
+        """
+        query = CompoundsIn(documents=DocumentsByIds(publication_ids=batch))
+        return fetch_chemistry_results(cmd_pointer, api, query, batch, limit=limit, page_size=page_size)
+
+    # Fetch results from API, using tqdm to display a progress bar as the batches complete
+    results_per_batch = {}
+    errors = []
+    with tqdm(
+        total=len(batches),
+        bar_format="{l_bar}{bar}",
+        leave=False,
+        disable=GLOBAL_SETTINGS["display"] == "api" or len(batches) == 1,
+    ) as pbar:
+        for batch, rows, err in map_concurrent(_fetch_batch, batches, max_concurrency):
+            pbar.update(1)
+            if err:
+                errors.append((batch, err))
+            else:
+                results_per_batch[tuple(batch)] = rows
 
-        # raise Exception('This is a test error')
-    except Exception as err:  # pylint: disable=broad-except
-        return output_error(plugin_msg("err_deepsearch", err))
+    # Report failed batches without discarding the successful ones
+    for batch, err in errors:
+        output_error(plugin_msg("err_patent_batch_query", batch, err), return_val=False)
+    if len(errors) == len(batches):
+        return
 
-    # Compile results
-    results_table = []
-    for row_obj in resp:
-        row = row_obj.model_dump()
-        row.pop("persistent_id")
-        results_table.append(row)
+    # Merge & deduplicate molecules, keeping track of the patents they were found in
+    results_table = _merge_batches(batches, results_per_batch)
+    if limit > 0:
+        results_table = results_table[:limit]
 
     # List of patent IDs to print
     patent_list_output = "\n<reset>- " + "\n- ".join(patent_id_list) + "</reset>"
@@ -117,7 +170,8 @@ def find_molecules_in_patents(cmd_pointer, cmd: dict):
 
     # Display results in CLI & Notebook
     if GLOBAL_SETTINGS["display"] != "api":
-        output_table(df, return_val=False)
+        with span("render", rows=len(df)):
+            output_table(df, return_val=False)
 
     # Save results to file (prints success message)
     if "save_as" in cmd:
@@ -127,3 +181,42 @@ def find_molecules_in_patents(cmd_pointer, cmd: dict):
     # Return data for API
     if GLOBAL_SETTINGS["display"] == "api":
         return df
+
+
+def _merge_batches(batches: list, results_per_batch: dict) -> list:
+    """
+    Merge the molecules of all batches, deduplicated by InChIKey, in batch order.
+
+    Every molecule gets a 'patent_ids' column listing the patents it was found in.
+    When batches hold more than one patent, this lists all patents of the batches
+    the molecule was found in, as the API doesn't report the individual patent.
+    """
+    molecules = {}
+    for batch in batches:
+        for row in results_per_batch.get(tuple(batch), []):
+            key = row.get("inchikey") or row.get("smiles")
+            if key not in molecules:
+                molecules[key] = {**row, "patent_ids": []}
+            molecules[key]["patent_ids"].extend(batch)
+
+    for row in molecules.values():
+        row["patent_ids"] = ", ".join(dict.fromkeys(row["patent_ids"]))
+    return list(molecules.values())
+
+
+def _batch_df_pages(pages, limit: int):
+    """
+    Turn the pages of the batches into DataFrames with a 'patent_ids' column, reporting failed batches.
+    Molecules are not deduplicated across batches, and the pages stop once the limit is reached.
+    """
+    row_count = 0
+    for batch, rows, err in pages:
+        if err:
+            output_error(plugin_msg("err_patent_batch_query", batch, err), return_val=False)
+            continue
+        if limit > 0:
+            rows = rows[: limit - row_count]
+        row_count += len(rows)
+        yield pd.DataFrame([{**row, "patent_ids": ", ".join(batch)} for row in rows]).fillna("")
+        if limit > 0 and row_count >= limit:
+            return
@@ -5,15 +5,19 @@ import pyparsing as py
 from openad.core.help import help_dict_create_v2
 
 # Plugin
-from openad_tools.grammar_def import molecules, molecule_identifier, clause_save_as
-from openad_plugin_ds.plugin_grammar_def import search_for, similar, to
+from openad_tools.grammar_def import (
+    molecules,
+    molecule_identifier,
+    list_quoted,
+    str_quoted,
+    str_strict,
+    clause_using,
+    clause_save_as,
+)
+from openad_plugin_ds.plugin_grammar_def import search_for, similar, to, l_ist, file, dataframe, clause_stream
 from openad_plugin_ds.plugin_params import PLUGIN_NAME, PLUGIN_KEY, PLUGIN_NAMESPACE
-from openad_plugin_ds.commands.find_mols_similar.find_mols_similar import find_similar_molecules
 from openad_plugin_ds.commands.find_mols_similar.description import description
 
-# Login
-from openad_plugin_ds.plugin_login import login
-
 
 class PluginCommand:
     """Find molecules similar to..."""
@@ -40,7 +44,14 @@ class PluginCommand:
                 + molecules
                 + similar
                 + to
-                + molecule_identifier("smiles")
+                + (
+                    (l_ist + list_quoted("list"))
+                    | (file + str_quoted("filename"))
+                    | (dataframe + str_strict("df_name"))
+                    | molecule_identifier("smiles")
+                )
+                + clause_using
+                + clause_stream
                 + clause_save_as
             )(self.parser_id)
         )
@@ -71,7 +82,12 @@ class PluginCommand:
                 plugin_name=PLUGIN_NAME,
                 plugin_namespace=PLUGIN_NAMESPACE,
                 category=self.category,
-                command=f"{PLUGIN_NAMESPACE} search for molecules similar to <smiles> [ save as '<filename.csv>' ]",
+                command=[
+                    f"{PLUGIN_NAMESPACE} search for molecules similar to <smiles> [ USING (limit=<integer> page_size=<integer>) ] [ stream ] [ save as '<filename.csv>' ]",
+                    f"{PLUGIN_NAMESPACE} search for molecules similar to list ['<smiles>','<smiles>',...] [ USING (max_concurrency=<integer> limit=<integer>) ] [ stream ] [ save as '<filename.csv>' ]",
+                    f"{PLUGIN_NAMESPACE} search for molecules similar to file '<filename.csv>' [ USING (max_concurrency=<integer> limit=<integer>) ] [ stream ] [ save as '<filename.csv>' ]",
+                    f"{PLUGIN_NAMESPACE} search for molecules similar to dataframe <dataframe_name> [ USING (max_concurrency=<integer> limit=<integer>) ] [ stream ] [ save as '<filename.csv>' ]",
+                ],
                 description=description,
             )
         )
@@ -79,9 +95,16 @@ class PluginCommand:
     def exec_command(self, cmd_pointer, parser):
         """Execute the command"""
 
-        # Login
-        login(cmd_pointer)
+        # Lazy imports: the implementation and the Deep Search toolkit
+        # are only loaded when the command is run for the first time
+        from openad_plugin_ds.plugin_login import login
+        from openad_plugin_ds.plugin_profile import profile_command, span
+        from openad_plugin_ds.commands.find_mols_similar.find_mols_similar import find_similar_molecules
 
-        # Execute
-        cmd = parser.as_dict()
-        return find_similar_molecules(cmd_pointer, cmd)
+        # Login & execute, recording a profile of the command for `ds profile last`
+        # Streamed results keep the profile open until their pages are consumed
+        with profile_command(self.name) as profile:
+            with span("login"):
+                login(cmd_pointer)
+            cmd = parser.as_dict()
+            return profile.stream(find_similar_molecules(cmd_pointer, cmd))
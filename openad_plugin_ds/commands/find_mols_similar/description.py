@@ -2,6 +2,20 @@ from openad_plugin_ds.plugin_params import CLAUSES
 
 description = f"""Search for molecules that are similar to the provided molecule or substructure as provided in the <cmd><smiles></cmd>.
 
+To search for multiple molecules at once, provide a list of SMILES, or a CSV file or dataframe with a column named "smiles" (case insensitive). The SMILES are canonicalized and deduplicated, and the results are merged into one table with an <cmd>input_smiles</cmd> column. With the <cmd>stream</cmd> clause, the pages of all molecules are returned in the order they arrive.
+
+<h1>The USING clause</h1>
+
+{CLAUSES['using_limit'](10)}
+    When searching for multiple molecules, the limit applies to each molecule.
+
+<cmd>max_concurrency=<integer></cmd>
+    When searching for multiple molecules, the number of molecules queried at the same time, defaults to 8.
+
+<h1>Clauses</h1>
+
+{CLAUSES['stream']}
+
 {CLAUSES['save_as']}
 
 Examples:
@@ -9,4 +23,8 @@ Examples:
 - <cmd>ds search for molecules similar to 'C1(C(=C)C([O-])C1C)=O'</cmd>
 - <cmd>ds search for molecules similar to CC1CCC2C1C(=O)OC=C2C save as 'similar_mols'</cmd>
 - <cmd>ds search for molecules similar to CC1=CCC2CC1C2(C)C save as 'similar_mols.csv'</cmd>
+- <cmd>ds search for molecules similar to CC1=CCC2CC1C2(C)C USING (limit=0) stream save as 'similar_mols.jsonl'</cmd>
+- <cmd>ds search for molecules similar to list ['CC(=CCC/C(=C/CO)/C)C','CC1=CCC2CC1C2(C)C']</cmd>
+- <cmd>ds search for molecules similar to file 'my_mols.csv' USING (max_concurrency=4) save as 'similar_mols.csv'</cmd>
+- <cmd>ds search for molecules similar to dataframe my_mols_df</cmd> <soft>(Jupyter Notebook only)</soft>
 """
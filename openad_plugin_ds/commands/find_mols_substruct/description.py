@@ -2,9 +2,26 @@ from openad_plugin_ds.plugin_params import CLAUSES
 
 description = f"""Search for molecules by substructure, as defined by the <cmd><smiles></cmd>.
 
+To search for multiple molecules at once, provide a list of SMILES, or a CSV file or dataframe with a column named "smiles" (case insensitive). The SMILES are canonicalized and deduplicated, and the results are merged into one table with an <cmd>input_smiles</cmd> column. With the <cmd>stream</cmd> clause, the pages of all molecules are returned in the order they arrive.
+
+<h1>The USING clause</h1>
+
+{CLAUSES['using_limit'](10)}
+    When searching for multiple molecules, the limit applies to each molecule.
+
+<cmd>max_concurrency=<integer></cmd>
+    When searching for multiple molecules, the number of molecules queried at the same time, defaults to 8.
+
+<h1>Clauses</h1>
+
+{CLAUSES['stream']}
+
 {CLAUSES['save_as']}
 
 Examples:
 - <cmd>ds search for molecules with substructure C1(C(=C)C([O-])C1C)=O</cmd>
 - <cmd>ds search for molecules with substructure 'C1=CCCCC1' save as 'my_mol'</cmd>
+- <cmd>ds search for molecules with substructure 'C1=CCCCC1' USING (limit=500 page_size=50) stream save as 'my_mols.csv'</cmd>
+- <cmd>ds search for molecules with substructure list ['C1=CCCCC1','C1(C(=C)C([O-])C1C)=O']</cmd>
+- <cmd>ds search for molecules with substructure file 'my_mols.csv' USING (max_concurrency=4)</cmd>
 """
@@ -2,22 +2,36 @@ import pandas as pd
 
 # OpenAD
 from openad.app.global_var_lib import GLOBAL_SETTINGS
-from openad.smols.smol_functions import valid_smiles
+from openad.smols.smol_functions import canonicalize, valid_smiles
 
 # OpenAD tools
-from openad_tools.output import output_success, output_error, output_table
+from openad_tools.pyparsing import parse_using_clause
+from openad_tools.output import output_success, output_error, output_table, output_warning
 from openad_tools.jupyter import save_df_as_csv, jup_display_input_molecule
 
 # Plugin
-from openad_plugin_ds.plugin_params import PLUGIN_KEY
+from openad_plugin_ds.plugin_profile import span
+from openad_plugin_ds.plugin_login import get_api
+from openad_plugin_ds.plugin_retry import with_retry_budget
 from openad_plugin_ds.plugin_msg import msg as plugin_msg
+from openad_plugin_ds.plugin_input import parse_input_list
+from openad_plugin_ds.plugin_settings import get_setting
+from openad_plugin_ds.plugin_export import stream_pages
+from openad_plugin_ds.plugin_chemistry import (
+    DEFAULT_LIMIT,
+    DEFAULT_PAGE_SIZE,
+    iter_chemistry_pages,
+    fetch_chemistry_results,
+    run_chemistry_batch,
+    iter_chemistry_batch_pages,
+    canonicalize_smiles_list,
+)
 
 # Deep Search
 from deepsearch.chemistry.queries.molecules import MoleculeQuery
 from deepsearch.chemistry.queries.molecules import MolQueryType
 
 from deepsearch.chemistry.queries import (
-    query_chemistry,
     CompoundsBySubstructure,
     CompoundsBySimilarity,
     CompoundsBySmarts,
@@ -27,6 +41,7 @@ from deepsearch.chemistry.queries import (
 )
 
 
+@with_retry_budget
 def find_substructure_molecules(cmd_pointer, cmd: dict):
     """
     Search for molecules by substructure, as defined by a smiles string.
@@ -40,27 +55,44 @@ def find_substructure_molecules(cmd_pointer, cmd: dict):
     """
 
     # Define the DeepSearch API
-    api = cmd_pointer.login_settings["toolkits_api"][cmd_pointer.login_settings["toolkits"].index(PLUGIN_KEY)]
+    api = get_api(cmd_pointer)
+
+    # Parse USING parameters
+    params = parse_using_clause(cmd.get("using"), allowed=["limit", "page_size", "max_concurrency"])
+    limit = int(params.get("limit", DEFAULT_LIMIT))
+    page_size = int(params.get("page_size", DEFAULT_PAGE_SIZE))
+    if page_size < 1:
+        return output_error(plugin_msg("err_invalid_page_size"))
+    if limit < 0:
+        return output_error(plugin_msg("err_invalid_limit"))
+
+    # Batch mode: list, file or dataframe of SMILES
+    if "smiles" not in cmd:
+        return _find_substructure_molecules_batch(cmd_pointer, cmd, api, params, limit, page_size)
 
     # Parse identifier
     smiles = cmd["smiles"][0]
     if not valid_smiles(smiles):
         return output_error(plugin_msg("err_invalid_identifier"))
+    else:
+        canonical_smiles = canonicalize(smiles)
+
+    query = CompoundsBySubstructure(structure=canonical_smiles)
+
+    # Stream results page by page, without loading them all into memory
+    if "stream" in cmd:
+        pages = iter_chemistry_pages(cmd_pointer, api, query, canonical_smiles, page_size, max_results=limit)
+        df_pages = (pd.DataFrame(rows).fillna("") for rows in pages)
+        return stream_pages(cmd_pointer, cmd, df_pages, GLOBAL_SETTINGS["display"] == "api")
 
     # Fetch results from API
     try:
-        resp = query_chemistry(api, CompoundsBySubstructure(structure=smiles))
+        results_table = fetch_chemistry_results(
+            cmd_pointer, api, query, canonical_smiles, limit=limit, page_size=page_size
+        )
     except Exception as err:  # pylint: disable=broad-exception-caught
         return output_error(plugin_msg("err_deepsearch", err))
 
-    # Parse results
-    results_table = []
-
-    for row_obj in resp:
-        row = row_obj.model_dump()
-        row.pop("persistent_id")
-        results_table.append(row)
-
     # No results found
     if not results_table:
         return output_error(plugin_msg("err_no_substr_mols"))
@@ -70,6 +102,7 @@ def find_substructure_molecules(cmd_pointer, cmd: dict):
         [
             f"We found <yellow>{len(results_table)}</yellow> molecules that contain the provided substructure",
             f"Input: {smiles}",
+            f"Canonicalized Input: {canonical_smiles}",
         ],
         return_val=False,
         pad_top=1,
@@ -80,11 +113,12 @@ def find_substructure_molecules(cmd_pointer, cmd: dict):
 
     # Display image of the input molecule in Jupyter Notebook
     if GLOBAL_SETTINGS["display"] == "notebook":
-        jup_display_input_molecule(smiles, "smiles")
+        jup_display_input_molecule(canonical_smiles, "smiles")
 
     # Display results in CLI & Notebook
     if GLOBAL_SETTINGS["display"] != "api":
-        output_table(df, return_val=False)
+        with span("render", rows=len(df)):
+            output_table(df, return_val=False)
 
     # Save results to file (prints success message)
     if "save_as" in cmd:
@@ -94,3 +128,97 @@ def find_substructure_molecules(cmd_pointer, cmd: dict):
     # Return data for API
     if GLOBAL_SETTINGS["display"] == "api":
         return df
+
+
+def _find_substructure_molecules_batch(cmd_pointer, cmd: dict, api, params: dict, limit: int, page_size: int):
+    """
+    Run the search for a list of SMILES provided as a list, file or dataframe,
+    and return one merged results table with an 'input_smiles' column.
+    """
+
+    # Parse a list of SMILES from the input
+    try:
+        smiles_list = parse_input_list(cmd_pointer, cmd, ["smiles", "canonical_smiles", "input_smiles"])
+    except FileNotFoundError:
+        return output_error(plugin_msg("err_file_not_found", cmd["filename"]))
+    except Exception as err:  # pylint: disable=broad-exception-caught
+        src_type = "file" if "filename" in cmd else "dataframe"
+        return output_error([plugin_msg("err_no_smiles_found", src_type), err])
+
+    # Empty list
+    if not smiles_list:
+        return
+
+    max_concurrency = int(params.get("max_concurrency", get_setting("max_concurrency")))
+
+    # Stream results page by page as they arrive, querying the molecules concurrently
+    if "stream" in cmd:
+        canonical_list, invalid_smiles = canonicalize_smiles_list(smiles_list)
+        if invalid_smiles:
+            output_warning(plugin_msg("warn_invalid_smiles", invalid_smiles), return_val=False, pad_top=1)
+        pages = iter_chemistry_batch_pages(
+            cmd_pointer,
+            api,
+            canonical_list,
+            lambda smiles: CompoundsBySubstructure(structure=smiles),
+            max_concurrency,
+            page_size=page_size,
+            max_results=limit,
+        )
+        return stream_pages(cmd_pointer, cmd, _batch_df_pages(pages), GLOBAL_SETTINGS["display"] == "api")
+
+    # Fetch results from API
+    results_table, results_per_input, invalid_smiles, errors = run_chemistry_batch(
+        cmd_pointer,
+        api,
+        smiles_list,
+        lambda smiles: CompoundsBySubstructure(structure=smiles),
+        max_concurrency,
+        limit=limit,
+        page_size=page_size,
+    )
+
+    # Report invalid input & failed queries
+    if invalid_smiles:
+        output_warning(plugin_msg("warn_invalid_smiles", invalid_smiles), return_val=False, pad_top=1)
+    for canonical_smiles, err in errors:
+        output_error(plugin_msg("err_smiles_query", canonical_smiles, err), return_val=False)
+    if errors and not results_per_input:
+        return
+
+    # No results found
+    if not results_table:
+        return output_error(plugin_msg("err_no_substr_mols"))
+
+    # Success
+    output_success(
+        f"We found <yellow>{len(results_table)}</yellow> molecules that contain one of the {len(results_per_input)} provided substructures",
+        return_val=False,
+        pad_top=1,
+    )
+
+    df = pd.DataFrame(results_table)
+    df = df.fillna("")  # Replace NaN with empty string
+
+    # Display results in CLI & Notebook
+    if GLOBAL_SETTINGS["display"] != "api":
+        with span("render", rows=len(df)):
+            output_table(df, return_val=False)
+
+    # Save results to file (prints success message)
+    if "save_as" in cmd:
+        results_file = str(cmd["results_file"])
+        save_df_as_csv(cmd_pointer, df, results_file)
+
+    # Return data for API
+    if GLOBAL_SETTINGS["display"] == "api":
+        return df
+
+
+def _batch_df_pages(pages):
+    """Turn the pages of a batch search into DataFrames with an 'input_smiles' column, reporting failed queries"""
+    for canonical_smiles, rows, err in pages:
+        if err:
+            output_error(plugin_msg("err_smiles_query", canonical_smiles, err), return_val=False)
+            continue
+        yield pd.DataFrame([{"input_smiles": canonical_smiles, **row} for row in rows]).fillna("")
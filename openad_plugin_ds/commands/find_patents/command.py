@@ -5,15 +5,11 @@ import pyparsing as py
 from openad.core.help import help_dict_create_v2
 
 # Plugin
-from openad_tools.grammar_def import molecule_identifier, molecule, clause_save_as
-from openad_plugin_ds.plugin_grammar_def import search_for, patents, containing
+from openad_tools.grammar_def import molecule_identifier, molecule, clause_using, clause_save_as
+from openad_plugin_ds.plugin_grammar_def import search_for, patents, containing, clause_stream
 from openad_plugin_ds.plugin_params import PLUGIN_NAME, PLUGIN_KEY, PLUGIN_NAMESPACE
-from openad_plugin_ds.commands.find_patents.find_patents import find_patents_containing_molecule
 from openad_plugin_ds.commands.find_patents.description import description
 
-# Login
-from openad_plugin_ds.plugin_login import login
-
 
 class PluginCommand:
     """Find patents containing molecule..."""
@@ -41,6 +37,8 @@ class PluginCommand:
                 + containing
                 + molecule
                 + molecule_identifier("identifier")
+                + clause_using
+                + clause_stream
                 + clause_save_as
             )(self.parser_id)
         )
@@ -51,7 +49,7 @@ class PluginCommand:
                 plugin_name=PLUGIN_NAME,
                 plugin_namespace=PLUGIN_NAMESPACE,
                 category=self.category,
-                command=f"{PLUGIN_NAMESPACE} search for patents containing molecule <smiles>  [ save as '<filename.csv>' ]",
+                command=f"{PLUGIN_NAMESPACE} search for patents containing molecule <smiles> [ USING (limit=<integer> page_size=<integer>) ] [ stream ] [ save as '<filename.csv>' ]",
                 description=description,
             )
         )
@@ -59,9 +57,16 @@ class PluginCommand:
     def exec_command(self, cmd_pointer, parser):
         """Execute the command"""
 
-        # Login
-        login(cmd_pointer)
+        # Lazy imports: the implementation and the Deep Search toolkit
+        # are only loaded when the command is run for the first time
+        from openad_plugin_ds.plugin_login import login
+        from openad_plugin_ds.plugin_profile import profile_command, span
+        from openad_plugin_ds.commands.find_patents.find_patents import find_patents_containing_molecule
 
-        # Execute
-        cmd = parser.as_dict()
-        return find_patents_containing_molecule(cmd_pointer, cmd)
+        # Login & execute, recording a profile of the command for `ds profile last`
+        # Streamed results keep the profile open until their pages are consumed
+        with profile_command(self.name) as profile:
+            with span("login"):
+                login(cmd_pointer)
+            cmd = parser.as_dict()
+            return profile.stream(find_patents_containing_molecule(cmd_pointer, cmd))
@@ -2,9 +2,18 @@ from openad_plugin_ds.plugin_params import CLAUSES
 
 description = f"""Searches for patents that contain mentions of a given molecule. The queried molecule can be described by its SMILES.
 
+<h1>The USING clause</h1>
+
+{CLAUSES['using_limit'](20)}
+
+<h1>Clauses</h1>
+
+{CLAUSES['stream']}
+
 {CLAUSES['save_as']}
 
 Examples:
 - <cmd>ds search for patents containing molecule CC(C)(c1ccccn1)C(CC(=O)O)Nc1nc(-c2c[nH]c3ncc(Cl)cc23)c(C#N)cc1F</cmd>
 - <cmd>ds search for patents containing molecule 'CC(C)(c1ccccn1)C(CC(=O)O)Nc1nc(-c2c[nH]c3ncc(Cl)cc23)c(C#N)cc1F' save as 'patents'</cmd>
+- <cmd>ds search for patents containing molecule 'C1=CCCCC1' USING (limit=0) stream save as 'patents.jsonl'</cmd>
 """
@@ -6,16 +6,21 @@ from openad.smols.smol_cache import create_analysis_record, save_result
 from openad.smols.smol_functions import canonicalize, valid_smiles
 
 # OpenAD tools
+from openad_tools.pyparsing import parse_using_clause
 from openad_tools.jupyter import save_df_as_csv, jup_display_input_molecule
 from openad_tools.output import output_success, output_error, output_table
 
 # Plugin
+from openad_plugin_ds.plugin_profile import span
 from openad_plugin_ds.plugin_msg import msg as plugin_msg
 from openad_plugin_ds.plugin_params import PLUGIN_KEY
+from openad_plugin_ds.plugin_login import get_api
+from openad_plugin_ds.plugin_retry import with_retry_budget
+from openad_plugin_ds.plugin_export import stream_pages
+from openad_plugin_ds.plugin_chemistry import DEFAULT_PAGE_SIZE, iter_chemistry_pages, fetch_chemistry_results
 
 # Deep Search
 from deepsearch.chemistry.queries import (
-    query_chemistry,
     CompoundsBySubstructure,
     CompoundsBySimilarity,
     CompoundsBySmarts,
@@ -25,6 +30,7 @@ from deepsearch.chemistry.queries import (
 )
 
 
+@with_retry_budget
 def find_patents_containing_molecule(cmd_pointer, cmd: dict):
     """
     Searches for patents that contain mentions of a given molecule.
@@ -38,35 +44,44 @@ def find_patents_containing_molecule(cmd_pointer, cmd: dict):
     """
 
     # Define the DeepSearch API
-    api = cmd_pointer.login_settings["toolkits_api"][cmd_pointer.login_settings["toolkits"].index(PLUGIN_KEY)]
+    api = get_api(cmd_pointer)
 
     # Parse identifier
     identifier = cmd["identifier"][0]
 
     result_type = ""
-    resp = None
+
+    # Parse USING parameters
+    params = parse_using_clause(cmd.get("using"), allowed=["limit", "page_size"])
+    limit = int(params.get("limit", 20))
+    page_size = int(params.get("page_size", DEFAULT_PAGE_SIZE))
+    if page_size < 1:
+        return output_error(plugin_msg("err_invalid_page_size"))
+    if limit < 0:
+        return output_error(plugin_msg("err_invalid_limit"))
+
+    if not valid_smiles(identifier):
+        return output_error(plugin_msg("err_invalid_identifier"))
+    else:
+        canonical_smiles = canonicalize(identifier)
+    query = DocumentsHaving(compounds=CompoundsBySubstructure(structure=canonical_smiles))
+
+    # Stream results page by page, without loading them all into memory
+    if "stream" in cmd:
+        pages = iter_chemistry_pages(cmd_pointer, api, query, canonical_smiles, page_size, max_results=limit)
+        df_pages = (pd.DataFrame(rows).fillna("") for rows in pages)
+        return stream_pages(cmd_pointer, cmd, df_pages, GLOBAL_SETTINGS["display"] == "api")
 
     # Fetch results from API
     try:
-        if not valid_smiles(identifier):
-            return output_error(plugin_msg("err_invalid_identifier"))
-        else:
-            canonical_smiles = canonicalize(identifier)
-        resp = query_chemistry(
-            api, DocumentsHaving(compounds=CompoundsBySubstructure(structure=canonical_smiles)), limit=20
+        results_table = fetch_chemistry_results(
+            cmd_pointer, api, query, canonical_smiles, limit=limit, page_size=page_size
         )
         # raise Exception("This is a test error")
     except Exception as err:  # pylint: disable=broad-exception-caught
         output_error(plugin_msg("err_deepsearch", err), return_val=False)
         return
 
-    # Compile results
-    results_table = []
-    for row_obj in resp:
-        row = row_obj.model_dump()
-        row.pop("persistent_id")
-        results_table.append(row)
-
     # No results found
     # results_table = [] # Keep here for testing
     if not results_table:
@@ -100,7 +115,8 @@ def find_patents_containing_molecule(cmd_pointer, cmd: dict):
 
     # Display results in CLI & Notebook
     if GLOBAL_SETTINGS["display"] != "api":
-        output_table(df, return_val=False)
+        with span("render", rows=len(df)):
+            output_table(df, return_val=False)
 
     # Save results to file (prints success message)
     if "save_as" in cmd:
@@ -4,17 +4,12 @@ import pyparsing as py
 # OpenAD
 from openad.core.help import help_dict_create_v2
 
-
 # Plugin
 from openad_tools.grammar_def import clause_save_as
 from openad_plugin_ds.plugin_grammar_def import l_ist, a_ll, collections, details
 from openad_plugin_ds.plugin_params import PLUGIN_NAME, PLUGIN_KEY, PLUGIN_NAMESPACE
-from openad_plugin_ds.commands.list_all_collections.list_all_collections import list_all_collections
 from openad_plugin_ds.commands.list_all_collections.description import description
 
-# Login
-from openad_plugin_ds.plugin_login import login
-
 
 class PluginCommand:
     """List all collections..."""
@@ -77,9 +72,15 @@ class PluginCommand:
     def exec_command(self, cmd_pointer, parser):
         """Execute the command"""
 
-        # Login
-        login(cmd_pointer)
+        # Lazy imports: the implementation and the Deep Search toolkit
+        # are only loaded when the command is run for the first time
+        from openad_plugin_ds.plugin_login import login
+        from openad_plugin_ds.plugin_profile import profile_command, span
+        from openad_plugin_ds.commands.list_all_collections.list_all_collections import list_all_collections
 
-        # Execute
-        cmd = parser.as_dict()
-        return list_all_collections(cmd_pointer, cmd)
+        # Login & execute, recording a profile of the command for `ds profile last`
+        with profile_command(self.name):
+            with span("login"):
+                login(cmd_pointer)
+            cmd = parser.as_dict()
+            return list_all_collections(cmd_pointer, cmd)
@@ -1,7 +1,6 @@
 import pandas as pd
 from datetime import datetime
 
-
 # OpenAD
 from openad.app.global_var_lib import GLOBAL_SETTINGS
 
@@ -11,10 +10,14 @@ from openad_tools.helpers import pretty_nr, pretty_date
 from openad_tools.output import output_text, output_error, output_table
 
 # Plugin
+from openad_plugin_ds.plugin_profile import span
 from openad_plugin_ds.plugin_msg import msg as plugin_msg
-from openad_plugin_ds.plugin_params import PLUGIN_KEY
+from openad_plugin_ds.plugin_login import get_api
+from openad_plugin_ds.plugin_retry import with_retry_budget
+from openad_plugin_ds.plugin_catalog import get_catalog
 
 
+@with_retry_budget
 def list_all_collections(cmd_pointer, cmd: dict):
     """
     Display all collections.
@@ -28,12 +31,11 @@ def list_all_collections(cmd_pointer, cmd: dict):
     """
 
     # Define the DeepSearch API
-    api = cmd_pointer.login_settings["toolkits_api"][cmd_pointer.login_settings["toolkits"].index(PLUGIN_KEY)]
+    api = get_api(cmd_pointer)
 
     # Fetch list of collections
     try:
-        collections = api.elastic.list()
-        collections.sort(key=lambda c: c.name.lower())
+        collections = get_catalog(cmd_pointer, api).collections
         # raise Exception("This is a test error")
     except Exception as err:  # pylint: disable=broad-exception-caught
         return output_error(plugin_msg("err_deepsearch", err))
@@ -93,7 +95,8 @@ def list_all_collections(cmd_pointer, cmd: dict):
         df_print["Entries"] = df_print["Entries"].apply(pretty_nr)
 
         # Print table
-        output_table(df_print, return_val=False)
+        with span("render", rows=len(df_print)):
+            output_table(df_print, return_val=False)
 
         # Print command hints to see descriptions
         if "details" not in cmd:
@@ -8,12 +8,8 @@ from openad.core.help import help_dict_create_v2
 from openad_tools.grammar_def import clause_save_as
 from openad_plugin_ds.plugin_grammar_def import l_ist, a_ll, domains
 from openad_plugin_ds.plugin_params import PLUGIN_NAME, PLUGIN_KEY, PLUGIN_NAMESPACE
-from openad_plugin_ds.commands.list_all_domains.list_all_domains import list_all_domains
 from openad_plugin_ds.commands.list_all_domains.description import description
 
-# Login
-from openad_plugin_ds.plugin_login import login
-
 
 class PluginCommand:
     """List all domains..."""
@@ -49,10 +45,15 @@ class PluginCommand:
     def exec_command(self, cmd_pointer, parser):
         """Execute the command"""
 
-        # Login
-        login(cmd_pointer)
-
-        # Execute
-        cmd = parser.as_dict()
-        # print(cmd)
-        return list_all_domains(cmd_pointer, cmd)
+        # Lazy imports: the implementation and the Deep Search toolkit
+        # are only loaded when the command is run for the first time
+        from openad_plugin_ds.plugin_login import login
+        from openad_plugin_ds.plugin_profile import profile_command, span
+        from openad_plugin_ds.commands.list_all_domains.list_all_domains import list_all_domains
+
+        # Login & execute, recording a profile of the command for `ds profile last`
+        with profile_command(self.name):
+            with span("login"):
+                login(cmd_pointer)
+            cmd = parser.as_dict()
+            return list_all_domains(cmd_pointer, cmd)
@@ -8,10 +8,14 @@ from openad_tools.jupyter import save_df_as_csv
 from openad_tools.output import output_error, output_table
 
 # Plugin
+from openad_plugin_ds.plugin_profile import span
 from openad_plugin_ds.plugin_msg import msg as plugin_msg
-from openad_plugin_ds.plugin_params import PLUGIN_KEY
+from openad_plugin_ds.plugin_login import get_api
+from openad_plugin_ds.plugin_retry import with_retry_budget
+from openad_plugin_ds.plugin_catalog import get_catalog
 
 
+@with_retry_budget
 def list_all_domains(cmd_pointer, cmd: dict):
     """
     Display all available domains.
@@ -25,28 +29,20 @@ def list_all_domains(cmd_pointer, cmd: dict):
     """
 
     # Define the DeepSearch API
-    api = cmd_pointer.login_settings["toolkits_api"][cmd_pointer.login_settings["toolkits"].index(PLUGIN_KEY)]
+    api = get_api(cmd_pointer)
 
     # Fetch list of collections
     try:
-        collections = api.elastic.list()
-        collections.sort(key=lambda c: c.name.lower())
+        catalog = get_catalog(cmd_pointer, api)
         # raise Exception('This is a test error')
     except Exception as err:  # pylint: disable=broad-exception-caught
         return output_error(plugin_msg("err_deepsearch", err))
 
     # Compile results table
-    results_table = []
-    _domains = []
-    for c in collections:
-        for domain in c.metadata.domain:
-            if domain not in _domains:
-                _domains.append(domain)
-                results_table.append({"Domain": domain, "Collections": 1})
-            else:
-                for x in results_table:
-                    if x["Domain"] == domain:
-                        x["Collections"] = x["Collections"] + 1
+    results_table = [
+        {"Domain": domain, "Collections": len(domain_collections)}
+        for domain, domain_collections in catalog.by_domain.items()
+    ]
 
     # No results found
     # results_table = [] # Keep here for testing
@@ -58,7 +54,8 @@ def list_all_domains(cmd_pointer, cmd: dict):
 
     # Display results in CLI & Notebook
     if GLOBAL_SETTINGS["display"] != "api":
-        output_table(df, return_val=False)
+        with span("render", rows=len(df)):
+            output_table(df, return_val=False)
 
     # Save results to file (prints success message)
     if "save_as" in cmd:
@@ -8,12 +8,8 @@ from openad.core.help import help_dict_create_v2
 from openad_tools.grammar_def import str_quoted
 from openad_plugin_ds.plugin_grammar_def import l_ist, collection, details
 from openad_plugin_ds.plugin_params import PLUGIN_NAME, PLUGIN_KEY, PLUGIN_NAMESPACE
-from openad_plugin_ds.commands.list_collection_details.list_collection_details import list_collection_details
 from openad_plugin_ds.commands.list_collection_details.description import description
 
-# Login
-from openad_plugin_ds.plugin_login import login
-
 
 class PluginCommand:
     """List collection details..."""
@@ -71,9 +67,15 @@ class PluginCommand:
     def exec_command(self, cmd_pointer, parser):
         """Execute the command"""
 
-        # Login
-        login(cmd_pointer)
+        # Lazy imports: the implementation and the Deep Search toolkit
+        # are only loaded when the command is run for the first time
+        from openad_plugin_ds.plugin_login import login
+        from openad_plugin_ds.plugin_profile import profile_command, span
+        from openad_plugin_ds.commands.list_collection_details.list_collection_details import list_collection_details
 
-        # Execute
-        cmd = parser.as_dict()
-        return list_collection_details(cmd_pointer, cmd)
+        # Login & execute, recording a profile of the command for `ds profile last`
+        with profile_command(self.name):
+            with span("login"):
+                login(cmd_pointer)
+            cmd = parser.as_dict()
+            return list_collection_details(cmd_pointer, cmd)
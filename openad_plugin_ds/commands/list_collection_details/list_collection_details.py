@@ -10,9 +10,12 @@ from openad_tools.output import output_text, output_error
 
 # Plugin
 from openad_plugin_ds.plugin_msg import msg as plugin_msg
-from openad_plugin_ds.plugin_params import PLUGIN_KEY
+from openad_plugin_ds.plugin_login import get_api
+from openad_plugin_ds.plugin_retry import with_retry_budget
+from openad_plugin_ds.plugin_catalog import get_catalog
 
 
+@with_retry_budget
 def list_collection_details(cmd_pointer, cmd: dict):
     """
     Displays the details for a given collection.
@@ -26,24 +29,17 @@ def list_collection_details(cmd_pointer, cmd: dict):
     """
 
     # Define the DeepSearch API
-    api = cmd_pointer.login_settings["toolkits_api"][cmd_pointer.login_settings["toolkits"].index(PLUGIN_KEY)]
+    api = get_api(cmd_pointer)
 
     # Fetch all collections
     try:
-        collections = api.elastic.list()
+        catalog = get_catalog(cmd_pointer, api)
         # raise Exception("This is a test error")
     except Exception as err:  # pylint: disable=broad-exception-caught
         return output_error(plugin_msg("err_deepsearch", err))
 
     # Find specified collection
-    collection = None
-    for c in collections:
-        if cmd["collection"] == c.name:
-            collection = c
-            break
-        if cmd["collection"] == c.source.index_key:
-            collection = c
-            break
+    collection = catalog.find(cmd["collection"])
 
     # Error
     if not collection:
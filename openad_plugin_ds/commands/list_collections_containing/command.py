@@ -5,17 +5,11 @@ import pyparsing as py
 from openad.core.help import help_dict_create_v2
 
 # Plugin
-from openad_tools.grammar_def import str_quoted, clause_save_as
+from openad_tools.grammar_def import str_quoted, clause_using, clause_save_as
 from openad_plugin_ds.plugin_grammar_def import l_ist, collections, containing
 from openad_plugin_ds.plugin_params import PLUGIN_NAME, PLUGIN_KEY, PLUGIN_NAMESPACE
-from openad_plugin_ds.commands.list_collections_containing.list_collections_containing import (
-    list_collections_containing,
-)
 from openad_plugin_ds.commands.list_collections_containing.description import description
 
-# Login
-from openad_plugin_ds.plugin_login import login
-
 
 class PluginCommand:
     """List collections containing..."""
@@ -42,6 +36,7 @@ class PluginCommand:
                 + collections
                 + containing
                 + str_quoted("search_query")
+                + clause_using
                 + clause_save_as
             )(self.parser_id)
         )
@@ -72,7 +67,7 @@ class PluginCommand:
                 plugin_name=PLUGIN_NAME,
                 plugin_namespace=PLUGIN_NAMESPACE,
                 category=self.category,
-                command=f"""{PLUGIN_NAMESPACE} list collections containing '<search_query>' [ save as '<filename.csv>' ]""",
+                command=f"""{PLUGIN_NAMESPACE} list collections containing '<search_query>' [ USING (max_concurrency=<integer>) ] [ save as '<filename.csv>' ]""",
                 description=description,
             )
         )
@@ -80,9 +75,17 @@ class PluginCommand:
     def exec_command(self, cmd_pointer, parser):
         """Execute the command"""
 
-        # Login
-        login(cmd_pointer)
+        # Lazy imports: the implementation and the Deep Search toolkit
+        # are only loaded when the command is run for the first time
+        from openad_plugin_ds.plugin_login import login
+        from openad_plugin_ds.plugin_profile import profile_command, span
+        from openad_plugin_ds.commands.list_collections_containing.list_collections_containing import (
+            list_collections_containing,
+        )
 
-        # Execute
-        cmd = parser.as_dict()
-        return list_collections_containing(cmd_pointer, cmd)
+        # Login & execute, recording a profile of the command for `ds profile last`
+        with profile_command(self.name):
+            with span("login"):
+                login(cmd_pointer)
+            cmd = parser.as_dict()
+            return list_collections_containing(cmd_pointer, cmd)
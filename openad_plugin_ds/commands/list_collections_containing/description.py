@@ -8,10 +8,14 @@ When formulating a search query with more than one word, wrap your query in quot
 You can use the "Collection Key" from the returned table to formulate a next query into a specific collection.
 To learn more, run <cmd>ds search collection ?</cmd>.
 
+The collections are queried concurrently. Use <cmd>USING (max_concurrency=<integer>)</cmd> to set how many collections are queried at the same time, defaults to 8.
+A collection that fails to respond is reported separately, without interrupting the scan of the other collections.
+
 {CLAUSES["save_as"]}
 
 Examples:
 - <cmd>ds list collections containing 'Ibuprofen'</cmd>
 - <cmd>ds list collections containing '"blood-brain barrier"'</cmd>
 - <cmd>ds list collections containing 'main-text.text:("power conversion efficiency" OR PCE) AND organ*'</cmd>
+- <cmd>ds list collections containing 'Ibuprofen' USING (max_concurrency=4)</cmd>
 """
@@ -5,17 +5,24 @@ from openad.app.global_var_lib import GLOBAL_SETTINGS
 
 # OpenAD tools
 from openad_tools.jupyter import save_df_as_csv
+from openad_tools.pyparsing import parse_using_clause
 from openad_tools.output import output_error, output_table, output_success
 
 # Plugin
+from openad_plugin_ds.plugin_profile import span
 from openad_plugin_ds.plugin_msg import msg as plugin_msg
-from openad_plugin_ds.plugin_params import PLUGIN_KEY
+from openad_plugin_ds.plugin_login import get_api
+from openad_plugin_ds.plugin_retry import with_retry_budget, run_query
+from openad_plugin_ds.plugin_catalog import get_catalog
+from openad_plugin_ds.plugin_settings import get_setting
+from openad_plugin_ds.plugin_concurrency import map_concurrent
 
 # Deep Search
 from deepsearch.cps.queries import DataQuery
 from deepsearch.cps.client.components.queries import RunQueryError
 
 
+@with_retry_budget
 def list_collections_containing(cmd_pointer, cmd: dict):
     """
     Searches all collections for instances a given string.
@@ -35,65 +42,85 @@ def list_collections_containing(cmd_pointer, cmd: dict):
         from tqdm import tqdm
 
     # Define the DeepSearch API
-    api = cmd_pointer.login_settings["toolkits_api"][cmd_pointer.login_settings["toolkits"].index(PLUGIN_KEY)]
+    api = get_api(cmd_pointer)
 
     # Fetch list of collections
     try:
-        collections = api.elastic.list()
-        collections.sort(key=lambda c: c.name.lower())
+        collections = get_catalog(cmd_pointer, api).collections
         # raise Exception("This is a test error")
     except Exception as err:  # pylint: disable=broad-exception-caught
         return output_error(plugin_msg("err_deepsearch", err))
 
-    # Search all collections for the given string, using tqdm to display a progress bar.
+    # Parse USING parameters
+    params = parse_using_clause(cmd.get("using"), allowed=["max_concurrency"])
+    max_concurrency = int(params.get("max_concurrency", get_setting("max_concurrency")))
+
+    # Search only on document collections
+    doc_collections = [c for c in collections if c.metadata.type == "Document"]
+
+    def _count_matches(c):
+        """Execute the count query for a single collection"""
+        query = DataQuery(cmd["search_query"], source=[""], limit=0, coordinates=c.source)
+        query_results = run_query(api, query)
+
+        # For testing
+        # - - -
+        # raise RunQueryError(task_id=1, message="This is a test error", error_type="err123", detail="aaa")
+        # raise RunQueryError(
+        #     task_id=1,
+        #     message="This is a runtime test error with too_many_nested_clauses",
+        #     error_type="RuntimeError",
+        #     detail="",
+        # )
+
+        return int(query_results.outputs["data_count"])
+
+    # Search all collections for the given string concurrently,
+    # using tqdm to display a progress bar as the queries complete.
     results_table = []
-    for c in (
-        pbar := tqdm(
-            collections,
-            total=len(collections),
-            bar_format="{l_bar}{bar}",
-            leave=False,
-            disable=GLOBAL_SETTINGS["display"] == "api",
-        )
-    ):
-        pbar.set_description(f"Querying {c.name}")
-
-        # Search only on document collections
-        if c.metadata.type != "Document":
-            continue
-        try:
-            # Execute the query
-            query = DataQuery(cmd["search_query"], source=[""], limit=0, coordinates=c.source)
-            query_results = api.queries.run(query)
-            if int(query_results.outputs["data_count"]) > 0:
+    errors = []
+    with tqdm(
+        total=len(doc_collections),
+        bar_format="{l_bar}{bar}",
+        leave=False,
+        disable=GLOBAL_SETTINGS["display"] == "api",
+    ) as pbar:
+        for c, count, err in map_concurrent(_count_matches, doc_collections, max_concurrency):
+            pbar.set_description(f"Queried {c.name}")
+            pbar.update(1)
+            if err:
+                errors.append((c, err))
+            elif count > 0:
                 results_table.append(
                     {
                         "Domain": " / ".join(c.metadata.domain),
                         "Collection Name": c.name,
                         "Collection Key": c.source.index_key,
-                        "Matches": query_results.outputs["data_count"],
+                        "Matches": count,
                     }
                 )
 
-            # For testing
-            # - - -
-            # raise RunQueryError(task_id=1, message="This is a test error", error_type="err123", detail="aaa")
-            # raise RunQueryError(
-            #     task_id=1,
-            #     message="This is a runtime test error with too_many_nested_clauses",
-            #     error_type="RuntimeError",
-            #     detail="",
-            # )
-
-        except RunQueryError as err:
-            output_error(plugin_msg("err_deepsearch", err), return_val=False)
-
-            # To cause this error, run query with no quotes and two words, eg. 'brain tumor'
-            if err.error_type == "RuntimeError":
-                # https://github.com/DS4SD/deepsearch-toolkit/blob/5ddfdb70fb5fedd13971e06b88e6930f2f431e45/deepsearch/cps/client/components/queries.py#L111
-                if "too_many_nested_clauses" in err.message:
-                    output_error(plugin_msg("err_runtime"), return_val=False, pad_top=1)
-
+    # Restore the catalog order, which is lost when collecting results as they finish
+    order = {c.source.index_key: i for i, c in enumerate(doc_collections)}
+    results_table.sort(key=lambda x: order[x["Collection Key"]])
+
+    # Report failed collections without discarding the successful ones
+    if errors:
+        for c, err in errors:
+            output_error(plugin_msg("err_collection_query", c.name, err), return_val=False)
+
+        # To cause this error, run query with no quotes and two words, eg. 'brain tumor'
+        # https://github.com/DS4SD/deepsearch-toolkit/blob/5ddfdb70fb5fedd13971e06b88e6930f2f431e45/deepsearch/cps/client/components/queries.py#L111
+        if any(
+            isinstance(err, RunQueryError)
+            and err.error_type == "RuntimeError"
+            and "too_many_nested_clauses" in err.message
+            for _, err in errors
+        ):
+            output_error(plugin_msg("err_runtime"), return_val=False, pad_top=1)
+
+        # All queries failed
+        if len(errors) == len(doc_collections):
             return
 
     # No results found
@@ -113,7 +140,8 @@ def list_collections_containing(cmd_pointer, cmd: dict):
 
     # Display results in CLI & Notebook
     if GLOBAL_SETTINGS["display"] != "api":
-        output_table(df, return_val=False)
+        with span("render", rows=len(df)):
+            output_table(df, return_val=False)
 
     # Save results to file (prints success message)
     if "save_as" in cmd:
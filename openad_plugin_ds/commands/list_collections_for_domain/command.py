@@ -8,14 +8,8 @@ from openad.core.help import help_dict_create_v2
 from openad_tools.grammar_def import str_quoted, list_quoted, clause_save_as
 from openad_plugin_ds.plugin_grammar_def import l_ist, collections, f_or, domain, domains
 from openad_plugin_ds.plugin_params import PLUGIN_NAME, PLUGIN_KEY, PLUGIN_NAMESPACE
-from openad_plugin_ds.commands.list_collections_for_domain.list_collections_for_domain import (
-    list_collections_for_domain,
-)
 from openad_plugin_ds.commands.list_collections_for_domain.description import description
 
-# Login
-from openad_plugin_ds.plugin_login import login
-
 
 class PluginCommand:
     """Display collections for domain..."""
@@ -86,9 +80,17 @@ class PluginCommand:
     def exec_command(self, cmd_pointer, parser):
         """Execute the command"""
 
-        # Login
-        login(cmd_pointer)
+        # Lazy imports: the implementation and the Deep Search toolkit
+        # are only loaded when the command is run for the first time
+        from openad_plugin_ds.plugin_login import login
+        from openad_plugin_ds.plugin_profile import profile_command, span
+        from openad_plugin_ds.commands.list_collections_for_domain.list_collections_for_domain import (
+            list_collections_for_domain,
+        )
 
-        # Execute
-        cmd = parser.as_dict()
-        return list_collections_for_domain(cmd_pointer, cmd)
+        # Login & execute, recording a profile of the command for `ds profile last`
+        with profile_command(self.name):
+            with span("login"):
+                login(cmd_pointer)
+            cmd = parser.as_dict()
+            return list_collections_for_domain(cmd_pointer, cmd)
@@ -10,10 +10,14 @@ from openad_tools.jupyter import save_df_as_csv
 from openad_tools.output import output_error, output_table
 
 # Plugin
+from openad_plugin_ds.plugin_profile import span
 from openad_plugin_ds.plugin_msg import msg as plugin_msg
-from openad_plugin_ds.plugin_params import PLUGIN_KEY
+from openad_plugin_ds.plugin_login import get_api
+from openad_plugin_ds.plugin_retry import with_retry_budget
+from openad_plugin_ds.plugin_catalog import get_catalog
 
 
+@with_retry_budget
 def list_collections_for_domain(cmd_pointer, cmd: dict):
     """
     Display all collections from a given DeepSearch domain.
@@ -27,16 +31,25 @@ def list_collections_for_domain(cmd_pointer, cmd: dict):
     """
 
     # Define the DeepSearch API
-    api = cmd_pointer.login_settings["toolkits_api"][cmd_pointer.login_settings["toolkits"].index(PLUGIN_KEY)]
+    api = get_api(cmd_pointer)
 
     # Fetch list of collections
     try:
-        collections = api.elastic.list()
-        collections.sort(key=lambda c: c.name.lower())
+        catalog = get_catalog(cmd_pointer, api)
         # raise Exception("This is a test error")
     except Exception as err:  # pylint: disable=broad-exception-caught
         return output_error(plugin_msg("err_deepsearch", err))
 
+    # Parse the requested domain(s)
+    domain_list = cmd.get("domain_list") or [cmd.get("domain")]
+
+    # Find the collections under the requested domain(s) using the catalog's domain index
+    matching_ids = set()
+    for domain, domain_collections in catalog.by_domain.items():
+        if any(y.upper() in domain.upper() for y in domain_list):
+            matching_ids.update(id(c) for c in domain_collections)
+    collections = [c for c in catalog.collections if id(c) in matching_ids]
+
     # Compile results table
     results_table = [
         {
@@ -51,21 +64,6 @@ def list_collections_for_domain(cmd_pointer, cmd: dict):
         for c in collections
     ]
 
-    # Parse the requested domain(s)
-    domain_list = cmd.get("domain_list") or [cmd.get("domain")]
-
-    # Filter results down to the ones matching requested domain(s)
-    filtered_list = []
-    if len(domain_list) > 0:
-        for x in results_table:
-            i = 0
-            for y in domain_list:
-                if y.upper() in str(x["Domain"]).upper():
-                    i = i + 1
-            if i > 0:
-                filtered_list.append(x)
-        results_table = filtered_list
-
     # No results found
     # results_table = [] # Keep here for testing
     if not results_table:
@@ -80,7 +78,8 @@ def list_collections_for_domain(cmd_pointer, cmd: dict):
         df_print = df.copy()
         df_print["Entries"] = df_print["Entries"].apply(pretty_nr)
 
-        output_table(df_print, return_val=False)
+        with span("render", rows=len(df_print)):
+            output_table(df_print, return_val=False)
 
     # Save results to file (prints success message)
     if "save_as" in cmd:
@@ -7,7 +7,6 @@ from openad.core.help import help_dict_create_v2
 # Plugin
 from openad_plugin_ds.plugin_grammar_def import reset, login
 from openad_plugin_ds.plugin_params import PLUGIN_NAME, PLUGIN_KEY, PLUGIN_NAMESPACE
-from openad_plugin_ds.plugin_login import login as ds_login, reset_login
 
 
 class PluginCommand:
@@ -46,6 +45,10 @@ class PluginCommand:
     def exec_command(self, cmd_pointer, parser):
         """Execute the command"""
 
+        # Lazy imports: the implementation and the Deep Search toolkit
+        # are only loaded when the command is run for the first time
+        from openad_plugin_ds.plugin_login import login as ds_login, reset_login
+
         cmd = parser.as_dict()
         if "reset" in cmd:
             reset_login(cmd_pointer)
@@ -0,0 +1,50 @@
+import os
+import pyparsing as py
+
+# OpenAD
+from openad.core.help import help_dict_create_v2
+
+# Plugin
+from openad_plugin_ds.plugin_grammar_def import profile, last
+from openad_plugin_ds.plugin_params import PLUGIN_NAME, PLUGIN_KEY, PLUGIN_NAMESPACE
+
+
+class PluginCommand:
+    """Profile of the last command"""
+
+    category: str  # Category of command
+    index: int  # Order in help
+    name: str  # Name of command = command dir name
+    parser_id: str  # Internal unique identifier
+
+    def __init__(self):
+        self.category = "System"
+        self.index = 4
+        self.name = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+        self.parser_id = f"plugin_{PLUGIN_KEY}_{self.name}"
+
+    def add_grammar(self, statements: list, grammar_help: list):
+        """Create the command definition & documentation"""
+
+        # Command definition
+        statements.append(py.Forward(py.CaselessKeyword(PLUGIN_NAMESPACE) + profile + last)(self.parser_id))
+
+        # Command help
+        grammar_help.append(
+            help_dict_create_v2(
+                plugin_name=PLUGIN_NAME,
+                plugin_namespace=PLUGIN_NAMESPACE,
+                category=self.category,
+                command=f"""{PLUGIN_NAMESPACE} profile last""",
+                description_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "description.txt"),
+            )
+        )
+
+    def exec_command(self, cmd_pointer, parser):
+        """Execute the command"""
+
+        # Lazy imports: the implementation is only loaded when the command is run for the first time
+        from openad_plugin_ds.commands.profile.profile import show_last_profile
+
+        cmd = parser.as_dict()
+        return show_last_profile(cmd_pointer, cmd)
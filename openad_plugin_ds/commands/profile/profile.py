@@ -0,0 +1,96 @@
+import time
+import pandas as pd
+
+# OpenAD
+from openad.app.global_var_lib import GLOBAL_SETTINGS
+
+# OpenAD tools
+from openad_tools.helpers import pretty_nr
+from openad_tools.output import output_text, output_table, output_warning
+
+# Plugin
+from openad_plugin_ds.plugin_msg import msg as plugin_msg
+from openad_plugin_ds.plugin_profile import get_last_profile
+from openad_plugin_ds.plugin_settings import get_setting
+
+
+def show_last_profile(cmd_pointer, cmd: dict):
+    """
+    Display the timed spans and counters recorded while the last Deep Search command ran.
+
+    Parameters
+    ----------
+    cmd_pointer : object
+        The command pointer object.
+    cmd : dict
+        The command dictionary.
+    """
+
+    profile = get_last_profile()
+    if profile is None:
+        output_warning(plugin_msg("warn_no_profile"), return_val=False)
+        return None
+
+    # Return data for API: one row per span, the counters are kept in the attrs
+    if GLOBAL_SETTINGS["display"] == "api":
+        df = pd.DataFrame(
+            [
+                {
+                    "span": span["name"],
+                    "start": span["start"] - profile.start,
+                    "duration": span["duration"],
+                    "error": span["error"],
+                    **span["attributes"],
+                }
+                for span in sorted(profile.spans, key=lambda span: span["start"])
+            ]
+        )
+        df.attrs.update({"command": profile.command, "duration": profile.duration, **profile.counters})
+        return df
+
+    # Display results in CLI & Notebook
+    counters = profile.counters
+    started = time.strftime("%a %b %d, %Y at %H:%M:%S", time.localtime(profile.start))
+    export_file = get_setting("profile_export")
+    output_text(
+        "\n".join(
+            [
+                f"<h1>Profile of ds {profile.command}</h1>",
+                f"<yellow>Started   </yellow> {started}",
+                f"<yellow>Duration  </yellow> {profile.duration:.3f}s"
+                + (f" (failed with {profile.error})" if profile.error else ""),
+                f"<yellow>API calls </yellow> {pretty_nr(counters.get('api_calls', 0))}"
+                f" ({pretty_nr(counters.get('retries', 0))} retried, {pretty_nr(counters.get('throttled', 0))} throttled)",
+                f"<yellow>Sent      </yellow> {_size_str(counters.get('bytes_sent', 0))}",
+                f"<yellow>Received  </yellow> {_size_str(counters.get('bytes_received', 0))}",
+                f"<yellow>Export    </yellow> {export_file if export_file else 'Disabled'}",
+            ]
+        ),
+        return_val=False,
+        pad=1,
+    )
+
+    summary = profile.summary()
+    if summary:
+        df = pd.DataFrame(
+            [
+                {
+                    "Span": row["span"],
+                    "Count": row["count"],
+                    "Total (s)": round(row["total_s"], 3),
+                    "Max (s)": round(row["max_s"], 3),
+                    "Share": f"{row['share']:.0%}" if row["share"] is not None else "",
+                }
+                for row in summary
+            ]
+        )
+        output_table(df, is_data=False, return_val=False)
+
+
+def _size_str(size: int) -> str:
+    """Format a number of bytes"""
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} kB"
+    return f"{size / 1024 / 1024:.2f} MB"
@@ -11,18 +11,21 @@ from openad_plugin_ds.plugin_grammar_def import (
     f_or,
     collection,
     clause_show,
+    clause_fields,
+    clause_highlight,
+    clause_aggregate,
     clause_estimate_only,
+    clause_stream,
+    clause_resume,
 )
 from openad_plugin_ds.plugin_params import PLUGIN_NAME, PLUGIN_KEY, PLUGIN_NAMESPACE
-from openad_plugin_ds.commands.search_collection.search_collection import search_collection
 from openad_plugin_ds.commands.search_collection.description import description
 
-# Login
-from openad_plugin_ds.plugin_login import login
-
 command = f"""{PLUGIN_NAMESPACE} search collection '<collection_name_or_key>' for '<search_query>'
     [ USING (<parameter>=<value> <parameter>=<value>) ] [ show (data | docs | data docs) ]
-    [ estimate only ] [ save as '<filename.csv>' ]"""
+    [ fields (<field> ...) ] [ highlight (<field> ... | none) ]
+    [ aggregate (year | quarter | month | week | day | <field> ...) ]
+    [ estimate only ] [ stream ] [ resume ] [ save as '<filename.csv>' ]"""
 
 
 class PluginCommand:
@@ -61,7 +64,12 @@ class PluginCommand:
                 + str_strict_or_quoted("search_query")
                 + clause_using
                 + clause_show
+                + clause_fields
+                + clause_highlight
+                + clause_aggregate
                 + clause_estimate_only
+                + clause_stream
+                + clause_resume
                 # BACKWARD COMPATIBILITY WITH TOOLKIT COMMAND
                 # -------------------------------------------
                 # Support for deprecated [ return as data ] clause
@@ -85,9 +93,16 @@ class PluginCommand:
     def exec_command(self, cmd_pointer, parser):
         """Execute the command"""
 
-        # Login
-        login(cmd_pointer)
+        # Lazy imports: the implementation and the Deep Search toolkit
+        # are only loaded when the command is run for the first time
+        from openad_plugin_ds.plugin_login import login
+        from openad_plugin_ds.plugin_profile import profile_command, span
+        from openad_plugin_ds.commands.search_collection.search_collection import search_collection
 
-        # Execute
-        cmd = parser.as_dict()
-        return search_collection(cmd_pointer, cmd)
+        # Login & execute, recording a profile of the command for `ds profile last`
+        # Streamed results keep the profile open until their pages are consumed
+        with profile_command(self.name) as profile:
+            with span("login"):
+                login(cmd_pointer)
+            cmd = parser.as_dict()
+            return profile.stream(search_collection(cmd_pointer, cmd))
@@ -1,6 +1,5 @@
 from openad_plugin_ds.plugin_params import CLAUSES
 
-
 description = f"""Search a given collection in the Deep Search repository.
 
 
@@ -32,11 +31,24 @@ description = f"""Search a given collection in the Deep Search repository.
     Eg. searching for 'power efficiency' will match 'power conversion efficiency' with a slop of 1 or higher, but not with a slop of 0.
 
 <cmd>limit_results=<integer></cmd>
-    Limit the number of results returned. Note that this does not speed up the search process.
+    Limit the number of results returned. Only the pages holding these results are fetched, so a low limit speeds up the search process.
 
 <cmd>elastic_page_size=<integer></cmd>
     The number of records to scan in each iteration of the paginated elastic query, reflected by the progress bar.
     Defaults to 50. Increasing this number may speed up the search process but will cause the search to consume more memory.
+    Capped to <cmd>limit_results</cmd> when set.
+
+<cmd>prefetch=<integer></cmd>
+    The number of pages fetched in the background while the current page is processed, defaults to 2. Use 0 to fetch the pages one at a time.
+    At most this many pages are held in memory on top of the page being processed.
+
+<cmd>slices=<integer></cmd>
+    Export the results in parallel: the search is split into this many ranges of publication years holding about the same number of results, and the ranges are paged through at the same time, up to <cmd>OPENAD_DS_MAX_CONCURRENCY</cmd> at once. Results without a publication date are exported as an extra slice.
+    Requires the <cmd>save as</cmd> clause. The results of all slices are saved to a single file as they arrive, deduplicated, so they are not in the same order as a regular search. Sliced exports can't be resumed.
+    Collections without publication dates are exported with a single cursor.
+
+<cmd>agg_size=<integer></cmd>
+    The number of most frequent values listed per field with the <cmd>aggregate</cmd> clause, defaults to 10.
 
 <cmd>elastic_id=<elastic_id></cmd>
     Advanced: The elastic search engine used. This will always be 'default' for publicly available collections, but could be customized if you're running a local instance of Deep Search.
@@ -53,9 +65,34 @@ description = f"""Search a given collection in the Deep Search repository.
 <cmd>show (data docs)</cmd>
     Combine both data and docs.
 
+<cmd>fields (<field> ...)</cmd>
+    Only fetch the listed fields of each record, instead of the fields selected by <cmd>show</cmd>. Requesting fewer fields speeds up the search for collections with large records.
+    Fields are paths in the records, eg. <cmd>description.title</cmd> or <cmd>identifiers</cmd>, and may contain wildcards, eg. <cmd>description.*</cmd>.
+    Fields that are not part of the default results table are added as columns named after their path.
+
+<cmd>highlight (<field> ... | none)</cmd>
+    Only highlight matches in the listed fields. By default, <cmd>show (docs)</cmd> highlights matches in all fields.
+    Use <cmd>highlight (none)</cmd> to turn highlighting off, which reduces the size of the results and the load on the server.
+
+<cmd>aggregate (year | quarter | month | week | day | <field> ...)</cmd>
+    Only count the results per bucket, without fetching any results. This runs a single query, however many results there are.
+    - <cmd>year</cmd>, <cmd>quarter</cmd>, <cmd>month</cmd>, <cmd>week</cmd> or <cmd>day</cmd>: Distribution of the results by publication date.
+    - <cmd>authors</cmd> or any other keyword field of the collection: The most frequent values of the field.
+    Several aggregations can be combined, eg. <cmd>aggregate (year authors)</cmd>.
+
 <cmd>estimate only</cmd>
     Determine the potential number of hits.
 
+<cmd>stream</cmd>
+    Process the results one page at a time, so memory use is bounded by <cmd>elastic_page_size</cmd> rather than the number of results.
+    Combined with <cmd>save as</cmd>, each page is appended to the file as soon as it arrives. Besides csv, the file can be saved as .jsonl or .parquet (requires pyarrow).
+    Without <cmd>save as</cmd>, each page is displayed as it arrives, or when called from the API, a generator is returned that yields one DataFrame per page.
+
+<cmd>resume</cmd>
+    Resume an interrupted export where it stopped. Requires <cmd>save as</cmd> with the file of the interrupted export.
+    When exporting to a .csv or .jsonl file page by page, a checkpoint file is saved next to it after every page, with the position in the results and the number of rows written so far.
+    The checkpoint is removed once the export is complete.
+
 <cmd>save as</cmd>
     Save the results as a csv file in your current workspace.
 
@@ -70,10 +107,22 @@ Compare result count with differenty slop amounts:
 - <cmd>ds search collection 'arxiv-abstract' for '"power efficiency"' USING (slop=1) estimate only</cmd>
 - <cmd>ds search collection 'arxiv-abstract' for '"power efficiency"' USING (slop=5) estimate only</cmd>
 
+Count the number of articles on power conversion efficiency per year, and list the most frequent authors:
+- <cmd>ds search collection 'arxiv-abstract' for '"power conversion efficiency"' aggregate (year authors)</cmd>
+
+Only fetch the title and publication date of the documents, and only highlight matches in the title:
+- <cmd>ds search collection 'arxiv-abstract' for '"power conversion efficiency"' show (docs) fields (description.title description.publication_date) highlight (description.title)</cmd>
+
 Search the PubChem archive for 'Ibuprofen', list related molecules' data, then inspect molecules in the GUI.
 - <cmd>ds search collection 'pubchem' for 'Ibuprofen' show (data)</cmd>
 - <cmd>result open</cmd>
 
+Export all PubChem records mentioning 'Ibuprofen' to a JSON lines file, one page at a time:
+- <cmd>ds search collection 'pubchem' for 'Ibuprofen' show (data) stream save as 'ibuprofen.jsonl'</cmd>
+
+Resume the export above after it was interrupted:
+- <cmd>ds search collection 'pubchem' for 'Ibuprofen' show (data) stream resume save as 'ibuprofen.jsonl'</cmd>
+
 Search for patents which mention a specific SMILES molecule:
 - <cmd>ds search collection 'patent-uspto' for '"CC(CCO)CCCC(C)C"' show (data)</cmd>
 - <cmd>ds search collection 'patent-uspto' for '"CC(CCO)CCCC(C)C"' show (docs)</cmd>
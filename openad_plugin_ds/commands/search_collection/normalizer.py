@@ -0,0 +1,235 @@
+"""Flatten pages of Deep Search `_source` records into results tables"""
+
+import re
+import json
+import base64
+import urllib.parse
+import pandas as pd
+
+# OpenAD
+from openad.app.global_var_lib import GLOBAL_SETTINGS
+
+# Deep Search
+from deepsearch.cps.client.components.elastic import ElasticDataCollectionSource, ElasticProjectDataCollectionSource
+
+# Plugin
+from openad_plugin_ds.plugin_profile import span
+
+# Subject identifiers & names, mapped to their column names
+SUBJECT_IDENTIFIER_COLUMNS = {
+    "smiles": "SMILES",
+    "echa_ec_number": "ec_number",
+    "cas_number": "cas_number",
+    "patentid": "Patent ID",
+}
+SUBJECT_NAME_COLUMNS = {
+    "chemical_name": "chemical_name",
+}
+
+# Document identifiers that are displayed as links, mapped to their column name & url
+IDENTIFIER_LINK_COLUMNS = {
+    "arxivid": ("arXiv", "https://arxiv.org/abs/{}"),
+    "doi": ("DOI", "https://doi.org/{}"),
+}
+
+# Source fields with dedicated columns, any other field is flattened into columns named after its path
+FLATTENED_SOURCE_FIELDS = ["identifiers", "subject", "attributes", "file-info"]
+FLATTENED_DESCRIPTION_FIELDS = ["title", "authors", "url_refs"]
+
+# Collapse repeated spaces in highlight snippets
+MULTIPLE_SPACES = re.compile(" +")
+
+
+def normalize_page(hits: list, host: str, data_collection, return_data: bool) -> pd.DataFrame:
+    """
+    Flatten a page of search hits into a results table.
+
+    The hits are processed in a single pass, filling one list per column,
+    after which the DataFrame is built from the columns. Missing values are
+    left as empty strings, columns are ordered by first appearance.
+
+    Parameters
+    ----------
+    hits : list
+        The search hits, as found in result_page.outputs["data_outputs"].
+    host : str
+        The Deep Search host, used to link to the documents.
+    data_collection : ElasticDataCollectionSource
+        The data collection being queried.
+    return_data : bool
+        Whether the results are returned as data, in which case no links to Deep Search are added.
+    """
+    with span("normalize", hits=len(hits)):
+        columns = _flatten_hits(hits, host, data_collection, return_data)
+    with span("dataframe", rows=len(hits), columns=len(columns)):
+        return pd.DataFrame(columns)
+
+
+def _flatten_hits(hits: list, host: str, data_collection, return_data: bool) -> dict:
+    """Flatten the search hits into one list of values per column, see normalize_page()"""
+    size = len(hits)
+    columns = {}
+    add_ds_url = GLOBAL_SETTINGS["display"] == "notebook" and not return_data
+
+    def _set(column, i, value):
+        col = columns.get(column)
+        if col is None:
+            col = columns[column] = [""] * size
+        col[i] = value
+
+    for i, hit in enumerate(hits):
+        source = hit["_source"]
+
+        # Document description
+        description = source.get("description")
+        if description:
+            if "title" in description:
+                _set("Title", i, description["title"])
+            if "authors" in description:
+                _set("Authors", i, ",".join([author["name"] for author in description["authors"]]))
+            if "url_refs" in description:
+                _set("URLs", i, " , ".join(description["url_refs"]))
+            for key, value in description.items():
+                if key not in FLATTENED_DESCRIPTION_FIELDS:
+                    _set_path(_set, i, f"description.{key}", value)
+
+        # Other fields, as requested with the fields clause
+        for key, value in source.items():
+            if key != "description" and key not in FLATTENED_SOURCE_FIELDS:
+                _set_path(_set, i, key, value)
+
+        # Last highlighted snippet
+        highlight_field, snippet = _last_snippet(hit.get("highlight"))
+        if highlight_field:
+            _set("Snippet", i, MULTIPLE_SPACES.sub(" ", snippet))
+
+        # Identifiers
+        for ref in source.get("identifiers", []):
+            link_column = IDENTIFIER_LINK_COLUMNS.get(ref["type"])
+            if link_column:
+                name, url = link_column
+                _set(name, i, make_clickable(url.format(ref["value"]), name))
+            else:
+                _set(ref["type"], i, ref["value"])
+
+        # Subject identifiers & names
+        subject = source.get("subject")
+        if subject:
+            for ref in subject["identifiers"]:
+                column = SUBJECT_IDENTIFIER_COLUMNS.get(ref["type"])
+                if column:
+                    _set(column, i, ref["value"])
+            for ref in subject["names"]:
+                column = SUBJECT_NAME_COLUMNS.get(ref["type"])
+                if column:
+                    _set(column, i, ref["value"])
+
+        # Link to Deep Search
+        if add_ds_url and "_id" in hit:
+            _set("DS_URL", i, make_clickable(generate_url(host, data_collection, hit["_id"]), "DS"))
+
+        # Highlight source
+        if highlight_field:
+            _set("Report", i, str(source.get("file-info", {}).get("filename", "")))
+            _set("Field", i, highlight_field.split(".")[0])
+
+        # Attributes
+        for attribute in source.get("attributes", []):
+            for predicate in attribute["predicates"]:
+                if "nominal_value" in predicate:
+                    value = predicate["nominal_value"]["value"]
+                elif "numerical_value" in predicate:
+                    value = predicate["numerical_value"]["val"]
+                else:
+                    value = predicate["value"]["name"]
+                _set(predicate["key"]["name"], i, value)
+
+    return columns
+
+
+def _set_path(_set, i, path: str, value):
+    """Set the value of a source field, nested objects are flattened into one column per path"""
+    if isinstance(value, dict):
+        for key, sub_value in value.items():
+            _set_path(_set, i, f"{path}.{key}", sub_value)
+    elif isinstance(value, list):
+        if all(not isinstance(item, (dict, list)) for item in value):
+            _set(path, i, ", ".join(str(item) for item in value))
+        else:
+            _set(path, i, json.dumps(value, default=str))
+    else:
+        _set(path, i, value)
+
+
+def _last_snippet(highlight: dict):
+    """Return the last highlighted field that has snippets, and its last snippet"""
+    if not highlight:
+        return None, None
+    for field in reversed(highlight):
+        if highlight[field]:
+            return field, highlight[field][-1]
+    return None, None
+
+
+def make_clickable(url, name):
+    if GLOBAL_SETTINGS["display"] == "notebook":
+        return f'<a href="{url}"  target="_blank"> {name} </a>'
+    else:
+        return url
+
+
+def generate_url(host, data_source, document_hash, item_index=None):
+    select_coords = {}
+    url = ""
+    if isinstance(data_source, ElasticProjectDataCollectionSource):
+        proj_key = data_source.proj_key
+        index_key = data_source.index_key
+        select_coords = {
+            "privateCollection": index_key,
+        }
+        url = f"{host}/projects/{proj_key}/library/private/{index_key}"
+    elif isinstance(data_source, ElasticDataCollectionSource):
+        # TODO: remove hardcoding of community project
+        proj_key = "1234567890abcdefghijklmnopqrstvwyz123456"
+        index_key = data_source.index_key
+        select_coords = {
+            "collections": [index_key],
+        }
+        url = f"{host}/projects/{proj_key}/library/public"
+
+    hash_expr = f'file-info.document-hash: "{document_hash}"'
+    search_query = {
+        **select_coords,
+        "type": "Document",
+        "expression": hash_expr,
+        "filters": [],
+        "select": [
+            "_name",
+            "description.collection",
+            "prov",
+            "description.title",
+            "description.publication_date",
+            "description.url_refs",
+        ],
+        "itemIndex": 0,
+        "pageSize": 10,
+        "searchAfterHistory": [],
+        "viewType": "snippets",
+        "recordSelection": {
+            "record": {
+                "id": document_hash,
+            },
+        },
+    }
+    if item_index is not None:
+        search_query["recordSelection"]["itemIndex"] = item_index
+
+    encoded_query = urllib.parse.quote(
+        base64.b64encode(urllib.parse.quote(json.dumps(search_query, separators=(",", ":"))).encode("utf8")).decode(
+            "utf8"
+        )
+    )
+
+    url = f"{url}?search={encoded_query}"
+
+    return url
@@ -1,43 +1,43 @@
-import re
 import os
 import json
-import base64
+import itertools
 import pandas as pd
-import urllib.parse
 from copy import deepcopy
 
 # OpenAD
 from openad.app.global_var_lib import GLOBAL_SETTINGS
-from openad.helpers.credentials import load_credentials
 
 # OpenAD tools
 from openad_tools.style_parser import style, strip_tags
 from openad_tools.helpers import confirm_prompt
 from openad_tools.jupyter import save_df_as_csv
 from openad_tools.pyparsing import parse_using_clause
-from openad_tools.output import output_text, output_table, output_error, output_warning
+from openad_tools.output import output_text, output_table, output_error, output_warning, output_success
 
 # Plugin
 from openad_plugin_ds.plugin_msg import msg as plugin_msg
-from openad_plugin_ds.plugin_params import PLUGIN_KEY
+from openad_plugin_ds.plugin_login import DEFAULT_URL, get_api, get_login_info
+from openad_plugin_ds.plugin_retry import with_retry_budget, run_query, iter_query_pages
+from openad_plugin_ds.plugin_catalog import get_catalog
+from openad_plugin_ds.plugin_profile import span
+from openad_plugin_ds.plugin_settings import get_setting
+from openad_plugin_ds.plugin_concurrency import prefetch, merge_concurrent
+from openad_plugin_ds.plugin_export import PageWriter, ExportCheckpoint, export_path, stream_pages
+from openad_plugin_ds.commands.search_collection.normalizer import normalize_page
 
 # Deep Search
-from deepsearch.cps.client.components.elastic import ElasticDataCollectionSource, ElasticProjectDataCollectionSource
+from deepsearch.cps.client.components.elastic import ElasticDataCollectionSource
 from deepsearch.cps.queries import DataQuery
 
 # Aggregations
-aggs = {
-    "by_year": {
-        "date_histogram": {
-            "field": "description.publication_date",
-            "calendar_interval": "year",
-            "format": "yyyy",
-            "min_doc_count": 0,
-        }
-    }
-}
+# - Calendar intervals for a date histogram on the publication date, with their key format
+# - Shorthands for fields to count the most frequent values of
+DATE_FIELD = "description.publication_date"
+DATE_INTERVALS = {"year": "yyyy", "quarter": "yyyy-MM", "month": "yyyy-MM", "week": "yyyy-MM-dd", "day": "yyyy-MM-dd"}
+AGG_FIELD_ALIASES = {"authors": "description.authors.name"}
 
 
+@with_retry_budget
 def search_collection(cmd_pointer, cmd: dict):
     """
     Search a given collection in the Deep Search repository.
@@ -58,10 +58,10 @@ def search_collection(cmd_pointer, cmd: dict):
         from tqdm import tqdm
 
     # Define the DeepSearch API
-    api = cmd_pointer.login_settings["toolkits_api"][cmd_pointer.login_settings["toolkits"].index(PLUGIN_KEY)]
+    api = get_api(cmd_pointer)
 
     # Define the host
-    host = _get_host(cmd_pointer)
+    host = get_login_info(cmd_pointer).get("host", DEFAULT_URL).rstrip("/")
 
     # Parse search query
     search_query = cmd["search_query"]
@@ -92,6 +92,9 @@ def search_collection(cmd_pointer, cmd: dict):
             "slop",
             "edit_distance",  # Backward compatibilty, maps to "slop"
             "limit_results",
+            "agg_size",
+            "prefetch",
+            "slices",
         ],
     )
     elastic_page_size = int(
@@ -105,39 +108,34 @@ def search_collection(cmd_pointer, cmd: dict):
         params.get("slop", defaults["slop"]) or params.get("edit_distance", defaults["slop"])
     )  # Backward compatibilty
     limit_results = int(params.get("limit_results", defaults["limit_results"]))
+    agg_size = int(params.get("agg_size", 10))
+    prefetch_depth = int(params.get("prefetch", get_setting("prefetch_depth")))
+    slices = int(params.get("slices", 0))
+
+    # No need to fetch pages larger than the number of results requested
+    if limit_results > 0:
+        elastic_page_size = min(elastic_page_size, limit_results)
 
     # Parse collections
-    collections = api.elastic.list()
-    collections.sort(key=lambda c: c.name.lower())
-    elastic_list = [c.source.elastic_id for c in collections]
-    collection_key_list = [c.source.index_key for c in collections]
-    collection_name_list = [c.name for c in collections]
-    result = [
-        {
-            "Domain": " / ".join(c.metadata.domain),
-            "Collection Name": c.name,
-            "Collection Key": c.source.index_key,
-            "elastic_id": c.source.elastic_id,
-        }
-        for c in collections
-    ]
+    try:
+        catalog = get_catalog(cmd_pointer, api)
+    except Exception as err:  # pylint: disable=broad-exception-caught
+        return output_error(plugin_msg("err_deepsearch", err))
 
     # Translate collection name to collection key
-    if collection_name_or_key not in collection_key_list and collection_name_or_key in collection_name_list:
-        collection_name_or_key = collection_key_list[collection_name_list.index(collection_name_or_key)]
+    collection = catalog.find(collection_name_or_key)
 
     # Validate collection key
-    if collection_name_or_key not in collection_key_list:
+    if not collection:
         output_error(plugin_msg("err_invalid_collection_id"), return_val=False)
-        collectives = pd.DataFrame(result)
-        output_table(collectives, is_data=False, return_val=False)
+        output_table(_collections_df(catalog), is_data=False, return_val=False)
         return
+    collection_name_or_key = collection.source.index_key
 
     # Validate elastic id (currently only default is allowed)
-    if elastic_id not in elastic_list:
+    if elastic_id not in catalog.by_elastic_id:
         output_error(plugin_msg("err_invalid_elastic_id"), return_val=False)
-        collectives = pd.DataFrame(result)
-        output_table(collectives, is_data=False, return_val=False)
+        output_table(_collections_df(catalog), is_data=False, return_val=False)
         return
 
     # Define the data collection to be queried
@@ -153,6 +151,10 @@ def search_collection(cmd_pointer, cmd: dict):
     # if slop > 0 or 1: # trash
     search_query = search_query + " ~" + str(slop)
 
+    # Aggregation only: run a single query that returns the buckets without any records
+    if "aggregate" in cmd:
+        return _aggregate(cmd_pointer, cmd, api, search_query, data_collection, agg_size, return_data)
+
     # Parse show clause
     source_list = []
     is_docs = False
@@ -166,9 +168,18 @@ def search_collection(cmd_pointer, cmd: dict):
     else:
         source_list = ["subject", "attributes", "identifiers", "file-info.filename"]
 
+    # Parse fields clause: only fetch the requested source fields
+    if cmd.get("fields"):
+        source_list = list(cmd["fields"])
+
+    # Parse highlight clause: only highlight the requested fields, or nothing
+    highlight_fields = ["*"] if is_docs else []
+    if cmd.get("highlight"):
+        highlight_fields = [field for field in cmd["highlight"] if field.lower() != "none"]
+
     # Highlight matches
-    if is_docs:
-        highlight = {"fields": {"*": {}}}
+    if highlight_fields:
+        highlight = {"fields": {field: {} for field in highlight_fields}}
         highlight["fragment_size"] = 0
         if "save_as" in cmd:
             highlight["pre_tags"] = [""]
@@ -186,147 +197,169 @@ def search_collection(cmd_pointer, cmd: dict):
         highlight = None
 
     # Define the query
+    # The distribution by year is only displayed for docs
     query = DataQuery(
         search_query,  # The search query
         source=source_list,  # What fields to search
         limit=elastic_page_size,  # The size of each elastic search request page
         highlight=highlight,  # Highlight matches
         coordinates=data_collection,  # The data collection to be queried
-        aggregations=aggs,
+        aggregations=build_aggregations(["year"]) if is_docs else None,
     )
 
-    # Count the total number of results & estimate pages
-    count_query = deepcopy(query)
-    count_query.paginated_task.parameters["limit"] = 0
-    count_results = api.queries.run(count_query)
-    expected_total = count_results.outputs["data_count"]
-    expected_pages = (expected_total + elastic_page_size - 1) // elastic_page_size
-    output_text("Estimated results: " + str(expected_total), return_val=False)
-
-    # Maybe stop with estimation only
+    # Estimate only: run a count query without fetching any records
     if "estimate_only" in cmd:
+        count_query = deepcopy(query)
+        count_query.paginated_task.parameters["limit"] = 0
+        try:
+            with span("count_query"):
+                count_results = run_query(api, count_query)
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            return output_error(plugin_msg("err_deepsearch", err))
+        output_text("Estimated results: " + str(count_results.outputs["data_count"]), return_val=False)
         return None
-    else:
-        if expected_total > 100 and GLOBAL_SETTINGS["display"] != "api":
-            if not confirm_prompt("Your query may take some time, do you wish to proceed?"):
-                return None
 
-    # Iterate through all records and save matches.
-    # The paginated query cursor is passed to tqdm to display a progress bar.
-    all_results = []
-    all_aggs = {}
+    # Sliced export: split the search by publication date and page through the slices at the same time
+    if slices > 1:
+        if "save_as" not in cmd:
+            return output_error(plugin_msg("err_slices_no_save_as"))
+        if "resume" in cmd:
+            return output_error(plugin_msg("err_resume_slices"))
+        try:
+            date_slices = plan_date_slices(api, search_query, data_collection, slices)
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            return output_error(plugin_msg("err_deepsearch", err))
+        if date_slices:
+            slice_queries = [
+                DataQuery(
+                    _slice_query(search_query, date_slice),
+                    source=source_list,
+                    limit=elastic_page_size,
+                    highlight=highlight,
+                    coordinates=data_collection,
+                )
+                for date_slice in date_slices
+            ]
+            return _export_sliced(
+                cmd_pointer,
+                cmd,
+                api,
+                date_slices,
+                slice_queries,
+                host,
+                data_collection,
+                return_data,
+                limit_results,
+                prefetch_depth,
+                tqdm,
+            )
+        output_warning(plugin_msg("warn_no_date_slices"), return_val=False)
+
+    # Resume an interrupted export from its checkpoint
+    fingerprint = _query_fingerprint(query, data_collection)
+    state = None
+    if "resume" in cmd:
+        if "save_as" not in cmd:
+            return output_error(plugin_msg("err_resume_no_save_as"))
+        results_file = str(cmd["results_file"])
+        state = ExportCheckpoint(export_path(cmd_pointer, results_file, available=False)).load()
+        if state is None:
+            return output_error(plugin_msg("err_no_checkpoint", results_file))
+        if state["query"] != fingerprint:
+            return output_error(plugin_msg("err_checkpoint_mismatch", results_file))
+        query.paginated_task.parameters.update(state["next_page"])
+        output_text(plugin_msg("info_export_resumed", state["rows_written"]), return_val=False)
+
+    # Fetch the first page, which carries the total number of results,
+    # so no separate count query is needed to estimate the number of pages.
     try:
-        cursor = api.queries.run_paginated_query(query)
+        cursor = iter_query_pages(api, query)
+        first_page = next(cursor, None)
         # raise Exception("This is a test error")
     except Exception as err:  # pylint: disable=broad-exception-caught
         return output_error(plugin_msg("err_deepsearch", err))
-    for result_page in tqdm(
-        cursor,
+    expected_total = first_page.outputs["data_count"] if first_page else 0
+
+    # Every page carries the aggregations over all results, so they are
+    # taken from the first page and not computed again for the next pages
+    year_buckets = _buckets_df((first_page.outputs.get("data_aggs") if first_page else None) or {})
+    query.paginated_task.parameters.pop("aggregations", None)
+
+    # Only the pages holding the first limit_results results are fetched
+    expected_count = min(expected_total, limit_results) if limit_results > 0 else expected_total
+    expected_pages = (expected_count + elastic_page_size - 1) // elastic_page_size
+    if state:
+        expected_pages -= state["pages_written"]
+    output_text("Estimated results: " + str(expected_total), return_val=False)
+
+    # Confirm before fetching the remaining pages
+    if expected_count > 100 and GLOBAL_SETTINGS["display"] != "api":
+        if not confirm_prompt("Your query may take some time, do you wish to proceed?"):
+            return None
+
+    # Iterate through all records and save matches.
+    # The next pages are fetched in the background while the current one is processed,
+    # and the paginated query cursor is passed to tqdm to display a progress bar.
+    if limit_results > 0:
+        row_count = len(first_page.outputs["data_outputs"]) if first_page else 0
+        cursor = _limit_pages(cursor, row_count + (state["rows_written"] if state else 0), limit_results)
+    cursor = prefetch(cursor, prefetch_depth)
+    pages = tqdm(
+        itertools.chain([first_page] if first_page else [], cursor),
         total=expected_pages,
         bar_format="{l_bar}{bar}",
         leave=False,
         disable=GLOBAL_SETTINGS["display"] == "api",
-    ):
-        all_results.extend(result_page.outputs["data_outputs"])
+    )
+
+    # Export results page by page, with a checkpoint to resume from
+    if "save_as" in cmd and ("stream" in cmd or "resume" in cmd):
+        return _export_resumable(
+            cmd_pointer, cmd, query, pages, host, data_collection, return_data, limit_results, fingerprint, state
+        )
+
+    # Stream results page by page
+    if "stream" in cmd:
+        return _stream_results(cmd_pointer, cmd, pages, host, data_collection, return_data, limit_results)
+
+    all_results = []
+    try:
+        for result_page in pages:
+            all_results.extend(result_page.outputs["data_outputs"])
 
-        # Count number of results per year
-        for year in result_page.outputs["data_aggs"]["by_year"]["buckets"]:
-            if year["key_as_string"] not in all_aggs:
-                all_aggs[year["key_as_string"]] = 0
-            all_aggs[year["key_as_string"]] = all_aggs[year["key_as_string"]] + int(year["doc_count"])
+            # Stop paginating once enough results were collected
+            if limit_results > 0 and len(all_results) >= limit_results:
+                break
+
+    # Keep the pages collected so far when a page fails after all retries
+    except Exception as err:  # pylint: disable=broad-exception-caught
+        output_error(plugin_msg("err_deepsearch", err), return_val=False)
+        if not all_results:
+            return None
+        output_warning(plugin_msg("warn_incomplete_results", len(all_results)), return_val=False)
+
+    # Stop prefetching
+    finally:
+        cursor.close()
 
     # Display distribution of results by year
-    if is_docs and all_aggs:
-        distribution_df = pd.json_normalize(all_aggs)
+    if is_docs and not year_buckets.empty:
+        distribution_df = pd.DataFrame([dict(zip(year_buckets["key"], year_buckets["doc_count"]))])
         distribution_df = distribution_df.style.hide(axis="index")
         if len(distribution_df.columns) > 1:
             output_text("<bold>Result distribution by year</bold>", pad=1, return_val=False)
             output_table(distribution_df, pad_btm=1, is_data=False, return_val=False)
 
-    # Compile results table
-    results_table = []
-    result = None
-    for row in all_results:
-        result = {}
-
-        if "description" in row["_source"]:
-            if "title" in row["_source"]["description"]:
-                result["Title"] = row["_source"]["description"]["title"]
-            if "authors" in row["_source"]["description"]:
-                result["Authors"] = ",".join([author["name"] for author in row["_source"]["description"]["authors"]])
-            if "url_refs" in row["_source"]["description"]:
-                result["URLs"] = " , ".join(row["_source"]["description"]["url_refs"])
-
-        # if slop > 0 or 1: # trash:
-        for field in row.get("highlight", {}).keys():
-            for snippet in row["highlight"][field]:
-                result["Snippet"] = re.sub(" +", " ", snippet)
-
-        if "attributes" in row["_source"]:
-            for ref in row["_source"]["identifiers"]:
-                if ref["type"] == "cid":
-                    result["cid"] = ref["value"]
-        for ref in row["_source"].get("identifiers", []):
-            result[ref["type"]] = ref["value"]
-
-        if "subject" in row["_source"]:
-            for ref in row["_source"]["subject"]["identifiers"]:
-                if ref["type"] == "smiles":
-                    result["SMILES"] = ref["value"]
-                if ref["type"] == "echa_ec_number":
-                    result["ec_number"] = ref["value"]
-                if ref["type"] == "cas_number":
-                    result["cas_number"] = ref["value"]
-                if ref["type"] == "patentid":
-                    result["Patent ID"] = ref["value"]
-
-            for ref in row["_source"]["subject"]["names"]:
-                if ref["type"] == "chemical_name":
-                    result["chemical_name"] = ref["value"]
-
-        if "identifiers" in row["_source"]:
-            for ref in row["_source"]["identifiers"]:
-                if ref["type"] == "arxivid":
-                    result["arXiv"] = _make_clickable(f'https://arxiv.org/abs/{ref["value"]}', "arXiv")
-                    if "arxivid" in result:
-                        result.pop("arxivid")
-                if ref["type"] == "doi":
-                    result["DOI"] = _make_clickable(f'https://doi.org/{ref["value"]}', "DOI")
-                    if "doi" in result:
-                        result.pop("doi")
-
-        if "_id" in row and GLOBAL_SETTINGS["display"] == "notebook" and not return_data:
-            result["DS_URL"] = _make_clickable(_generate_url(host, data_collection, row["_id"]), "DS")
-
-        # if slop > 0 or 1: # trash
-        for field in row.get("highlight", {}).keys():
-            for snippet in row["highlight"][field]:
-                result["Report"] = str(row["_source"]["file-info"]["filename"])
-                result["Field"] = field.split(".")[0]
-
-        if "attributes" in row["_source"]:
-            for attribute in row["_source"]["attributes"]:
-                for predicate in attribute["predicates"]:
-                    value = predicate["value"]["name"]
-                    if "nominal_value" in predicate:
-                        value = predicate["nominal_value"]["value"]
-                    elif "numerical_value" in predicate:
-                        value = predicate["numerical_value"]["val"]
-                    result[predicate["key"]["name"]] = value
-
-        results_table.append(result)
-
     # No results
-    if result is None:
+    if not all_results:
         output_warning("Search returned no result", return_val=False)
         return None
 
-    # Results to dataframe
+    # Compile results table
     pd.set_option("display.max_colwidth", None)
-    df = pd.DataFrame(results_table)
-    df = df.fillna("")  # Replace NaN with empty string
     if limit_results > 0:
-        df = df.truncate(after=limit_results - 1)
+        all_results = all_results[:limit_results]
+    df = normalize_page(all_results, host, data_collection, return_data)
 
     # Save results to file (prints success message)
     if "save_as" in cmd:
@@ -335,104 +368,477 @@ def search_collection(cmd_pointer, cmd: dict):
 
     # Display results in CLI & Notebook
     if not return_data:
-        # Stylize the table for Jupyter
-        if GLOBAL_SETTINGS["display"] == "notebook":
-            df = df.style.set_properties(**{"text-align": "left"}).set_table_styles(
-                [{"selector": "th", "props": [("text-align", "left")]}]
-            )
+        with span("render", rows=len(df)):
+            return output_table(_style_df(df, cmd), show_index=True)
+
+    # Return data for API
+    else:
+        return _strip_snippets(df)
+
+
+def build_aggregations(names: list, size: int = 10) -> dict:
+    """
+    Build the elastic aggregations for a list of aggregation names, each one either:
+    - A calendar interval (year, quarter, month, week, day) for a date histogram of the publication date
+    - A field, or field shorthand like 'authors', to count its most frequent values
 
-        # Stylize the table for terminal
-        if GLOBAL_SETTINGS["display"] == "terminal":
-            if "save_as" not in cmd:
-                df.style.format(hyperlinks="html")
-                if "Title" in df:
-                    df["Title"] = df["Title"].str.wrap(50, break_long_words=True)
-                if "Authors" in df:
-                    df["Authors"] = df["Authors"].str.wrap(25, break_long_words=True)
-                if "Snippet" in df:
-                    df["Snippet"] = df["Snippet"].apply(lambda x: style(x))  # pylint: disable=unnecessary-lambda
-                    df["Snippet"] = df["Snippet"].str.wrap(70, break_long_words=True)
+    Parameters
+    ----------
+    names : list
+        The aggregation names.
+    size : int
+        The number of buckets returned for field aggregations.
+    """
+    aggregations = {}
+    for name in names:
+        interval = name.lower()
+        if interval in DATE_INTERVALS:
+            aggregations[f"by_{interval}"] = {
+                "date_histogram": {
+                    "field": DATE_FIELD,
+                    "calendar_interval": interval,
+                    "format": DATE_INTERVALS[interval],
+                    "min_doc_count": 0,
+                }
+            }
+        else:
+            field = AGG_FIELD_ALIASES.get(interval, name)
+            aggregations[f"by_{name}"] = {"terms": {"field": field, "size": size}}
+    return aggregations
 
-        return output_table(df, show_index=True)
+
+def _aggregate(cmd_pointer, cmd, api, search_query, data_collection, agg_size, return_data):
+    """
+    Run a single query without records, only returning the aggregation buckets,
+    as a table with the aggregation name, bucket key and number of documents.
+    """
+    query = DataQuery(
+        search_query,
+        source=[],
+        limit=0,
+        coordinates=data_collection,
+        aggregations=build_aggregations(cmd["aggregate"], agg_size),
+    )
+    try:
+        result = run_query(api, query)
+        # raise Exception("This is a test error")
+    except Exception as err:  # pylint: disable=broad-exception-caught
+        return output_error(plugin_msg("err_deepsearch", err))
+
+    df = _buckets_df(result.outputs.get("data_aggs") or {})
+
+    # Save results to file (prints success message)
+    if "save_as" in cmd:
+        results_file = str(cmd["results_file"])
+        save_df_as_csv(cmd_pointer, df, results_file)
 
     # Return data for API
-    else:
-        # Remove styling tags in the snippets column
-        if "Snippet" in df:
-            df["Snippet"] = df["Snippet"].apply(lambda x: strip_tags(x))  # pylint: disable=unnecessary-lambda
+    if return_data:
         return df
 
+    # Display one table per aggregation
+    output_text("Total results: " + str(result.outputs["data_count"]), return_val=False)
+    if df.empty:
+        output_warning("Search returned no result", return_val=False)
+        return None
+    for agg_name, agg_df in df.groupby("aggregation", sort=False):
+        output_text(f"<bold>{agg_name}</bold>", pad_top=1, return_val=False)
+        output_table(agg_df[["key", "doc_count"]], is_data=False, return_val=False)
+    return None
 
-def _make_clickable(url, name):
-    if GLOBAL_SETTINGS["display"] == "notebook":
-        return f'<a href="{url}"  target="_blank"> {name} </a>'
-    else:
-        return url
 
+def plan_date_slices(api, search_query: str, data_collection, slices: int) -> list:
+    """
+    Split the results of a search into up to `slices` disjoint ranges of publication years
+    holding about the same number of results, using a single query for the distribution by year.
+    Results without a publication date get a slice of their own.
 
-def _generate_url(host, data_source, document_hash, item_index=None):
-    select_coords = {}
-    url = ""
-    if isinstance(data_source, ElasticProjectDataCollectionSource):
-        proj_key = data_source.proj_key
-        index_key = data_source.index_key
-        select_coords = {
-            "privateCollection": index_key,
-        }
-        url = f"{host}/projects/{proj_key}/library/private/{index_key}"
-    elif isinstance(data_source, ElasticDataCollectionSource):
-        # TODO: remove hardcoding of community project
-        proj_key = "1234567890abcdefghijklmnopqrstvwyz123456"
-        index_key = data_source.index_key
-        select_coords = {
-            "collections": [index_key],
+    Returns a list of slices, each a dictionary with a label, the first year (gte) and the year after the last (lt),
+    None for open ranges, whether it holds the results without date (missing), and its number of results (count).
+    An empty list is returned when none of the results have a publication date.
+
+    Parameters
+    ----------
+    api : CpsApi
+        The Deep Search API.
+    search_query : str
+        The elastic query string.
+    data_collection : ElasticDataCollectionSource
+        The data collection being queried.
+    slices : int
+        The maximum number of date ranges.
+    """
+    query = DataQuery(
+        search_query,
+        source=[],
+        limit=0,
+        coordinates=data_collection,
+        aggregations=build_aggregations(["year"]),
+    )
+    with span("count_query"):
+        result = run_query(api, query)
+    buckets = [
+        (str(row.key), int(row.doc_count))
+        for row in _buckets_df(result.outputs.get("data_aggs") or {}).itertuples()
+        if row.doc_count > 0
+    ]
+    if not buckets:
+        return []
+
+    # Group consecutive years until each group holds its share of the results
+    dated_count = sum(count for _, count in buckets)
+    groups = [[]]
+    cumulative = 0
+    for year, count in buckets:
+        if groups[-1] and cumulative >= dated_count * len(groups) / slices:
+            groups.append([])
+        groups[-1].append((year, count))
+        cumulative += count
+
+    # The first and last ranges are open, so the slices cover all dates
+    date_slices = []
+    for i, group in enumerate(groups):
+        first_year, last_year = group[0][0], group[-1][0]
+        date_slices.append(
+            {
+                "label": first_year if first_year == last_year else f"{first_year}-{last_year}",
+                "gte": first_year if i > 0 else None,
+                "lt": groups[i + 1][0][0] if i < len(groups) - 1 else None,
+                "missing": False,
+                "count": sum(count for _, count in group),
+            }
+        )
+
+    undated_count = result.outputs["data_count"] - dated_count
+    if undated_count > 0:
+        date_slices.append({"label": "no date", "gte": None, "lt": None, "missing": True, "count": undated_count})
+    return date_slices
+
+
+def _slice_query(search_query: str, date_slice: dict) -> dict:
+    """The elastic query for the results of a search within a date slice"""
+    query = {"query_string": {"query": search_query}}
+    if date_slice["missing"]:
+        return {"bool": {"must": [query], "must_not": [{"exists": {"field": DATE_FIELD}}]}}
+
+    date_filter = [{"exists": {"field": DATE_FIELD}}]
+    bounds = {key: date_slice[key] for key in ["gte", "lt"] if date_slice[key]}
+    if bounds:
+        date_filter.append({"range": {DATE_FIELD: {**bounds, "format": "yyyy"}}})
+    return {"bool": {"must": [query], "filter": date_filter}}
+
+
+def _buckets_df(data_aggs: dict) -> pd.DataFrame:
+    """Flatten the buckets of elastic aggregations into a table"""
+    rows = [
+        {
+            "aggregation": agg_name,
+            "key": bucket.get("key_as_string", bucket.get("key")),
+            "doc_count": bucket.get("doc_count", 0),
         }
-        url = f"{host}/projects/{proj_key}/library/public"
-
-    hash_expr = f'file-info.document-hash: "{document_hash}"'
-    search_query = {
-        **select_coords,
-        "type": "Document",
-        "expression": hash_expr,
-        "filters": [],
-        "select": [
-            "_name",
-            "description.collection",
-            "prov",
-            "description.title",
-            "description.publication_date",
-            "description.url_refs",
-        ],
-        "itemIndex": 0,
-        "pageSize": 10,
-        "searchAfterHistory": [],
-        "viewType": "snippets",
-        "recordSelection": {
-            "record": {
-                "id": document_hash,
-            },
-        },
-    }
-    if item_index is not None:
-        search_query["recordSelection"]["itemIndex"] = item_index
+        for agg_name, agg in data_aggs.items()
+        for bucket in agg.get("buckets", [])
+    ]
+    return pd.DataFrame(rows, columns=["aggregation", "key", "doc_count"])
+
+
+def iter_result_pages(pages, host, data_collection, return_data=True, limit_results=0):
+    """
+    Normalize the pages of a paginated collection search into DataFrames, one page at a time.
+    Memory use is bounded by the page size rather than the total number of results.
+
+    Parameters
+    ----------
+    pages : iterable
+        The result pages, as returned by iter_query_pages().
+    host : str
+        The Deep Search host, used to link to the documents.
+    data_collection : ElasticDataCollectionSource
+        The data collection being queried.
+    return_data : bool
+        Whether the results are returned as data, without styling.
+    limit_results : int
+        Stop after this many results, 0 for no limit.
+    """
+    row_count = 0
+    for result_page in pages:
+        hits = result_page.outputs["data_outputs"]
+        if limit_results > 0:
+            hits = hits[: limit_results - row_count]
+        if hits:
+            row_count += len(hits)
+            df = normalize_page(hits, host, data_collection, return_data)
+            yield _strip_snippets(df) if return_data else df
+        if limit_results > 0 and row_count >= limit_results:
+            return
+
+
+def _limit_pages(pages, row_count: int, limit_results: int):
+    """
+    Stop paginating once the pages hold limit_results results,
+    so no page past the limit is prefetched.
+    """
+    if row_count >= limit_results:
+        return
+    for result_page in pages:
+        yield result_page
+        row_count += len(result_page.outputs["data_outputs"])
+        if row_count >= limit_results:
+            return
+
+
+def _stream_results(cmd_pointer, cmd, pages, host, data_collection, return_data, limit_results):
+    """
+    Stream the search results page by page:
+    - Append each page to the 'save as' file (CSV, JSONL or Parquet)
+    - Or display each page as it arrives
+    - Or, for the API, return a generator that yields one DataFrame per page
+    """
+    df_pages = iter_result_pages(pages, host, data_collection, return_data, limit_results)
+    pd.set_option("display.max_colwidth", None)
+    return stream_pages(cmd_pointer, cmd, df_pages, return_data, style=lambda df: _style_df(df, cmd))
+
+
+def _export_resumable(
+    cmd_pointer, cmd, query, pages, host, data_collection, return_data, limit_results, fingerprint, state=None
+):
+    """
+    Append the search results to the 'save as' file page by page, and save a checkpoint after every page
+    with the cursor of the next page and the size of the file so far.
+    When the export is interrupted, the same command with the resume clause continues from the checkpoint.
+    """
+    results_file = str(cmd["results_file"])
+    file_path = export_path(cmd_pointer, results_file, available=state is None)
+    rel_path = os.path.relpath(file_path, cmd_pointer.workspace_path())
+    checkpoint = ExportCheckpoint(file_path)
+    resumed = state is not None
+    if not resumed:
+        state = {"query": fingerprint, "next_page": {}, "rows_written": 0, "pages_written": 0, "columns": None}
+
+    try:
+        writer = PageWriter(file_path, columns=state["columns"], rows_written=state["rows_written"])
+    except (ValueError, ImportError) as err:
+        return output_error(plugin_msg("err_export", err))
+
+    # Parquet files can't be appended to, so they are exported without checkpoint
+    if writer.format == ".parquet":
+        if state["rows_written"]:
+            return output_error(plugin_msg("err_resume_parquet"))
+        checkpoint = None
+
+    # Drop anything written after the last checkpoint, so no page is written twice
+    # and a run interrupted while writing the first page starts over from an empty file
+    elif resumed:
+        if os.path.isfile(file_path):
+            with open(file_path, "r+b") as f:
+                f.truncate(state["file_size"])
+        elif state["rows_written"]:
+            return output_error(plugin_msg("err_no_checkpoint", results_file))
+    else:
+        state["file_size"] = 0
+        checkpoint.save(state)
+
+    task = query.paginated_task
+    try:
+        with writer:
+            for result_page in pages:
+                hits = result_page.outputs["data_outputs"]
+                if limit_results > 0:
+                    hits = hits[: limit_results - writer.rows_written]
+                if hits:
+                    df = normalize_page(hits, host, data_collection, return_data)
+                    writer.write(_strip_snippets(df) if return_data else df)
+
+                next_page = result_page.next_pages.get(task.id)
+                if next_page is None or (limit_results > 0 and writer.rows_written >= limit_results):
+                    break
+                if checkpoint:
+                    state["next_page"] = next_page
+                    state["rows_written"] = writer.rows_written
+                    state["pages_written"] += 1
+                    state["columns"] = writer.columns
+                    state["file_size"] = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+                    checkpoint.save(state)
+        # raise Exception("This is a test error")
+    except Exception as err:  # pylint: disable=broad-exception-caught
+        if checkpoint:
+            return output_error(plugin_msg("err_export_interrupted", rel_path, state["rows_written"], err))
+        return output_error(plugin_msg("err_deepsearch", err))
+
+    if checkpoint:
+        checkpoint.remove()
 
-    encoded_query = urllib.parse.quote(
-        base64.b64encode(urllib.parse.quote(json.dumps(search_query, separators=(",", ":"))).encode("utf8")).decode(
-            "utf8"
+    # No results
+    if writer.rows_written == 0:
+        output_warning("Search returned no result", return_val=False)
+        return None
+
+    # Success
+    if writer.dropped_columns:
+        output_warning(plugin_msg("warn_columns_dropped", sorted(writer.dropped_columns)), return_val=False)
+    output_success(plugin_msg("success_results_streamed", writer.rows_written, rel_path), return_val=False)
+    return None
+
+
+def _export_sliced(
+    cmd_pointer,
+    cmd,
+    api,
+    date_slices,
+    slice_queries,
+    host,
+    data_collection,
+    return_data,
+    limit_results,
+    prefetch_depth,
+    tqdm,
+):
+    """
+    Export the results of a search split into date slices, paging through the slices at the same time,
+    with one progress bar per slice.
+
+    Pages are written to the 'save as' file as they arrive from any slice, deduplicated by document ID,
+    so the results are not in the order of a sequential search. A failing slice is reported
+    without discarding the others.
+    """
+    results_file = str(cmd["results_file"])
+    file_path = export_path(cmd_pointer, results_file)
+    rel_path = os.path.relpath(file_path, cmd_pointer.workspace_path())
+    try:
+        writer = PageWriter(file_path)
+    except (ValueError, ImportError) as err:
+        return output_error(plugin_msg("err_export", err))
+
+    expected_total = sum(date_slice["count"] for date_slice in date_slices)
+    output_text(plugin_msg("info_slices", expected_total, len(date_slices)), return_val=False)
+
+    # Confirm before fetching the pages
+    if expected_total > 100 and GLOBAL_SETTINGS["display"] != "api":
+        if not confirm_prompt("Your query may take some time, do you wish to proceed?"):
+            return None
+
+    page_size = slice_queries[0].paginated_task.parameters["limit"]
+    bars = [
+        tqdm(
+            total=(date_slice["count"] + page_size - 1) // page_size,
+            desc=date_slice["label"],
+            bar_format="{desc:>10} {bar} {n_fmt}/{total_fmt}",
+            position=i,
+            leave=False,
+            disable=GLOBAL_SETTINGS["display"] == "api",
         )
+        for i, date_slice in enumerate(date_slices)
+    ]
+    pages = merge_concurrent(
+        [iter_query_pages(api, query) for query in slice_queries], get_setting("max_concurrency"), prefetch_depth
     )
 
-    url = f"{url}?search={encoded_query}"
+    seen_ids = set()
+    duplicate_count = 0
+    errors = []
+    try:
+        with writer:
+            for i, result_page, err in pages:
+                if err:
+                    errors.append((date_slices[i]["label"], err))
+                    continue
+                bars[i].update(1)
+
+                # Skip results already written by another slice
+                hits = []
+                for hit in result_page.outputs["data_outputs"]:
+                    if "_id" in hit:
+                        if hit["_id"] in seen_ids:
+                            duplicate_count += 1
+                            continue
+                        seen_ids.add(hit["_id"])
+                    hits.append(hit)
+
+                if limit_results > 0:
+                    hits = hits[: limit_results - writer.rows_written]
+                if hits:
+                    df = normalize_page(hits, host, data_collection, return_data)
+                    writer.write(_strip_snippets(df) if return_data else df)
+
+                # Stop all slices once enough results were written
+                if limit_results > 0 and writer.rows_written >= limit_results:
+                    break
+    except Exception as err:  # pylint: disable=broad-exception-caught
+        return output_error(plugin_msg("err_deepsearch", err))
+    finally:
+        pages.close()
+        for bar in bars:
+            bar.close()
 
-    return url
+    # Report failed slices without discarding the successful ones
+    for label, err in errors:
+        output_error(plugin_msg("err_slice_query", label, err), return_val=False)
+    if duplicate_count:
+        output_warning(plugin_msg("warn_duplicates_dropped", duplicate_count), return_val=False)
 
+    # No results
+    if writer.rows_written == 0:
+        output_warning("Search returned no result", return_val=False)
+        return None
 
-def _get_host(cmd_pointer):
-    cred_file = load_credentials(os.path.expanduser(f"{cmd_pointer.home_dir}/deepsearch_api.cred"))
+    # Success
+    if writer.dropped_columns:
+        output_warning(plugin_msg("warn_columns_dropped", sorted(writer.dropped_columns)), return_val=False)
+    output_success(plugin_msg("success_results_streamed", writer.rows_written, rel_path), return_val=False)
+    return None
 
-    if cred_file["host"].strip() == "":
-        host = "https://sds.app.accelerate.science"
-    else:
-        host = cred_file["host"]
 
-    return host.rstrip("/")
+def _query_fingerprint(query, data_collection) -> dict:
+    """The search parameters identifying an export, as stored in its checkpoint"""
+    fingerprint = {
+        "parameters": query.paginated_task.parameters,
+        "elastic_id": data_collection.elastic_id,
+        "index_key": data_collection.index_key,
+    }
+    return json.loads(json.dumps(fingerprint, default=str))
+
+
+def _style_df(df, cmd):
+    """Stylize the results table for display in the CLI & Notebook"""
+
+    # Stylize the table for Jupyter
+    if GLOBAL_SETTINGS["display"] == "notebook":
+        df = df.style.set_properties(**{"text-align": "left"}).set_table_styles(
+            [{"selector": "th", "props": [("text-align", "left")]}]
+        )
+
+    # Stylize the table for terminal
+    if GLOBAL_SETTINGS["display"] == "terminal":
+        if "save_as" not in cmd:
+            df.style.format(hyperlinks="html")
+            if "Title" in df:
+                df["Title"] = df["Title"].str.wrap(50, break_long_words=True)
+            if "Authors" in df:
+                df["Authors"] = df["Authors"].str.wrap(25, break_long_words=True)
+            if "Snippet" in df:
+                df["Snippet"] = df["Snippet"].apply(lambda x: style(x))  # pylint: disable=unnecessary-lambda
+                df["Snippet"] = df["Snippet"].str.wrap(70, break_long_words=True)
+
+    return df
+
+
+def _strip_snippets(df):
+    """Remove styling tags in the snippets column, for data returned to the API"""
+    if "Snippet" in df:
+        df["Snippet"] = df["Snippet"].apply(lambda x: strip_tags(x))  # pylint: disable=unnecessary-lambda
+    return df
+
+
+def _collections_df(catalog):
+    """Table of available collections, displayed when an invalid collection or elastic id is requested"""
+    return pd.DataFrame(
+        [
+            {
+                "Domain": " / ".join(c.metadata.domain),
+                "Collection Name": c.name,
+                "Collection Key": c.source.index_key,
+                "elastic_id": c.source.elastic_id,
+            }
+            for c in catalog.collections
+        ]
+    )
@@ -0,0 +1,87 @@
+import time
+import pandas as pd
+
+# OpenAD
+from openad.app.global_var_lib import GLOBAL_SETTINGS
+
+# OpenAD tools
+from openad_tools.helpers import pretty_nr
+from openad_tools.output import output_text
+
+# Plugin
+from openad_plugin_ds.plugin_login import get_session
+from openad_plugin_ds.plugin_settings import get_setting
+from openad_plugin_ds.plugin_rate_limit import get_rate_limiter
+
+
+def show_status(cmd_pointer, cmd: dict):
+    """
+    Display the current login and the usage of the rate limiter.
+
+    Parameters
+    ----------
+    cmd_pointer : object
+        The command pointer object.
+    cmd : dict
+        The command dictionary.
+    """
+
+    session = get_session()
+    if session is not None and session.cmd_pointer is not cmd_pointer:
+        session = None
+    stats = get_rate_limiter().stats()
+
+    # Return data for API
+    if GLOBAL_SETTINGS["display"] == "api":
+        return pd.DataFrame(
+            [
+                {
+                    "host": session.host if session else None,
+                    "username": session.username if session else None,
+                    "token_expiry": session.expiry if session else None,
+                    "max_concurrency": get_setting("max_concurrency"),
+                    **stats,
+                }
+            ]
+        )
+
+    # Login
+    if session is None:
+        login_lines = ["<yellow>Login     </yellow> Not logged in"]
+    else:
+        expiry = time.strftime("%a %b %d, %Y at %H:%M", time.localtime(session.expiry))
+        login_lines = [
+            f"<yellow>Host      </yellow> {session.host}",
+            f"<yellow>User      </yellow> {session.username}",
+            f"<yellow>Token     </yellow> {'Valid until ' + expiry if session.is_valid(time.time()) else 'Expired'}",
+        ]
+
+    # Rate limiter
+    if stats["rate"] > 0:
+        rate_lines = [
+            f"<yellow>Limit     </yellow> {stats['rate']:g} requests/s, bursts of {stats['burst']}",
+            f"<yellow>Current   </yellow> {stats['current_rate']:.2f} requests/s ({stats['utilization']:.0%} utilization)",
+            f"<yellow>Available </yellow> {stats['tokens']:.1f} / {stats['burst']} requests",
+        ]
+    else:
+        rate_lines = [
+            "<yellow>Limit     </yellow> Disabled",
+            f"<yellow>Current   </yellow> {stats['current_rate']:.2f} requests/s",
+        ]
+
+    output_text(
+        "\n".join(
+            [
+                "<h1>Deep Search Status</h1>",
+                *login_lines,
+                "",
+                "<h1>Rate Limiter</h1>",
+                *rate_lines,
+                f"<yellow>Session   </yellow> {pretty_nr(stats['requests'])} requests, {pretty_nr(stats['throttled'])} throttled"
+                f" for a total of {stats['wait_time']:.1f}s",
+                f"<yellow>Parallel  </yellow> Up to {get_setting('max_concurrency')} concurrent queries per command",
+            ]
+        ),
+        return_val=False,
+        pad=1,
+    )
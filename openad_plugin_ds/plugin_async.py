@@ -0,0 +1,107 @@
+"""
+Async counterparts of the command implementations, to embed the plugin in asyncio applications.
+
+The Deep Search toolkit is synchronous, so every command runs in a bounded thread pool
+off the event loop, and many searches can be awaited together with asyncio.gather().
+Cancelling the awaiting task stops the command at its next API call.
+
+Example:
+    GLOBAL_SETTINGS["display"] = "api"
+    df_1, df_2 = await asyncio.gather(
+        search_collection_async(cmd_pointer, {"collection_name_or_key": "pubchem", "search_query": "Ibuprofen"}),
+        find_similar_molecules_async(cmd_pointer, {"smiles": ["CC1=CCC2CC1C2(C)C"]}),
+    )
+"""
+
+import asyncio
+import importlib
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# Plugin
+from openad_plugin_ds.plugin_settings import get_setting
+
+# The cancel event of the async call being executed
+_cancel_event = contextvars.ContextVar("cancel_event", default=None)
+
+# Thread pool shared by all async calls, created on first use
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class QueryCancelled(BaseException):
+    """
+    Raised inside a command when the async call running it was cancelled.
+    Like asyncio.CancelledError, this is not an Exception, so it isn't caught by the commands' error handling.
+    """
+
+
+def check_cancelled():
+    """Raise QueryCancelled when the async call running the current command was cancelled"""
+    cancel = _cancel_event.get()
+    if cancel is not None and cancel.is_set():
+        raise QueryCancelled()
+
+
+async def run_async(fn, *args, **kwargs):
+    """
+    Run a blocking function in the shared thread pool and await its result.
+
+    The function runs in a copy of the caller's context with its own cancel event,
+    which is set when the awaiting task is cancelled.
+    """
+    cancel = threading.Event()
+    ctx = contextvars.copy_context()
+    ctx.run(_cancel_event.set, cancel)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_executor(), lambda: ctx.run(fn, *args, **kwargs))
+    except asyncio.CancelledError:
+        cancel.set()
+        raise
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the thread pool shared by all async calls, sized by the max_concurrency setting"""
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, get_setting("max_concurrency")), thread_name_prefix="openad_ds"
+            )
+        return _executor
+
+
+def _async_command(command_name: str, fn_name: str):
+    """Create the async counterpart of a command implementation, which logs in before running it"""
+
+    def _run(cmd_pointer, cmd: dict):
+        # Lazy imports, as in the commands' exec_command()
+        from openad_plugin_ds.plugin_login import login  # pylint: disable=import-outside-toplevel
+        from openad_plugin_ds.plugin_profile import profile_command, span  # pylint: disable=import-outside-toplevel
+
+        fn = getattr(importlib.import_module(f"openad_plugin_ds.commands.{command_name}.{command_name}"), fn_name)
+        with profile_command(command_name) as profile:
+            with span("login"):
+                login(cmd_pointer)
+            return profile.stream(fn(cmd_pointer, cmd))
+
+    async def command_async(cmd_pointer, cmd: dict):
+        return await run_async(_run, cmd_pointer, cmd)
+
+    command_async.__name__ = command_async.__qualname__ = f"{fn_name}_async"
+    command_async.__doc__ = (
+        f"Async counterpart of {fn_name}(), see openad_plugin_ds.commands.{command_name}.\n"
+        "The command dictionary holds the same keys as the parsed command."
+    )
+    return command_async
+
+
+search_collection_async = _async_command("search_collection", "search_collection")
+list_collections_containing_async = _async_command("list_collections_containing", "list_collections_containing")
+find_similar_molecules_async = _async_command("find_mols_similar", "find_similar_molecules")
+find_substructure_molecules_async = _async_command("find_mols_substruct", "find_substructure_molecules")
+find_patents_containing_molecule_async = _async_command("find_patents", "find_patents_containing_molecule")
+find_molecules_in_patents_async = _async_command("find_mols_in_patents", "find_molecules_in_patents")
@@ -0,0 +1,90 @@
+"""Shared, time-limited cache of the Deep Search collection catalog"""
+
+import time
+import threading
+
+# Plugin
+from openad_plugin_ds.plugin_login import get_login_info
+from openad_plugin_ds.plugin_retry import call_with_retry
+from openad_plugin_ds.plugin_profile import span
+from openad_plugin_ds.plugin_settings import get_setting
+
+# Cached catalogs, keyed by (host, username)
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+class CollectionCatalog:
+    """
+    List of all Deep Search collections, sorted by name,
+    with lookup indexes by name, index key, elastic id and domain.
+
+    Note: the collections are shared between commands and should not be modified.
+    """
+
+    def __init__(self, collections: list):
+        self.collections = sorted(collections, key=lambda c: c.name.lower())
+        self.fetched_at = time.time()
+
+        self.by_name = {}
+        self.by_index_key = {}
+        self.by_elastic_id = {}
+        self.by_domain = {}
+        for c in self.collections:
+            self.by_name.setdefault(c.name, c)
+            self.by_index_key.setdefault(c.source.index_key, c)
+            self.by_elastic_id.setdefault(c.source.elastic_id, []).append(c)
+            for domain in c.metadata.domain:
+                self.by_domain.setdefault(domain, []).append(c)
+
+    def find(self, name_or_key: str):
+        """Return the collection matching a given index key or name, or None"""
+        return self.by_index_key.get(name_or_key) or self.by_name.get(name_or_key)
+
+    def is_fresh(self, ttl: int) -> bool:
+        """Check if the catalog is younger than the given time-to-live in seconds"""
+        return time.time() - self.fetched_at < ttl
+
+
+def get_catalog(cmd_pointer, api, refresh: bool = False) -> CollectionCatalog:
+    """
+    Return the collection catalog for the current host and user,
+    only calling api.elastic.list() when the cached copy has expired.
+
+    Parameters
+    ----------
+    cmd_pointer : object
+        The command pointer object.
+    api : CpsApi
+        The Deep Search API.
+    refresh : bool
+        Ignore the cached catalog and fetch it again.
+    """
+    key = _cache_key(cmd_pointer)
+    ttl = get_setting("catalog_ttl")
+
+    with span("catalog_fetch", cached=True) as attrs, _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog and not refresh and catalog.is_fresh(ttl):
+            return catalog
+
+        attrs["cached"] = False
+        catalog = CollectionCatalog(call_with_retry(api.elastic.list))
+        attrs["collections"] = len(catalog.collections)
+        if ttl > 0:
+            _catalogs[key] = catalog
+        return catalog
+
+
+def clear_catalog_cache():
+    """Invalidate all cached collection catalogs, returns the number of catalogs removed"""
+    with _catalogs_lock:
+        count = len(_catalogs)
+        _catalogs.clear()
+        return count
+
+
+def _cache_key(cmd_pointer):
+    """The cache key for the logged in host & user"""
+    login_info = get_login_info(cmd_pointer)
+    return (login_info.get("host"), login_info.get("username"))
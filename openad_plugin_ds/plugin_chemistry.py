@@ -0,0 +1,258 @@
+"""Shared execution of Deep Search chemistry queries"""
+
+# OpenAD
+from openad.smols.smol_functions import canonicalize, valid_smiles
+
+# Plugin
+from openad_plugin_ds.plugin_login import get_login_info
+from openad_plugin_ds.plugin_retry import run_chemistry
+from openad_plugin_ds.plugin_profile import span
+from openad_plugin_ds.plugin_concurrency import map_concurrent, merge_concurrent
+from openad_plugin_ds.plugin_result_cache import get_result_cache, result_cache_key
+
+# Default number of results per query, as per the Deep Search toolkit
+DEFAULT_LIMIT = 10
+
+# Number of results fetched per request when paging through all results
+DEFAULT_PAGE_SIZE = 20
+
+
+def run_chemistry_query(cmd_pointer, api, query, query_input, limit: int = DEFAULT_LIMIT, offset: int = 0) -> list:
+    """
+    Run a chemistry query and return the results as a list of dictionaries,
+    served from the on-disk result cache when the same query was run before.
+
+    Parameters
+    ----------
+    cmd_pointer : object
+        The command pointer object.
+    api : CpsApi
+        The Deep Search API.
+    query : ChemistryQuery
+        The chemistry query, eg. CompoundsBySimilarity(structure=canonical_smiles).
+    query_input :
+        The normalized query input used for the cache key, eg. a canonical SMILES or a sorted list of patent IDs.
+    limit : int
+        The maximum number of results.
+    offset : int
+        The number of results to skip.
+    """
+    query_type = _query_type(query)
+    cache = get_result_cache(cmd_pointer)
+    key = result_cache_key(query_type, query_input, get_login_info(cmd_pointer).get("host"), limit, offset)
+
+    with span("chemistry_query", query=query_type, offset=offset, limit=limit, cached=True) as attrs:
+        rows = cache.get(key)
+        if rows is None:
+            attrs["cached"] = False
+            resp = run_chemistry(api, query, offset=offset, limit=limit)
+            rows = [_to_row(row_obj) for row_obj in resp]
+            cache.set(key, query_type, rows)
+        attrs["rows"] = len(rows)
+    return rows
+
+
+def iter_chemistry_pages(
+    cmd_pointer, api, query, query_input, page_size: int = DEFAULT_PAGE_SIZE, max_results: int = 0
+):
+    """
+    Page through the results of a chemistry query, yielding one list of result rows per page.
+    Every page is cached separately, so an interrupted run resumes from the result cache.
+
+    Paging stops when a page comes back incomplete, or once max_results rows were yielded.
+
+    Parameters
+    ----------
+    cmd_pointer : object
+        The command pointer object.
+    api : CpsApi
+        The Deep Search API.
+    query : ChemistryQuery
+        The chemistry query.
+    query_input :
+        The normalized query input used for the cache key.
+    page_size : int
+        The number of results fetched per request.
+    max_results : int
+        The maximum number of results, 0 for no maximum.
+    """
+    offset = 0
+    while True:
+        limit = page_size if not max_results else min(page_size, max_results - offset)
+        if limit <= 0:
+            return
+        rows = run_chemistry_query(cmd_pointer, api, query, query_input, limit=limit, offset=offset)
+        if rows:
+            yield rows
+        offset += len(rows)
+        if len(rows) < limit or (max_results and offset >= max_results):
+            return
+
+
+def fetch_chemistry_results(
+    cmd_pointer, api, query, query_input, limit: int = DEFAULT_LIMIT, page_size: int = DEFAULT_PAGE_SIZE
+) -> list:
+    """
+    Return up to `limit` result rows of a chemistry query, paging through
+    the results when the limit is larger than the page size.
+
+    Parameters
+    ----------
+    cmd_pointer : object
+        The command pointer object.
+    api : CpsApi
+        The Deep Search API.
+    query : ChemistryQuery
+        The chemistry query.
+    query_input :
+        The normalized query input used for the cache key.
+    limit : int
+        The maximum number of results, 0 to fetch all results.
+    page_size : int
+        The number of results fetched per request.
+    """
+    if 0 < limit <= page_size:
+        return run_chemistry_query(cmd_pointer, api, query, query_input, limit=limit)
+    pages = iter_chemistry_pages(cmd_pointer, api, query, query_input, page_size=page_size, max_results=limit)
+    return [row for page in pages for row in page]
+
+
+def run_chemistry_batch(
+    cmd_pointer,
+    api,
+    smiles_list: list,
+    make_query,
+    max_concurrency: int,
+    limit: int = DEFAULT_LIMIT,
+    page_size: int = DEFAULT_PAGE_SIZE,
+):
+    """
+    Run the same chemistry query for a list of SMILES concurrently.
+
+    The SMILES are canonicalized and deduplicated first, and the results are merged
+    into a single results table with an 'input_smiles' column holding the canonical input.
+
+    Returns a tuple: (results_table, results_per_input, invalid_smiles, errors)
+    - results_table: merged list of result rows
+    - results_per_input: dictionary of result rows per canonical input SMILES
+    - invalid_smiles: list of SMILES that could not be parsed
+    - errors: list of (canonical_smiles, error) tuples for failed queries
+
+    Parameters
+    ----------
+    cmd_pointer : object
+        The command pointer object.
+    api : CpsApi
+        The Deep Search API.
+    smiles_list : list
+        The input SMILES.
+    make_query : callable
+        Function that returns the chemistry query for a canonical SMILES,
+        eg. lambda smiles: CompoundsBySimilarity(structure=smiles)
+    max_concurrency : int
+        The maximum number of queries running at the same time.
+    limit : int
+        The maximum number of results per input SMILES, 0 to fetch all results.
+    page_size : int
+        The number of results fetched per request.
+    """
+
+    canonical_list, invalid_smiles = canonicalize_smiles_list(smiles_list)
+
+    def _run(canonical_smiles):
+        query = make_query(canonical_smiles)
+        return fetch_chemistry_results(cmd_pointer, api, query, canonical_smiles, limit=limit, page_size=page_size)
+
+    # Run the queries concurrently
+    results_per_input = {}
+    errors = []
+    for canonical_smiles, rows, err in map_concurrent(_run, canonical_list, max_concurrency):
+        if err:
+            errors.append((canonical_smiles, err))
+        else:
+            results_per_input[canonical_smiles] = rows
+
+    # Merge results in input order
+    results_table = [
+        {"input_smiles": canonical_smiles, **row}
+        for canonical_smiles in canonical_list
+        for row in results_per_input.get(canonical_smiles, [])
+    ]
+
+    return results_table, results_per_input, invalid_smiles, errors
+
+
+def iter_chemistry_batch_pages(
+    cmd_pointer,
+    api,
+    query_inputs: list,
+    make_query,
+    max_concurrency: int,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    max_results: int = 0,
+):
+    """
+    Page through the results of the same chemistry query for a list of inputs concurrently,
+    yielding (query_input, rows, error) tuples in order of arrival, one per page.
+
+    A failing query stops that input only: its error is yielded after the pages it returned.
+
+    Parameters
+    ----------
+    cmd_pointer : object
+        The command pointer object.
+    api : CpsApi
+        The Deep Search API.
+    query_inputs : list
+        The normalized query inputs, eg. canonical SMILES or batches of patent IDs.
+    make_query : callable
+        Function that returns the chemistry query for a query input.
+    max_concurrency : int
+        The maximum number of queries running at the same time.
+    page_size : int
+        The number of results fetched per request.
+    max_results : int
+        The maximum number of results per input, 0 for no maximum.
+    """
+    iterables = [
+        iter_chemistry_pages(cmd_pointer, api, make_query(query_input), query_input, page_size, max_results)
+        for query_input in query_inputs
+    ]
+    for i, rows, err in merge_concurrent(iterables, max_concurrency):
+        yield query_inputs[i], rows, err
+
+
+def canonicalize_smiles_list(smiles_list: list) -> tuple:
+    """
+    Canonicalize & deduplicate a list of SMILES, in input order.
+    Returns a tuple: (canonical_list, invalid_smiles)
+    """
+    invalid_smiles = []
+    canonical_list = []
+    seen = set()
+    for smiles in smiles_list:
+        smiles = str(smiles).strip()
+        if not valid_smiles(smiles):
+            invalid_smiles.append(smiles)
+            continue
+        canonical_smiles = canonicalize(smiles)
+        if canonical_smiles not in seen:
+            seen.add(canonical_smiles)
+            canonical_list.append(canonical_smiles)
+    return canonical_list, invalid_smiles
+
+
+def _query_type(query) -> str:
+    """Name of the query including nested queries, eg. DocumentsHaving.CompoundsBySubstructure"""
+    parts = [type(query).__name__]
+    nested = getattr(query, "documents", None) or getattr(query, "compounds", None)
+    if nested is not None:
+        parts.append(type(nested).__name__)
+    return ".".join(parts)
+
+
+def _to_row(row_obj) -> dict:
+    """Convert a result object to a results table row"""
+    row = row_obj.model_dump()
+    row.pop("persistent_id")
+    return row
@@ -0,0 +1,198 @@
+"""Bounded concurrent execution of Deep Search API calls"""
+
+import queue
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Seconds between checks for an abandoned consumer, while the prefetch queue is full
+_PREFETCH_POLL = 0.1
+
+
+def map_concurrent(fn, items: list, max_concurrency: int):
+    """
+    Call a function for every item using a bounded thread pool,
+    and yield (item, result, error) tuples in order of completion.
+
+    Errors are caught per item, so one failing call does not abort the others.
+    Every call runs in a copy of the caller's context, so context variables
+    such as the command's retry budget carry over to the worker threads.
+
+    Parameters
+    ----------
+    fn : callable
+        The function to call with each item.
+    items : list
+        The items to process.
+    max_concurrency : int
+        The maximum number of calls running at the same time.
+    """
+    if not items:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(items)))) as executor:
+        futures = {executor.submit(contextvars.copy_context().run, fn, item): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                yield item, future.result(), None
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                yield item, None, err
+
+
+def iter_in_context(iterator):
+    """
+    Return a generator advancing an iterator in a copy of the current context.
+
+    A generator returned by a command is consumed after the command returned, once the context
+    variables it ran with (its retry budget, profile and cancel event) were reset.
+    Capturing the context when the generator is returned keeps them set for every item.
+
+    Parameters
+    ----------
+    iterator : iterator
+        The items to yield, usually a generator of result pages.
+    """
+    ctx = contextvars.copy_context()
+
+    def _iterate():
+        try:
+            while True:
+                try:
+                    item = ctx.run(next, iterator)
+                except StopIteration:
+                    return
+                yield item
+        finally:
+            if hasattr(iterator, "close"):
+                ctx.run(iterator.close)
+
+    return _iterate()
+
+
+def prefetch(iterable, depth: int):
+    """
+    Iterate in a background thread, keeping up to `depth` items ready in a bounded queue,
+    so producing the next items (eg. fetching the next pages) overlaps with processing the current one.
+
+    The queue provides backpressure: the background thread waits once `depth` items are waiting,
+    so memory holds at most `depth` items besides the one being processed and the one waiting to be queued.
+    Errors raised while iterating are raised by the consumer, in order, after the items produced before them.
+    When the consumer stops early, the background thread stops before producing its next item.
+
+    The background thread runs in a copy of the caller's context, like map_concurrent().
+
+    Parameters
+    ----------
+    iterable : iterable
+        The items to produce, usually a generator of result pages.
+    depth : int
+        The maximum number of items produced ahead of the consumer, 0 disables prefetching.
+    """
+    if depth <= 0:
+        yield from iterable
+        return
+
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def _put(entry) -> bool:
+        """Put an entry in the queue, waiting for room unless the consumer stopped"""
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=_PREFETCH_POLL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce():
+        try:
+            for item in iterable:
+                if not _put((item, None)):
+                    return
+        except BaseException as err:  # pylint: disable=broad-exception-caught
+            _put((done, err))
+            return
+        _put((done, None))
+
+    producer = threading.Thread(
+        target=contextvars.copy_context().run, args=(_produce,), name="openad_ds_prefetch", daemon=True
+    )
+    producer.start()
+    try:
+        while True:
+            item, err = items.get()
+            if item is done:
+                if err is not None:
+                    raise err
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def merge_concurrent(iterables: list, max_concurrency: int, depth: int = 2):
+    """
+    Iterate over several iterables at the same time using a bounded thread pool,
+    and yield (index, item, error) tuples in order of production, where index is the position of the iterable.
+
+    Errors are caught per iterable, which stops that iterable only: its error is yielded after the items
+    it produced before, and the other iterables carry on. Like prefetch(), the shared queue provides
+    backpressure, holding up to `depth` items per worker, and the workers stop when the consumer stops early.
+    Every worker runs in a copy of the caller's context, like map_concurrent().
+
+    Parameters
+    ----------
+    iterables : list
+        The iterables to merge, usually generators of result pages.
+    max_concurrency : int
+        The maximum number of iterables consumed at the same time.
+    depth : int
+        The number of items each worker can produce ahead of the consumer.
+    """
+    if not iterables:
+        return
+
+    workers = max(1, min(max_concurrency, len(iterables)))
+    items = queue.Queue(maxsize=max(1, depth) * workers)
+    stop = threading.Event()
+    done = object()
+
+    def _put(entry) -> bool:
+        """Put an entry in the queue, waiting for room unless the consumer stopped"""
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=_PREFETCH_POLL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(index, iterable):
+        try:
+            for item in iterable:
+                if not _put((index, item, None)):
+                    return
+        except BaseException as err:  # pylint: disable=broad-exception-caught
+            _put((index, None, err))
+        _put((index, done, None))
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="openad_ds_merge")
+    for index, iterable in enumerate(iterables):
+        executor.submit(contextvars.copy_context().run, _produce, index, iterable)
+    try:
+        remaining = len(iterables)
+        while remaining:
+            index, item, err = items.get()
+            if item is done:
+                remaining -= 1
+            elif err is not None and not isinstance(err, Exception):
+                # Cancellation, eg. QueryCancelled, stops all iterables
+                raise err
+            else:
+                yield index, item, err
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,241 @@
+"""Page-at-a-time export of result tables to CSV, JSONL or Parquet files"""
+
+import os
+import json
+
+# OpenAD tools
+from openad_tools.output import output_error, output_success, output_table, output_warning
+
+# Plugin
+from openad_plugin_ds.plugin_msg import msg as plugin_msg
+from openad_plugin_ds.plugin_profile import span
+
+# Supported export formats, the first one is the default
+EXPORT_FORMATS = [".csv", ".jsonl", ".parquet"]
+
+
+def export_path(cmd_pointer, dest_file_path: str, available: bool = True) -> str:
+    """
+    Resolve a 'save as' path to an absolute path in the current workspace,
+    following the same rules as save_df_as_csv():
+    - Leading slashes and ../ are removed
+    - A .csv extension is added unless another supported format is requested
+    - Missing directories are created
+    - An available filename is picked if the file already exists, unless available is False
+
+    Parameters
+    ----------
+    cmd_pointer : object
+        The command pointer object.
+    dest_file_path : str
+        The destination file path, with the workspace as root.
+    available : bool
+        Pick an available filename when the file already exists.
+    """
+    # Remove leading slash
+    if dest_file_path.startswith("/"):
+        dest_file_path = dest_file_path[1:]
+
+    # Remove any number of ../ from the path to avoid storing files outside the workspace
+    while dest_file_path.startswith("../"):
+        dest_file_path = dest_file_path.replace("../", "")
+
+    # Ensure a supported extension
+    if os.path.splitext(dest_file_path)[1].lower() not in EXPORT_FORMATS:
+        dest_file_path = dest_file_path + EXPORT_FORMATS[0]
+
+    # Create destination file path directories if they don't exist
+    absolute_dest_file_path = os.path.join(cmd_pointer.workspace_path(), dest_file_path)
+    os.makedirs(os.path.dirname(absolute_dest_file_path), exist_ok=True)
+
+    # Find next available filename if the file already exists
+    base, extension = os.path.splitext(absolute_dest_file_path)
+    counter = 1
+    while available and os.path.exists(absolute_dest_file_path):
+        absolute_dest_file_path = f"{base}-{counter}{extension}"
+        counter += 1
+
+    return absolute_dest_file_path
+
+
+class PageWriter:
+    """
+    Append result tables to a file one page at a time,
+    so memory use is bounded by the page size rather than the result set.
+
+    The file format is determined by the file extension: .csv, .jsonl or .parquet.
+    CSV and Parquet columns are fixed by the first page written, columns that only
+    appear in later pages are dropped and listed in `dropped_columns`.
+    Use JSONL to keep every field of heterogeneous records.
+
+    Parquet export requires the optional pyarrow package.
+
+    To append to a partially written CSV or JSONL file, pass the columns
+    and number of rows that were written before.
+    """
+
+    def __init__(self, file_path: str, columns: list = None, rows_written: int = 0):
+        self.file_path = file_path
+        self.format = os.path.splitext(file_path)[1].lower()
+        if self.format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format '{self.format}', choose from: {', '.join(EXPORT_FORMATS)}")
+
+        self.columns = columns
+        self.dropped_columns = set()
+        self.rows_written = rows_written
+        self._parquet_writer = None
+
+        if self.format == ".parquet":
+            try:
+                import pyarrow  # pylint: disable=import-outside-toplevel, unused-import
+            except ImportError as err:
+                raise ImportError("Parquet export requires pyarrow, run: pip install pyarrow") from err
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, df):
+        """Append a page of results"""
+        if df.empty:
+            return
+
+        # Fix the columns to those of the first page
+        if self.format in [".csv", ".parquet"]:
+            if self.columns is None:
+                self.columns = list(df.columns)
+            else:
+                self.dropped_columns.update(col for col in df.columns if col not in self.columns)
+                df = df.reindex(columns=self.columns, fill_value="")
+
+        with span("export_page", format=self.format, rows=len(df)):
+            if self.format == ".csv":
+                df.to_csv(self.file_path, mode="a", header=self.rows_written == 0, index=False)
+            elif self.format == ".jsonl":
+                with open(self.file_path, "a", encoding="utf-8") as f:
+                    records = df.to_json(orient="records", lines=True, force_ascii=False)
+                    f.write(records if records.endswith("\n") else records + "\n")
+            elif self.format == ".parquet":
+                self._write_parquet(df)
+
+        self.rows_written += len(df)
+
+    def close(self):
+        """Finalize the file"""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def _write_parquet(self, df):
+        """Append a page as a Parquet row group, with all values stored as strings for a stable schema"""
+        import pyarrow as pa  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+        table = pa.Table.from_pandas(df.fillna("").astype(str), preserve_index=False)
+        if self._parquet_writer is None:
+            self._parquet_writer = pq.ParquetWriter(self.file_path, table.schema)
+        self._parquet_writer.write_table(table)
+
+
+class ExportCheckpoint:
+    """
+    Sidecar file next to an export, recording how far a paginated export got,
+    so an interrupted export can be resumed instead of started over.
+    """
+
+    def __init__(self, file_path: str):
+        self.path = file_path + ".checkpoint.json"
+
+    def load(self):
+        """Return the saved state, or None when there is no checkpoint"""
+        if not os.path.isfile(self.path):
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, state: dict):
+        """Save the state, replacing the previous checkpoint in one step so it is never half written"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, default=str)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        """Remove the checkpoint once the export is complete"""
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+def stream_pages(cmd_pointer, cmd: dict, df_pages, return_data: bool, style=None):
+    """
+    Consume a generator of result pages, one DataFrame per page:
+    - Append each page to the 'save as' file (CSV, JSONL or Parquet)
+    - Or, for the API, return the generator as is
+    - Or display each page as it arrives
+
+    Parameters
+    ----------
+    cmd_pointer : object
+        The command pointer object.
+    cmd : dict
+        The command dictionary.
+    df_pages : generator
+        The result pages.
+    return_data : bool
+        Return the generator instead of displaying the pages.
+    style : callable
+        Optional function to stylize a page before it is displayed.
+    """
+
+    # Append pages to file
+    if "save_as" in cmd:
+        return _stream_to_file(cmd_pointer, df_pages, str(cmd["results_file"]))
+
+    # Generator API
+    if return_data:
+        return df_pages
+
+    # Display pages as they arrive
+    row_count = 0
+    try:
+        for df in df_pages:
+            df.index += row_count
+            row_count += len(df)
+            output_table(style(df) if style else df, show_index=True, return_val=False)
+    except Exception as err:  # pylint: disable=broad-exception-caught
+        return output_error(plugin_msg("err_deepsearch", err))
+    if row_count == 0:
+        output_warning("Search returned no result", return_val=False)
+    return None
+
+
+def _stream_to_file(cmd_pointer, df_pages, results_file: str):
+    """Write the result pages to a file in the workspace as they arrive"""
+    file_path = export_path(cmd_pointer, results_file)
+    try:
+        writer = PageWriter(file_path)
+    except (ValueError, ImportError) as err:
+        return output_error(plugin_msg("err_export", err))
+    rel_path = os.path.relpath(file_path, cmd_pointer.workspace_path())
+    try:
+        with writer:
+            for df in df_pages:
+                writer.write(df)
+        # raise Exception("This is a test error")
+    except Exception as err:  # pylint: disable=broad-exception-caught
+        if writer.rows_written == 0:
+            return output_error(plugin_msg("err_deepsearch", err))
+        return output_error(plugin_msg("err_export_partial", rel_path, writer.rows_written, err))
+
+    # No results
+    if writer.rows_written == 0:
+        output_warning("Search returned no result", return_val=False)
+        return None
+
+    # Success
+    if writer.dropped_columns:
+        output_warning(plugin_msg("warn_columns_dropped", sorted(writer.dropped_columns)), return_val=False)
+    output_success(plugin_msg("success_results_streamed", writer.rows_written, rel_path), return_val=False)
+    return None
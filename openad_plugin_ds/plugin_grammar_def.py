@@ -35,6 +35,13 @@ a_s = py.CaselessKeyword("as")
 reset = py.CaselessKeyword("reset")
 login = py.CaselessKeyword("login")
 
+clear = py.CaselessKeyword("clear")
+cache = py.CaselessKeyword("cache")
+stats = py.CaselessKeyword("stats")
+status = py.CaselessKeyword("status")
+profile = py.CaselessKeyword("profile")
+last = py.CaselessKeyword("last")
+
 
 # Search collection
 clause_show = py.Optional(
@@ -43,6 +50,26 @@ clause_show = py.Optional(
     + py.OneOrMore(py.CaselessKeyword("data") | py.CaselessKeyword("docs"))("show")
     + py.Suppress(")")
 )
+clause_fields = py.Optional(
+    py.CaselessKeyword("fields").suppress()
+    + py.Suppress("(")
+    + py.OneOrMore(py.Word(py.alphanums + "._-*"))("fields")
+    + py.Suppress(")")
+)
+clause_highlight = py.Optional(
+    py.CaselessKeyword("highlight").suppress()
+    + py.Suppress("(")
+    + py.OneOrMore(py.Word(py.alphanums + "._-*"))("highlight")
+    + py.Suppress(")")
+)
+clause_aggregate = py.Optional(
+    py.CaselessKeyword("aggregate").suppress()
+    + py.Suppress("(")
+    + py.OneOrMore(py.Word(py.alphanums + "._-"))("aggregate")
+    + py.Suppress(")")
+)
 clause_estimate_only = py.Optional(py.CaselessKeyword("estimate").suppress() + py.CaselessKeyword("only").suppress())(
     "estimate_only"
 )
+clause_stream = py.Optional(py.CaselessKeyword("stream"))("stream")
+clause_resume = py.Optional(py.CaselessKeyword("resume"))("resume")
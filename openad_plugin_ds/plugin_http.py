@@ -0,0 +1,197 @@
+"""Shared, tunable HTTP connection pool for all requests made by the plugin"""
+
+import socket
+import threading
+import urllib3
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+# Plugin
+from openad_plugin_ds.plugin_profile import count
+from openad_plugin_ds.plugin_settings import get_setting
+
+_http_adapter = None
+_probe_session = None
+_pool_managers = {}
+_lock = threading.Lock()
+
+# Hosts that passed the probe during this session
+_valid_hosts = set()
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    Requests adapter with a default timeout and TCP keep-alive,
+    as requests itself never times out unless a timeout is passed with every call.
+    """
+
+    def __init__(self, timeout, socket_options, **kwargs):
+        self.timeout = timeout
+        self.socket_options = socket_options
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+    def send(self, request, timeout=None, **kwargs):  # pylint: disable=arguments-differ
+        response = super().send(request, timeout=timeout or self.timeout, **kwargs)
+        count("bytes_sent", len(request.body or b""))
+        if not kwargs.get("stream"):
+            # The session reads the body right after this anyway, it is read here to count the bytes received
+            count("bytes_received", len(response.content))
+        return response
+
+
+class CountingPoolManager(urllib3.PoolManager):
+    """urllib3 pool manager for the swagger clients, counting the bytes sent and received for the command profile"""
+
+    def urlopen(self, method, url, redirect=True, **kw):
+        response = super().urlopen(method, url, redirect=redirect, **kw)
+        count("bytes_sent", len(kw.get("body") or b""))
+        if kw.get("preload_content", True):
+            count("bytes_received", len(response.data or b""))
+        return response
+
+
+def get_http_adapter() -> PooledHTTPAdapter:
+    """Return the shared requests adapter, configured with the http_* settings"""
+    global _http_adapter  # pylint: disable=global-statement
+    with _lock:
+        if _http_adapter is None:
+            _http_adapter = PooledHTTPAdapter(
+                timeout=_timeout(),
+                socket_options=_socket_options(),
+                pool_connections=get_setting("http_pool_connections"),
+                pool_maxsize=get_setting("http_pool_maxsize"),
+                max_retries=_retries(),
+            )
+        return _http_adapter
+
+
+def configure_client(client):
+    """
+    Make a Deep Search client use the shared connection pools:
+    - The requests session used to run queries gets the shared adapter
+    - The swagger clients used for everything else get a shared, tuned urllib3 pool manager
+
+    Parameters
+    ----------
+    client : CpsApiClient
+        The Deep Search client.
+    """
+    _mount(client.session, get_http_adapter())
+    for swagger_client in [client.swagger_client, client.swagger_client_v2, client.user_swagger_client]:
+        rest_client = swagger_client.rest_client
+        if isinstance(rest_client.pool_manager, urllib3.ProxyManager):
+            continue
+        rest_client.pool_manager = _get_pool_manager(rest_client.pool_manager.connection_pool_kw)
+
+
+def reset_http_pool():
+    """
+    Close all pooled connections, called when logging out and when logging in to another host.
+    The pools are created again at the next login, with the current http_* settings.
+    """
+    global _http_adapter  # pylint: disable=global-statement
+    with _lock:
+        if _http_adapter is not None:
+            _http_adapter.close()
+        for pool_manager in _pool_managers.values():
+            pool_manager.clear()
+        _http_adapter = None
+        _pool_managers.clear()
+
+
+def probe_host(url: str) -> bool:
+    """
+    Check if a host is reachable, with a HEAD request that doesn't download the page.
+    Servers that don't support HEAD are probed with a streamed GET instead.
+
+    Successful probes are cached per host for the rest of the session.
+    The probe is not retried, so an unreachable host fails fast.
+
+    Parameters
+    ----------
+    url : str
+        The host URL, eg. https://sds.app.accelerate.science/
+    """
+    host = url.rstrip("/")
+    if host in _valid_hosts:
+        return True
+
+    session = _get_probe_session()
+    timeout = get_setting("host_probe_timeout")
+    try:
+        response = session.head(host, timeout=timeout, allow_redirects=True)
+        if response.status_code in [405, 501]:
+            with session.get(host, timeout=timeout, stream=True) as response:
+                pass
+    except requests.RequestException:
+        return False
+
+    if not response.ok:
+        return False
+    _valid_hosts.add(host)
+    return True
+
+
+def _get_probe_session() -> requests.Session:
+    """Return the session used to probe hosts, which doesn't retry"""
+    global _probe_session  # pylint: disable=global-statement
+    with _lock:
+        if _probe_session is None:
+            _probe_session = requests.Session()
+            _mount(_probe_session, HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0))
+        return _probe_session
+
+
+def _get_pool_manager(connection_pool_kw: dict) -> urllib3.PoolManager:
+    """Return a shared urllib3 pool manager for the given SSL configuration"""
+    ssl_kw = {
+        key: val
+        for key, val in connection_pool_kw.items()
+        if key in ["cert_reqs", "ca_certs", "cert_file", "key_file", "assert_hostname"]
+    }
+    key = tuple(sorted(ssl_kw.items()))
+    with _lock:
+        if key not in _pool_managers:
+            _pool_managers[key] = CountingPoolManager(
+                num_pools=get_setting("http_pool_connections"),
+                maxsize=get_setting("http_pool_maxsize"),
+                retries=_retries(),
+                timeout=urllib3.Timeout(
+                    connect=get_setting("http_connect_timeout"), read=get_setting("http_read_timeout")
+                ),
+                socket_options=_socket_options(),
+                **ssl_kw,
+            )
+        return _pool_managers[key]
+
+
+def _mount(session: requests.Session, adapter: HTTPAdapter):
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def _timeout() -> tuple:
+    """The (connect, read) timeout in seconds"""
+    return (get_setting("http_connect_timeout"), get_setting("http_read_timeout"))
+
+
+def _retries() -> urllib3.Retry:
+    """
+    Follow redirects, but never retry at the transport level: failed connections and server errors
+    are retried by plugin_retry.call_with_retry(), which owns the backoff, the retry budget of the command,
+    the rate limiter and the reported number of retries.
+    """
+    return urllib3.Retry(total=None, connect=0, read=0, status=0, other=0, redirect=5, raise_on_status=False)
+
+
+def _socket_options() -> list:
+    """Socket options for new connections, with TCP keep-alive unless disabled"""
+    socket_options = list(HTTPConnection.default_socket_options)
+    if get_setting("http_keepalive"):
+        socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    return socket_options
@@ -0,0 +1,41 @@
+"""Parsing of list inputs provided as a list, a CSV file or a dataframe"""
+
+# OpenAD tools
+from openad_tools.jupyter import col_from_df, csv_to_df
+
+
+def parse_input_list(cmd_pointer, cmd: dict, column_names: list) -> list:
+    """
+    Return the list of values provided by the command's list, file or dataframe clause.
+
+    When reading from a file or dataframe, the first of the given column names
+    that is found (case insensitive) and holds values is used.
+
+    Raises FileNotFoundError when the file does not exist,
+    and ValueError when none of the columns are found.
+
+    Parameters
+    ----------
+    cmd_pointer : object
+        The command pointer object.
+    cmd : dict
+        The command dictionary, with a 'list', 'filename' or 'df_name' key.
+    column_names : list
+        The lowercase column names to look for, in order of preference.
+    """
+    if "list" in cmd:
+        return list(cmd["list"])
+
+    if "filename" in cmd:
+        df = csv_to_df(cmd_pointer, cmd["filename"])
+    elif "df_name" in cmd:
+        df = cmd_pointer.api_variables[cmd["df_name"]]
+    else:
+        return []
+
+    df = df.rename(columns=str.lower)
+    for column_name in column_names:
+        values = col_from_df(df, column_name)
+        if values:
+            return values
+    raise ValueError(f"No column found named {', '.join(column_names)}")
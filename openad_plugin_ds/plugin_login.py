@@ -3,7 +3,7 @@
 import os
 import jwt
 import time
-import requests
+import threading
 import deepsearch as ds
 from datetime import datetime, timezone
 
@@ -16,6 +16,8 @@ from openad_tools.output import output_text, output_error, output_warning, outpu
 
 # Plugin
 from openad_plugin_ds.plugin_params import PLUGIN_NAME, PLUGIN_KEY
+from openad_plugin_ds.plugin_http import probe_host, configure_client, reset_http_pool
+from openad_plugin_ds.plugin_settings import get_setting
 
 DEFAULT_URL = "https://sds.app.accelerate.science/"
 API_CONFIG_BLANK = {
@@ -24,6 +26,73 @@ API_CONFIG_BLANK = {
     "verify_ssl": "False",
 }
 
+# Seconds before a failed background token refresh is attempted again, doubled after every failure
+REFRESH_BACKOFF = 30
+REFRESH_BACKOFF_MAX = 300
+
+
+class LoginSession:
+    """
+    In-memory Deep Search session, holding everything commands need after login.
+
+    Checking the session is a comparison against the token expiry, so the hot path
+    of a command never touches the credentials file or the network. When the token
+    gets close to its expiry, a new one is requested in a background thread.
+    """
+
+    def __init__(self, cmd_pointer, config, client, api, host: str, username: str, expiry: float):
+        self.cmd_pointer = cmd_pointer
+        self.config = config
+        self.client = client
+        self.api = api
+        self.host = host
+        self.username = username
+        self.expiry = expiry
+        self._refresh_lock = threading.Lock()
+        self._refresh_failures = 0
+        self._next_refresh = 0.0
+
+    def is_valid(self, now: float) -> bool:
+        """Check if the token is still valid"""
+        return self.expiry is not None and self.expiry > now
+
+    def needs_refresh(self, now: float) -> bool:
+        """Check if the token is about to expire, and a failed refresh is not backing off"""
+        return self.expiry - now < get_setting("login_refresh_margin") and now >= self._next_refresh
+
+    def refresh_in_background(self):
+        """Request a new token in a background thread, unless a refresh is already running"""
+        if self._refresh_lock.acquire(blocking=False):
+            threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _refresh(self):
+        """
+        Log in again with the stored configuration and swap in the new client.
+        On failure the current session is kept and the refresh backs off before it is attempted again,
+        once the token expires the next command falls back to the regular login procedure.
+        """
+        try:
+            client = ds.CpsApiClient(self.config)
+            configure_client(client)
+            api = ds.CpsApi(client)
+            self.client, self.api, self.expiry = client, api, _token_expiry(client)
+            self._refresh_failures = 0
+            _store_session(self)
+        except Exception:  # pylint: disable=broad-exception-caught
+            self._refresh_failures += 1
+            backoff = min(REFRESH_BACKOFF * 2 ** (self._refresh_failures - 1), REFRESH_BACKOFF_MAX)
+            self._next_refresh = time.time() + backoff
+        finally:
+            self._refresh_lock.release()
+
+
+# The current session, replaced at every login
+_session = None
+
+# Held while logging in, so concurrent commands (eg. gathered async calls) log in only once.
+# Reentrant, as a failed login can log in again after resetting the credentials.
+_login_lock = threading.RLock()
+
 
 def login(cmd_pointer, print_success=False):
     """
@@ -35,6 +104,34 @@ def login(cmd_pointer, print_success=False):
         The command pointer object
     """
 
+    # Fast path: valid in-memory session
+    if _use_session(cmd_pointer, print_success):
+        return
+
+    # Only one thread logs in at a time, the others wait and use the session it started
+    with _login_lock:
+        if _use_session(cmd_pointer, print_success):
+            return
+        return _login(cmd_pointer, print_success)
+
+
+def _use_session(cmd_pointer, print_success) -> bool:
+    """Use the in-memory session when it is valid, refreshing its token in the background when it expires soon"""
+    session = _session
+    now = time.time()
+    if session is None or session.cmd_pointer is not cmd_pointer or not session.is_valid(now):
+        return False
+    if session.needs_refresh(now):
+        session.refresh_in_background()
+    if print_success:
+        print_login_status(None, session.expiry)
+    return True
+
+
+def _login(cmd_pointer, print_success):
+    """Log in from the credentials file, prompting for credentials when there are none"""
+    global _session  # pylint: disable=global-statement
+
     # Check for existing credentials
     cred_file = os.path.expanduser(f"{cmd_pointer.home_dir}/deepsearch_api.cred")
     if not os.path.isfile(cred_file):
@@ -66,11 +163,15 @@ def login(cmd_pointer, print_success=False):
         now = datetime.timestamp(now)
         expiry_time = cmd_pointer.login_settings["expiry"][i]
 
-        # Success, already lopgged in
+        # Success, already logged in: start the in-memory session from the stored login,
+        # so the next commands take the fast path
         if expiry_time is not None and expiry_time > now:
-            if print_success:
-                print_login_status(None, expiry_time)
-            return
+            stored_session = _load_session(cmd_pointer, i)
+            if stored_session is not None:
+                _session = stored_session
+                if print_success:
+                    print_login_status(None, expiry_time)
+                return
 
     # Get login credentials
     try:
@@ -78,6 +179,10 @@ def login(cmd_pointer, print_success=False):
     except Exception:  # pylint: disable=broad-except
         return False, None
 
+    # Host override, eg. to run against a local mock server
+    if get_setting("host"):
+        cred_config["host"] = get_setting("host")
+
     # Validate credentials input
     if cred_config["host"].strip() == "" or cred_config["host"].strip() == "None":
         cred_config["host"] = DEFAULT_URL
@@ -91,26 +196,32 @@ def login(cmd_pointer, print_success=False):
         output_error("Invalid API key, try again", return_val=False)
         return False, None
 
+    # Don't keep the connections to the previous host open
+    if _session is not None and _session.host != cred_config["host"]:
+        reset_http_pool()
+
     # Login
     try:
         # Define login API
         config = ds.DeepSearchConfig(host=cred_config["host"], verify_ssl=False, auth=cred_config["auth"])
         client = ds.CpsApiClient(config)
+        configure_client(client)
         api = ds.CpsApi(client)
 
-        # Store login API
-        i = cmd_pointer.login_settings["toolkits"].index(PLUGIN_KEY)
-        cmd_pointer.login_settings["toolkits_api"][i] = api
-        cmd_pointer.login_settings["client"][i] = client
-
-        # Decode jwt token
-        cb = client.bearer_token_auth
-        bearer = cb.bearer_token
-        decoded_token = jwt.decode(bearer, options={"verify_at_hash": False, "verify_signature": False}, verify=False)
-
-        # Extract & store expiry time from token payload
-        expiry_time = decoded_token["exp"]
-        cmd_pointer.login_settings["expiry"][i] = expiry_time
+        # Extract expiry time from token payload
+        expiry_time = _token_expiry(client)
+
+        # Store login API & start the in-memory session
+        _session = LoginSession(
+            cmd_pointer,
+            config,
+            client,
+            api,
+            host=cred_config["host"],
+            username=cred_config["auth"]["username"],
+            expiry=expiry_time,
+        )
+        _store_session(_session)
 
         # Print login success message
         if login_reset is True or first_login is True:
@@ -121,6 +232,7 @@ def login(cmd_pointer, print_success=False):
 
     # Login fail
     except Exception as err:  # pylint: disable=broad-exception-caught
+        _session = None
         username = cred_config["auth"]["username"]
         output_error([f"Failed to log in to {PLUGIN_NAME} as <reset>{username}</reset>", err], return_val=False)
         if confirm_prompt("Reset credentials?"):
@@ -131,6 +243,11 @@ def login(cmd_pointer, print_success=False):
 def reset_login(cmd_pointer, print_feedback=True):
     """Remove the deepsearch credentials file"""
 
+    # End the in-memory session and close its connections
+    global _session  # pylint: disable=global-statement
+    _session = None
+    reset_http_pool()
+
     cred_path = os.path.expanduser(f"{cmd_pointer.home_dir}/deepsearch_api.cred")
     success = False
     if os.path.isfile(cred_path):
@@ -148,16 +265,65 @@ def reset_login(cmd_pointer, print_feedback=True):
         login(cmd_pointer)
 
 
+def get_session():
+    """Return the current login session, or None when not logged in"""
+    return _session
+
+
+def get_api(cmd_pointer):
+    """Return the Deep Search API of the current session"""
+    if _session is not None and _session.cmd_pointer is cmd_pointer:
+        return _session.api
+    return cmd_pointer.login_settings["toolkits_api"][cmd_pointer.login_settings["toolkits"].index(PLUGIN_KEY)]
+
+
+def get_login_info(cmd_pointer) -> dict:
+    """Return the host & username stored at login, used to key cached results"""
+    if _session is not None and _session.cmd_pointer is cmd_pointer:
+        return {"host": _session.host, "username": _session.username}
+    i = cmd_pointer.login_settings["toolkits"].index(PLUGIN_KEY)
+    return cmd_pointer.login_settings["session_vars"][i] or {}
+
+
+def _load_session(cmd_pointer, i: int):
+    """Return a session for the login stored in the OpenAD login settings, or None when it is incomplete"""
+    login_settings = cmd_pointer.login_settings
+    client = login_settings["client"][i]
+    api = login_settings["toolkits_api"][i]
+    session_vars = login_settings["session_vars"][i] or {}
+    if client is None or api is None:
+        return None
+    return LoginSession(
+        cmd_pointer,
+        client.config,
+        client,
+        api,
+        host=session_vars.get("host", client.config.host),
+        username=session_vars.get("username", getattr(client.config.auth, "username", None)),
+        expiry=login_settings["expiry"][i],
+    )
+
+
+def _store_session(session):
+    """Store the session in the OpenAD login settings, where the OpenAD core expects it"""
+    login_settings = session.cmd_pointer.login_settings
+    i = login_settings["toolkits"].index(PLUGIN_KEY)
+    login_settings["toolkits_api"][i] = session.api
+    login_settings["client"][i] = session.client
+    login_settings["expiry"][i] = session.expiry
+    login_settings["session_vars"][i] = {"host": session.host, "username": session.username}
+
+
+def _token_expiry(client) -> float:
+    """Decode the client's jwt token and return its expiry time"""
+    bearer = client.bearer_token_auth.bearer_token
+    decoded_token = jwt.decode(bearer, options={"verify_at_hash": False, "verify_signature": False}, verify=False)
+    return decoded_token["exp"]
+
+
 def _uri_valid(url: str) -> bool:
     """Check if a URI is valid"""
-    try:
-        request = requests.get(url, stream=True, timeout=10)
-    except:  # pylint: disable=bare-except
-        return False
-    if request.status_code == 200:
-        return True
-    else:
-        return False
+    return probe_host(url)
 
 
 def _get_creds(cred_file, cmd_pointer):
@@ -12,11 +12,20 @@ For example, instead of 'blood-brain barrier', search for:
 _messages = {
     # Shared / general
     "err_deepsearch": lambda err: ["There was an error calling Deep Search", err],
+    "warn_retries": lambda retry_count: f"Deep Search was busy or unreachable, {retry_count} requests had to be retried",
     "err_invalid_identifier": "Invalid molecule identifier",
     "err_file_not_found": lambda filename: f"File <yellow>{filename}</yellow> does not exist",
+    "err_invalid_page_size": "The <cmd>page_size</cmd> parameter must be at least 1",
+    "err_invalid_limit": "The <cmd>limit</cmd> parameter can't be negative, use 0 to fetch all results",
 
     # Find mols in patents
     "err_no_patent_ids_found": lambda src_type: f"Failed to find patent ids in the provided {src_type}",
+    "err_patent_batch_query": lambda patent_ids, err: [f"There was an error querying the patents <yellow>{', '.join(patent_ids)}</yellow>", err],
+
+    # Find mols similar / by substructure - batch mode
+    "err_no_smiles_found": lambda src_type: f"Failed to find SMILES in the provided {src_type}",
+    "err_smiles_query": lambda smiles, err: [f"There was an error querying <yellow>{smiles}</yellow>", err],
+    "warn_invalid_smiles": lambda smiles_list: "The following SMILES are invalid and were skipped:\n- " + "\n- ".join(smiles_list),
 
     # Find mols similar
     "err_no_similar_mols": "No similar molecules found",
@@ -40,6 +49,7 @@ _messages = {
 
     # List collections containing
     "err_runtime": err_runtime,
+    "err_collection_query": lambda collection_name, err: [f"There was an error querying <yellow>{collection_name}</yellow>", err],
     "err_no_matching_collections": lambda search_str: f"No collections found containing <yellow>{search_str}</yellow>",
     "success_matching_collections": lambda result_count, search_str: f"Found {result_count} collections containing <yellow>{search_str}</yellow>",
 
@@ -51,6 +61,26 @@ _messages = {
     # Search collections
     "err_invalid_collection_id": "Invalid <yellow>collection_name_or_key</yellow>, please choose from the following:",
     "err_invalid_elastic_id": "Invalid <yellow>elastic_id</yellow>, please choose from the following:",
+    "err_export": lambda err: ["Unable to export the results", err],
+    "warn_incomplete_results": lambda result_count: f"The search was interrupted, only the first {result_count} results were collected",
+    "warn_columns_dropped": lambda columns: "The following columns only appeared after the first page and were not saved, use a .jsonl file to keep all fields:\n- " + "\n- ".join(columns),
+    "err_export_partial": lambda file_path, row_count, err: [f"The export failed partway, <yellow>{file_path}</yellow> only holds the first {row_count} results", err],
+    "success_results_streamed": lambda row_count, file_path: f"{row_count} results were saved to <yellow>{file_path}</yellow>",
+    "err_resume_no_save_as": "The <cmd>resume</cmd> clause requires the <cmd>save as</cmd> clause with the file of the interrupted export",
+    "err_no_checkpoint": lambda file_path: f"No interrupted export found for <yellow>{file_path}</yellow>",
+    "err_checkpoint_mismatch": lambda file_path: f"The interrupted export to <yellow>{file_path}</yellow> was for a different search, resume it with the original command",
+    "err_resume_parquet": "Parquet exports can't be resumed, use a .csv or .jsonl file instead",
+    "err_export_interrupted": lambda file_path, row_count, err: [f"The export was interrupted after {row_count} results, run the same command with <cmd>resume</cmd> to continue where it stopped:\n<yellow>... resume save as '{file_path}'</yellow>", err],
+    "info_export_resumed": lambda row_count: f"Resuming the export after {row_count} results",
+    "err_slices_no_save_as": "The <cmd>slices</cmd> parameter requires the <cmd>save as</cmd> clause, sliced searches are exported to a file",
+    "err_resume_slices": "Sliced exports can't be resumed, remove the <cmd>resume</cmd> clause or the <cmd>slices</cmd> parameter",
+    "warn_no_date_slices": "None of the results have a publication date to split the search by, exporting them with a single cursor",
+    "info_slices": lambda result_count, slice_count: f"Exporting {result_count} results in {slice_count} slices by publication date",
+    "err_slice_query": lambda label, err: [f"There was an error exporting the results of slice <yellow>{label}</yellow>, they are missing from the file", err],
+    "warn_duplicates_dropped": lambda count: f"{count} results were found in more than one slice and were only saved once",
+
+    # Profile
+    "warn_no_profile": "No command was profiled yet, run a Deep Search command first",
 }
 
 
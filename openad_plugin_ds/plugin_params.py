@@ -19,6 +19,12 @@ CLAUSES = {
     # "using": "Note: The <cmd>USING</cmd> clause requires all enclosed parameters to be defined in the same order as listed below.",
     # "using": "Note: All enclosed parameters should be defined in the same order as listed below.",
     "save_as": "Use the <cmd>save as</cmd> clause to save the results as a csv file in your current workspace.",
+    "stream": "Use the <cmd>stream</cmd> clause to fetch the results one page at a time. Combined with <cmd>save as</cmd>, each page is appended to the file as soon as it arrives, so large result sets never need to fit in memory. Besides csv, the file can be saved as .jsonl or .parquet (requires pyarrow).",
+    "using_limit": lambda default_limit: f"""<cmd>limit=<integer></cmd>
+    The maximum number of results, defaults to {default_limit}. Use 0 to fetch all results.
+
+<cmd>page_size=<integer></cmd>
+    The number of results fetched per request when paging through the results, defaults to 20.""",
     "list_collections": "Run <cmd>list all collections</cmd> to list available collections.",
     "list_domains": "Use the command <cmd>list all collections</cmd> to find available domains.",
 }
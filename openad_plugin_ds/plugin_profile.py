@@ -0,0 +1,226 @@
+"""
+Per-command instrumentation: timed spans and counters for every step of a command,
+displayed by `ds profile last` and optionally exported to a JSON-lines file.
+
+Spans are only recorded while a command runs inside profile_command(),
+outside of it span() and count() do nothing. A streamed command's profile
+is kept open until its result pages are consumed, see CommandProfile.stream().
+"""
+
+import os
+import json
+import time
+import types
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Plugin
+from openad_plugin_ds.plugin_settings import get_setting
+from openad_plugin_ds.plugin_concurrency import iter_in_context
+
+# The profile of the command being executed, and the span currently open in it
+_current_profile = contextvars.ContextVar("profile", default=None)
+_current_span = contextvars.ContextVar("profile_span", default=None)
+
+# The profile of the last command that finished
+_last_profile = None
+
+
+class CommandProfile:
+    """
+    Timed spans and counters recorded while a single command runs.
+    Spans and counters are recorded from all threads the command fans out to.
+    """
+
+    def __init__(self, command: str):
+        self.command = command
+        self.trace_id = os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+        self.spans = []
+        self.counters = {}
+        self.streaming = False
+        self._start_perf = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_span(self, span: dict):
+        """Record a finished span"""
+        with self._lock:
+            self.spans.append(span)
+
+    def count(self, name: str, value: int = 1):
+        """Add to a counter, eg. the number of API calls or bytes received"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self, error: BaseException = None):
+        """Stop the clock on the command"""
+        self.duration = time.perf_counter() - self._start_perf
+        self.error = type(error).__name__ if error is not None else None
+
+    def stream(self, result):
+        """
+        Keep recording while the generator of result pages returned by a command is consumed,
+        and finish the profile once it is exhausted, fails or is closed.
+        Any other result is returned as is, and the profile finishes when profile_command() exits.
+        """
+        if not isinstance(result, types.GeneratorType):
+            return result
+        self.streaming = True
+        return self._finish_after(iter_in_context(result))
+
+    def _finish_after(self, pages):
+        error = None
+        try:
+            yield from pages
+        except GeneratorExit:
+            raise
+        except BaseException as err:
+            error = err
+            raise
+        finally:
+            _finish(self, error)
+
+    def summary(self) -> list:
+        """
+        Aggregate the spans by name, in order of first appearance.
+        Returns a list of dictionaries with the name, count, total, max & share of the command's duration.
+        """
+        rows = {}
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start"])
+        for span in spans:
+            row = rows.setdefault(span["name"], {"span": span["name"], "count": 0, "total_s": 0.0, "max_s": 0.0})
+            row["count"] += 1
+            row["total_s"] += span["duration"]
+            row["max_s"] = max(row["max_s"], span["duration"])
+        for row in rows.values():
+            row["share"] = row["total_s"] / self.duration if self.duration else None
+        return list(rows.values())
+
+    def to_otel(self) -> list:
+        """
+        Return the command and its spans as records named after the OpenTelemetry span fields,
+        so the exported file can be loaded by tools reading OTLP JSON spans.
+        """
+        root = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": None,
+            "name": f"ds.{self.command}",
+            "start_time_unix_nano": int(self.start * 1e9),
+            "end_time_unix_nano": int((self.start + (self.duration or 0)) * 1e9),
+            "status": "ERROR" if self.error else "OK",
+            "attributes": {"command": self.command, "error": self.error, **self.counters},
+        }
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start"])
+        records = [root]
+        for span in spans:
+            records.append(
+                {
+                    "trace_id": self.trace_id,
+                    "span_id": span["span_id"],
+                    "parent_span_id": span["parent_span_id"] or self.span_id,
+                    "name": span["name"],
+                    "start_time_unix_nano": int(span["start"] * 1e9),
+                    "end_time_unix_nano": int((span["start"] + span["duration"]) * 1e9),
+                    "status": "ERROR" if span["error"] else "OK",
+                    "attributes": span["attributes"],
+                }
+            )
+        return records
+
+
+@contextmanager
+def profile_command(command: str):
+    """
+    Record a profile of the command run inside this context,
+    which is kept as the last profile and exported when the profile_export setting is set.
+    """
+    profile = CommandProfile(command)
+    token = _current_profile.set(profile)
+    error = None
+    try:
+        yield profile
+    except BaseException as err:
+        error = err
+        raise
+    finally:
+        _current_profile.reset(token)
+        if not profile.streaming:
+            _finish(profile, error)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a step of the current command.
+    Yields the attributes dictionary, so attributes only known at the end of the step can be added to it.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield attributes
+        return
+
+    span_id = os.urandom(8).hex()
+    parent_span_id = _current_span.get()
+    token = _current_span.set(span_id)
+    start = time.time()
+    start_perf = time.perf_counter()
+    error = None
+    try:
+        yield attributes
+    except BaseException as err:
+        error = type(err).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        profile.add_span(
+            {
+                "name": name,
+                "span_id": span_id,
+                "parent_span_id": parent_span_id,
+                "start": start,
+                "duration": time.perf_counter() - start_perf,
+                "error": error,
+                "attributes": attributes,
+            }
+        )
+
+
+def count(name: str, value: int = 1):
+    """Add to a counter of the current command, if any"""
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.count(name, value)
+
+
+def get_last_profile() -> CommandProfile:
+    """Return the profile of the last command that finished, or None"""
+    return _last_profile
+
+
+def _finish(profile: CommandProfile, error: BaseException = None):
+    """Stop the clock on a command, keep it as the last profile and export it"""
+    global _last_profile  # pylint: disable=global-statement
+    profile.finish(error)
+    _last_profile = profile
+    _export(profile)
+
+
+def _export(profile: CommandProfile):
+    """Append the spans of a finished command to the JSON-lines file set by the profile_export setting"""
+    export_file = get_setting("profile_export")
+    if not export_file:
+        return
+    try:
+        with open(os.path.expanduser(export_file), "a", encoding="utf-8") as f:
+            for record in profile.to_otel():
+                f.write(json.dumps(record, default=str) + "\n")
+    except OSError:
+        # Profiling should never break a command
+        pass
@@ -0,0 +1,100 @@
+"""Client-side token-bucket rate limiter shared by all Deep Search API calls"""
+
+import time
+import threading
+from collections import deque
+
+# Plugin
+from openad_plugin_ds.plugin_settings import get_setting
+
+# Window in seconds over which the current request rate is measured
+UTILIZATION_WINDOW = 60
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to `burst` tokens, refilled at `rate` tokens per second.
+    Every API request takes one token, and waits for one when the bucket is empty,
+    so a burst of requests is let through at once while the sustained rate stays under `rate`.
+
+    Waiting requests reserve their token up front, so threads are served in order of arrival.
+    The rate and burst are read from the plugin settings on every request,
+    a rate of 0 disables the limiter.
+    """
+
+    def __init__(self):
+        self.tokens = None
+        self.updated = time.monotonic()
+        self.requests = 0
+        self.throttled = 0
+        self.wait_time = 0.0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token, waiting for one if needed, returns the number of seconds waited"""
+        rate = get_setting("rate_limit")
+        burst = max(1, get_setting("rate_limit_burst"))
+
+        with self._lock:
+            now = time.monotonic()
+            self._count(now)
+            if rate <= 0:
+                return 0.0
+
+            # Refill
+            if self.tokens is None:
+                self.tokens = float(burst)
+            self.tokens = min(float(burst), self.tokens + (now - self.updated) * rate)
+            self.updated = now
+
+            # Reserve a token, the bucket goes negative while requests are waiting
+            self.tokens -= 1
+            wait = -self.tokens / rate if self.tokens < 0 else 0.0
+            if wait:
+                self.throttled += 1
+                self.wait_time += wait
+
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def stats(self) -> dict:
+        """Return the configuration, the current utilization and the counters of this session"""
+        rate = get_setting("rate_limit")
+        burst = max(1, get_setting("rate_limit_burst"))
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            current_rate = len(self._recent) / UTILIZATION_WINDOW
+            tokens = burst if self.tokens is None else min(burst, self.tokens + (now - self.updated) * rate)
+            return {
+                "rate": rate,
+                "burst": burst,
+                "tokens": max(0.0, tokens) if rate > 0 else None,
+                "current_rate": current_rate,
+                "utilization": current_rate / rate if rate > 0 else None,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "wait_time": self.wait_time,
+            }
+
+    def _count(self, now: float):
+        """Record a request for the counters and the utilization window"""
+        self.requests += 1
+        self._recent.append(now)
+        self._prune(now)
+
+    def _prune(self, now: float):
+        """Drop requests that fell out of the utilization window"""
+        while self._recent and now - self._recent[0] > UTILIZATION_WINDOW:
+            self._recent.popleft()
+
+
+# Shared by all commands and threads
+_rate_limiter = TokenBucket()
+
+
+def get_rate_limiter() -> TokenBucket:
+    """Return the rate limiter shared by all Deep Search API calls"""
+    return _rate_limiter
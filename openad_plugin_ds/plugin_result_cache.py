@@ -0,0 +1,167 @@
+"""Persistent on-disk cache for chemistry query results"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Plugin
+from openad_plugin_ds.plugin_settings import get_setting
+
+CACHE_FILENAME = ".deepsearch_cache.sqlite"
+
+# One cache per workspace, which also keeps its hits & misses for the session
+_caches = {}
+_caches_lock = threading.Lock()
+_counters_lock = threading.Lock()
+
+
+def result_cache_key(query_type: str, query_input, host: str, limit, offset: int = 0) -> str:
+    """
+    Return a content-addressed key for a query.
+
+    Parameters
+    ----------
+    query_type : str
+        The type of query, eg. "CompoundsBySimilarity".
+    query_input :
+        The normalized query input, eg. a canonical SMILES or a sorted list of patent IDs.
+    host : str
+        The Deep Search host.
+    limit : int
+        The maximum number of results requested.
+    offset : int
+        The number of results skipped, for paginated queries.
+    """
+    content = json.dumps([query_type, query_input, host, limit, offset], sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    SQLite-backed cache of query results, stored in the workspace.
+
+    Entries expire after the `result_cache_ttl` setting (seconds), and the least recently
+    used entries are evicted once the total size exceeds `result_cache_max_mb`.
+    A new connection is opened for every operation, so the cache can be used from worker threads.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.counters = {"hits": 0, "misses": 0}
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    query_type TEXT,
+                    created REAL,
+                    accessed REAL,
+                    size INTEGER,
+                    payload TEXT
+                )""")
+
+    @property
+    def enabled(self) -> bool:
+        return get_setting("result_cache_ttl") > 0
+
+    def get(self, key: str):
+        """Return the cached rows for a key, or None when missing or expired"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._connect() as conn:
+            entry = conn.execute("SELECT created, payload FROM results WHERE key = ?", (key,)).fetchone()
+            if entry and now - entry[0] < get_setting("result_cache_ttl"):
+                conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+                self._count("hits")
+                return json.loads(entry[1])
+            if entry:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, query_type: str, rows: list):
+        """Store the rows for a key, then evict the least recently used entries if needed"""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        payload = json.dumps(rows, default=str)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (key, query_type, now, now, len(payload), payload),
+            )
+            self._evict(conn)
+
+    def stats(self) -> dict:
+        """Return the number of entries & total size, overall and per query type"""
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            per_type = conn.execute(
+                "SELECT query_type, COUNT(*), SUM(size) FROM results GROUP BY query_type ORDER BY query_type"
+            ).fetchall()
+        return {
+            "path": self.db_path,
+            "entries": entries,
+            "size": size,
+            "per_type": per_type,
+            "hits": self.counters["hits"],
+            "misses": self.counters["misses"],
+        }
+
+    def clear(self) -> int:
+        """Remove all entries, returns the number of entries removed"""
+        with self._connect() as conn:
+            count = conn.execute("DELETE FROM results").rowcount
+        with self._connect() as conn:
+            conn.execute("VACUUM")
+        return count
+
+    def _evict(self, conn):
+        """Delete the least recently used entries until the cache fits the maximum size"""
+        max_size = get_setting("result_cache_max_mb") * 1024 * 1024
+        total = 0
+        evict = []
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY accessed DESC"):
+            total += size
+            if total > max_size:
+                evict.append((key,))
+        if evict:
+            conn.executemany("DELETE FROM results WHERE key = ?", evict)
+
+    def _count(self, counter):
+        with _counters_lock:
+            self.counters[counter] += 1
+
+    def _connect(self):
+        return _Connection(self.db_path)
+
+
+class _Connection:
+    """Context manager that commits and closes a SQLite connection"""
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, timeout=10)
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.conn.commit()
+        self.conn.close()
+
+
+def get_result_cache(cmd_pointer) -> ResultCache:
+    """Return the result cache of the current workspace, created on first use"""
+    workspace_path = cmd_pointer.workspace_path()
+    with _caches_lock:
+        cache = _caches.get(workspace_path)
+        if cache is None:
+            os.makedirs(workspace_path, exist_ok=True)
+            cache = _caches[workspace_path] = ResultCache(os.path.join(workspace_path, CACHE_FILENAME))
+        return cache
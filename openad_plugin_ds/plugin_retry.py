@@ -0,0 +1,207 @@
+"""Retry layer around Deep Search API calls, with capped exponential backoff, jitter and per-command budgets"""
+
+import time
+import types
+import random
+import functools
+import threading
+import contextvars
+import urllib3
+import requests
+from email.utils import parsedate_to_datetime
+
+# OpenAD
+from openad.app.global_var_lib import GLOBAL_SETTINGS
+
+# OpenAD tools
+from openad_tools.output import output_warning
+
+# Plugin
+from openad_plugin_ds.plugin_msg import msg as plugin_msg
+from openad_plugin_ds.plugin_async import check_cancelled
+from openad_plugin_ds.plugin_concurrency import iter_in_context
+from openad_plugin_ds.plugin_profile import count, span
+from openad_plugin_ds.plugin_settings import get_setting
+from openad_plugin_ds.plugin_rate_limit import get_rate_limiter
+
+# Deep Search
+from deepsearch.chemistry.queries import query_chemistry
+
+# HTTP status codes worth retrying: rate limited or temporarily unavailable
+RETRYABLE_STATUS = [429, 502, 503, 504]
+
+# The retry budget of the command being executed
+_current_budget = contextvars.ContextVar("retry_budget", default=None)
+
+
+class RetryBudget:
+    """
+    Number of retries a single command is allowed to spend across all its API calls,
+    so a command hitting a struggling server gives up instead of retrying every call.
+    The budget is shared between threads.
+    """
+
+    def __init__(self, max_retries: int):
+        self.max_retries = max_retries
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def consume(self) -> bool:
+        """Take one retry from the budget, returns False when it is exhausted"""
+        with self._lock:
+            if self.retries >= self.max_retries:
+                return False
+            self.retries += 1
+            return True
+
+
+def with_retry_budget(fn):
+    """
+    Decorator for command implementations: run the command with its own retry budget,
+    report the number of retries in the CLI and in the `retries` attribute of a returned DataFrame.
+
+    When the command returns a generator of result pages, the budget stays set until it is consumed,
+    and every page holds the number of retries so far.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        budget = RetryBudget(get_setting("retry_budget"))
+        token = _current_budget.set(budget)
+        try:
+            result = fn(*args, **kwargs)
+            if isinstance(result, types.GeneratorType):
+                return _stream_with_budget(iter_in_context(result), budget)
+        finally:
+            _current_budget.reset(token)
+
+        if hasattr(result, "attrs"):
+            result.attrs["retries"] = budget.retries
+        _report_retries(budget)
+        return result
+
+    return wrapper
+
+
+def _stream_with_budget(pages, budget: RetryBudget):
+    """Yield the pages of a streamed command, and report its retries once they are consumed"""
+    for page in pages:
+        if hasattr(page, "attrs"):
+            page.attrs["retries"] = budget.retries
+        yield page
+    _report_retries(budget)
+
+
+def _report_retries(budget: RetryBudget):
+    if budget.retries and GLOBAL_SETTINGS["display"] != "api":
+        output_warning(plugin_msg("warn_retries", budget.retries), return_val=False)
+
+
+def call_with_retry(fn, *args, **kwargs):
+    """
+    Call a function, retrying transient errors with capped exponential backoff and full jitter.
+    A Retry-After header sent by the server takes precedence over the backoff delay.
+
+    Retries count against the retry budget of the current command, if any.
+    Every attempt goes through the shared rate limiter, so the API quota is respected across commands.
+    When the command runs as an async call that was cancelled, QueryCancelled is raised before the next attempt.
+    Every attempt is recorded as an api_call span in the profile of the command.
+    """
+    max_attempts = max(1, get_setting("retry_max_attempts"))
+    for attempt in range(1, max_attempts + 1):
+        check_cancelled()
+        wait = get_rate_limiter().acquire()
+        check_cancelled()
+        count("api_calls")
+        if wait:
+            count("throttled")
+        try:
+            with span("api_call", call=getattr(fn, "__qualname__", str(fn)), attempt=attempt, throttled_s=wait):
+                return fn(*args, **kwargs)
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            if attempt == max_attempts or not is_retryable(err):
+                raise
+            budget = _current_budget.get()
+            if budget is not None and not budget.consume():
+                raise
+            count("retries")
+            time.sleep(_retry_delay(err, attempt))
+
+
+def is_retryable(err: Exception) -> bool:
+    """Check if an error is transient: a connection error, a timeout, or a retryable HTTP status"""
+    if isinstance(err, (requests.ConnectionError, requests.Timeout)):
+        return True
+    # The swagger clients raise urllib3 errors for failed connections
+    if isinstance(
+        err, (urllib3.exceptions.MaxRetryError, urllib3.exceptions.ProtocolError, urllib3.exceptions.TimeoutError)
+    ):
+        return True
+    return _status_code(err) in RETRYABLE_STATUS
+
+
+def run_query(api, query):
+    """Run a Deep Search query, retrying transient errors"""
+    return call_with_retry(api.queries.run, query)
+
+
+def iter_query_pages(api, query):
+    """
+    Run a paginated Deep Search query and yield the result of every page, retrying each page separately
+    so a transient error doesn't lose the pages already fetched.
+
+    This replaces api.queries.run_paginated_query(), which yields the last page twice.
+    """
+    if query.paginated_task is None:
+        raise ValueError("No paginated task set, set one on 'query.paginated_task'")
+
+    task = query.paginated_task
+    page = 0
+    while True:
+        page += 1
+        with span("page_fetch", page=page) as attrs:
+            result = run_query(api, query)
+            attrs["hits"] = len(result.outputs.get("data_outputs") or [])
+        yield result
+        if task.id not in result.next_pages:
+            return
+        task.parameters.update(result.next_pages[task.id])
+
+
+def run_chemistry(api, query, offset: int = 0, limit: int = 10):
+    """Run a Deep Search chemistry query, retrying transient errors"""
+    return call_with_retry(query_chemistry, api, query, offset=offset, limit=limit)
+
+
+def _status_code(err: Exception):
+    """The HTTP status code of a failed request, from requests or the swagger clients"""
+    response = getattr(err, "response", None)
+    if response is not None:
+        return getattr(response, "status_code", None)
+    return getattr(err, "status", None)
+
+
+def _retry_delay(err: Exception, attempt: int) -> float:
+    """Seconds to wait before the next attempt"""
+    max_delay = get_setting("retry_max_delay")
+    retry_after = _retry_after(err)
+    if retry_after is not None:
+        return min(retry_after, max_delay)
+    return random.uniform(0, min(max_delay, get_setting("retry_base_delay") * 2 ** (attempt - 1)))
+
+
+def _retry_after(err: Exception):
+    """Parse the Retry-After header of a failed request, in seconds or as an HTTP date"""
+    response = getattr(err, "response", None)
+    headers = getattr(response, "headers", None) or getattr(err, "headers", None) or {}
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,53 @@
+"""User-configurable settings for the Deep Search plugin"""
+
+import os
+
+# Default values
+# Each setting can be overridden with an environment variable
+# named after the setting, eg. OPENAD_DS_CATALOG_TTL=600
+SETTINGS_DEFAULTS = {
+    "host": "",  # Deep Search host to use instead of the one in the credentials file, eg. a local mock server
+    "catalog_ttl": 3600,  # Seconds before the collection catalog is fetched again, 0 disables caching
+    "max_concurrency": 8,  # Default number of queries sent at the same time by commands that fan out
+    "result_cache_ttl": 604800,  # Seconds before cached chemistry results expire, 0 disables the result cache
+    "result_cache_max_mb": 100,  # Maximum size of the result cache, least recently used results are evicted first
+    "http_pool_connections": 10,  # Number of hosts to keep a connection pool for
+    "http_pool_maxsize": 32,  # Maximum number of open connections per host, should be at least max_concurrency
+    "http_keepalive": True,  # Enable TCP keep-alive on pooled connections
+    "http_connect_timeout": 10,  # Seconds to wait for a connection to be established
+    "http_read_timeout": 300,  # Seconds to wait for the server to respond
+    "host_probe_timeout": 3,  # Seconds to wait for the host to respond when validating it at login
+    "retry_max_attempts": 5,  # Attempts per API call before giving up on transient errors (429, 5xx, timeouts)
+    "retry_base_delay": 0.5,  # Seconds before the first retry, doubled for every next attempt, with random jitter
+    "retry_max_delay": 30.0,  # Maximum seconds between attempts, also caps the server's Retry-After
+    "retry_budget": 20,  # Maximum number of retries across all API calls of a single command
+    "login_refresh_margin": 300,  # Seconds before the token expires when it is refreshed in the background
+    "rate_limit": 0.0,  # Maximum sustained number of API requests per second across all commands, 0 disables the limit
+    "rate_limit_burst": 10,  # Number of API requests that can be sent at once before the rate limit kicks in
+    "prefetch_depth": 2,  # Number of result pages fetched in the background while the current page is processed, 0 disables prefetching
+    "patent_batch_size": 1,  # Number of patent IDs sent per query when searching for molecules in patents
+    "profile_export": "",  # JSON-lines file every command's profile spans are appended to, empty disables the export
+}
+
+
+def get_setting(name: str):
+    """
+    Return the current value of a plugin setting.
+
+    Parameters
+    ----------
+    name : str
+        The name of the setting, as listed in SETTINGS_DEFAULTS.
+    """
+    default = SETTINGS_DEFAULTS[name]
+    env_val = os.environ.get(f"OPENAD_DS_{name.upper()}")
+    if env_val is None:
+        return default
+    return _cast(env_val, default)
+
+
+def _cast(value, default):
+    """Cast a value to the type of the default value"""
+    if isinstance(default, bool):
+        return str(value).lower() in ["1", "true", "yes", "on"]
+    return type(default)(value)
@@ -0,0 +1,353 @@
+"""
+Benchmark every `ds` command end-to-end against the local mock Deep Search server.
+
+Every command is parsed with the plugin grammar and executed through
+OpenADPlugin.PLUGIN_OBJECTS[...].exec_command(), in API display mode.
+Every scenario runs in a fresh interpreter against a fresh mock server, and measures:
+- parse_ms          Time to parse the command with the plugin grammar (median)
+- first_row_s       Time to the first result row, for streamed results
+- wall_s            Total time to execute the command
+- peak_rss_mb       Peak resident memory of the process
+- rows / rows_per_s Number of result rows, and throughput
+- api_requests      Number of API requests served by the mock server
+
+Scenarios scale the number of hits from 10 to 100k (search collection, chemistry)
+and the number of collections from 5 to 500 (collection listing & search).
+The result cache, the collection catalog cache and the client-side rate limiter are disabled,
+so every scenario measures the plugin and not the cache or the limiter.
+Results are written as JSON, compare them between commits with --compare.
+
+Usage:
+    python testing/bench_commands.py [--quick] [--latency 0.0] [--rate-limit 0] [--output bench_commands.json]
+    python testing/bench_commands.py --compare bench_before.json [--threshold 0.1]
+
+testing/bench_reference.json holds a full run with the default options, to compare against with --compare.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import urllib.request
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTING_DIR)
+sys.path.insert(0, TESTING_DIR)
+
+from mock_ds_server import start_mock_server  # pylint: disable=wrong-import-position
+
+HIT_COUNTS = [10, 100, 1000, 10000, 100000]
+COLLECTION_COUNTS = [5, 50, 500]
+QUICK_HIT_COUNTS = [10, 1000]
+QUICK_COLLECTION_COUNTS = [5, 50]
+
+# Number of results served to commands that don't scale with the number of hits
+DEFAULT_RECORDS = 1000
+
+# Number of parses to take the median parse time from
+PARSE_RUNS = 20
+
+
+def scenarios(quick: bool = False) -> list:
+    """List the scenarios: a name, the command, and the number of records & collections served by the mock"""
+    hit_counts = QUICK_HIT_COUNTS if quick else HIT_COUNTS
+    collection_counts = QUICK_COLLECTION_COUNTS if quick else COLLECTION_COUNTS
+
+    def _scenario(name, command, records=DEFAULT_RECORDS, collections=0):
+        return {"name": name, "command": command, "records": records, "collections": collections}
+
+    result = []
+
+    # Collections
+    for n in collection_counts:
+        result += [
+            _scenario(f"list_all_collections[{n}]", "ds list all collections", collections=n),
+            _scenario(f"list_collections_containing[{n}]", "ds list collections containing 'power'", collections=n),
+        ]
+    result += [
+        _scenario("list_all_domains", "ds list all domains"),
+        _scenario("list_collection_details", "ds list collection details 'arxiv-abstract'"),
+        _scenario("list_collections_for_domain", "ds list collections for domain 'Chemistry'"),
+    ]
+
+    # Search collection
+    for n in hit_counts:
+        result += [
+            _scenario(f"search_collection[{n}]", "ds search collection 'arxiv-abstract' for 'power'", records=n),
+            _scenario(
+                f"search_collection_stream[{n}]", "ds search collection 'arxiv-abstract' for 'power' stream", records=n
+            ),
+            _scenario(
+                f"search_collection_docs[{n}]",
+                "ds search collection 'arxiv-abstract' for 'power' show (docs)",
+                records=n,
+            ),
+        ]
+
+    # Chemistry
+    for n in hit_counts[:-1]:
+        result += [
+            _scenario(
+                f"find_mols_similar[{n}]",
+                "ds search for molecules similar to CC1=CCC2CC1C2(C)C USING (limit=0 page_size=100)",
+                records=n,
+            ),
+        ]
+    result += [
+        _scenario("find_mols_substruct", "ds search for molecules with substructure C1=CCCCC1"),
+        _scenario("find_patents", "ds search for patents containing molecule CC1=CCC2CC1C2(C)C"),
+        _scenario(
+            "find_mols_in_patents",
+            "ds search for molecules in patents from list ['CN108473493B','US20190023713A1','US10745403B2']",
+        ),
+        _scenario(
+            "find_mols_similar_batch",
+            "ds search for molecules similar to list ['CC1=CCC2CC1C2(C)C','C1=CCCCC1','CC(=CCC/C(=C/CO)/C)C']",
+        ),
+    ]
+
+    # System
+    result += [
+        _scenario("cache_stats", "ds cache stats"),
+        _scenario("status", "ds status"),
+    ]
+    return result
+
+
+# Child process
+# -------------
+
+
+class BenchCmdPointer:
+    """The attributes of the OpenAD command pointer used by the plugin"""
+
+    def __init__(self, home_dir: str):
+        self.home_dir = home_dir
+        self.login_settings = {
+            "toolkits": [],
+            "toolkits_details": [],
+            "toolkits_api": [],
+            "client": [],
+            "expiry": [],
+            "session_vars": [],
+        }
+
+    def workspace_path(self):
+        return os.path.join(self.home_dir, "workspace")
+
+
+def run_scenario(scenario: dict, home_dir: str) -> dict:
+    """Parse & execute a command in the current process, and return its measurements"""
+    import resource  # pylint: disable=import-outside-toplevel
+    from openad.app.global_var_lib import GLOBAL_SETTINGS  # pylint: disable=import-outside-toplevel
+    from openad.helpers.credentials import write_credentials  # pylint: disable=import-outside-toplevel
+    from openad_plugin_ds.main import OpenADPlugin  # pylint: disable=import-outside-toplevel
+    from openad_plugin_ds.plugin_login import login  # pylint: disable=import-outside-toplevel
+
+    GLOBAL_SETTINGS["display"] = "api"
+    cmd_pointer = BenchCmdPointer(home_dir)
+    write_credentials(
+        {
+            "host": os.environ["OPENAD_DS_HOST"],
+            "auth": {"username": "bench", "api_key": "bench"},
+            "verify_ssl": "False",
+        },
+        os.path.join(home_dir, "deepsearch_api.cred"),
+    )
+    login(cmd_pointer)
+
+    # Parse
+    plugin = OpenADPlugin()
+    statement, parser = _parse(plugin, scenario["command"])
+    parse_times = []
+    for _ in range(PARSE_RUNS):
+        start = time.perf_counter()
+        statement.parseString(scenario["command"], parseAll=True)
+        parse_times.append(time.perf_counter() - start)
+
+    # Execute, consuming streamed results page by page
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    result = plugin.PLUGIN_OBJECTS[parser.getName()].exec_command(cmd_pointer, parser)
+    first_row = None
+    rows = 0
+    if hasattr(result, "__next__"):
+        for df in result:
+            if first_row is None and len(df):
+                first_row = time.perf_counter() - start
+            rows += len(df)
+    elif result is not None and hasattr(result, "__len__"):
+        rows = len(result)
+    wall = time.perf_counter() - start
+    if first_row is None and rows:
+        first_row = wall
+
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        "parse_ms": statistics.median(parse_times) * 1000,
+        "first_row_s": first_row,
+        "wall_s": wall,
+        "peak_rss_mb": peak_rss * rss_unit / 1024 / 1024,
+        "rss_growth_mb": (peak_rss - rss_before) * rss_unit / 1024 / 1024,
+        "rows": rows,
+        "rows_per_s": rows / wall if wall else None,
+    }
+
+
+def _parse(plugin, command: str):
+    """Find the plugin statement that parses a command, return it with the parse results"""
+    for statement in plugin.statements:
+        try:
+            return statement, statement.parseString(command, parseAll=True)
+        except Exception:  # pylint: disable=broad-exception-caught
+            continue
+    raise ValueError(f"No plugin command matches: {command}")
+
+
+# Parent process
+# --------------
+
+
+def run_all(args) -> dict:
+    """Run every scenario in a fresh interpreter against its own mock server"""
+    results = []
+    for scenario in scenarios(args.quick):
+        if args.filter and args.filter not in scenario["name"]:
+            continue
+
+        server = start_mock_server(
+            latency=args.latency,
+            max_page_size=args.max_page_size,
+            records=scenario["records"],
+            collections=scenario["collections"],
+        )
+        try:
+            with tempfile.TemporaryDirectory() as home_dir:
+                env = {
+                    **os.environ,
+                    "PYTHONPATH": os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")])),
+                    "OPENAD_DS_HOST": server.url,
+                    "OPENAD_DS_RESULT_CACHE_TTL": "0",
+                    "OPENAD_DS_CATALOG_TTL": "0",
+                    "OPENAD_DS_RATE_LIMIT": str(args.rate_limit),
+                }
+                proc = subprocess.run(
+                    [sys.executable, __file__, "--child", json.dumps(scenario), "--home", home_dir],
+                    capture_output=True,
+                    text=True,
+                    env=env,
+                    check=False,
+                )
+            if proc.returncode != 0:
+                result = {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "Failed"}
+            else:
+                result = json.loads(proc.stdout.strip().splitlines()[-1])
+            result["api_requests"] = _mock_stats(server.url)["total"]
+        finally:
+            server.shutdown()
+
+        results.append({**scenario, **result})
+        _print_result(results[-1])
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "latency": args.latency,
+        "rate_limit": args.rate_limit,
+        "results": results,
+    }
+
+
+def compare(baseline_file: str, current: dict, threshold: float) -> int:
+    """Print the wall time of every scenario against a baseline, returns the number of regressions"""
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline_run = json.load(f)
+    baseline = {result["name"]: result for result in baseline_run["results"]}
+
+    regressions = 0
+    print(f"\nCompared to {baseline_file}:")
+    for setting in ("latency", "rate_limit"):
+        if baseline_run.get(setting) != current[setting]:
+            print(f"Warning: {setting} was {baseline_run.get(setting)} in the baseline, now {current[setting]}")
+    for result in current["results"]:
+        before = baseline.get(result["name"])
+        if not before or "wall_s" not in before or "wall_s" not in result:
+            continue
+        change = result["wall_s"] / before["wall_s"] - 1 if before["wall_s"] else 0
+        flag = ""
+        if change > threshold:
+            flag = "  <- regression"
+            regressions += 1
+        print(f"{result['name']:<40} {before['wall_s']:9.3f}s -> {result['wall_s']:9.3f}s {change:+7.1%}{flag}")
+    return regressions
+
+
+def _print_result(result: dict):
+    if "error" in result:
+        print(f"{result['name']:<40} ERROR {result['error']}")
+        return
+    first_row = f"{result['first_row_s']:.3f}s" if result["first_row_s"] is not None else "-"
+    rows_per_s = f"{result['rows_per_s']:.0f}" if result["rows_per_s"] else "-"
+    print(
+        f"{result['name']:<40} parse {result['parse_ms']:6.2f}ms  first row {first_row:>8}"
+        f"  wall {result['wall_s']:8.3f}s  rows {result['rows']:>7} ({rows_per_s:>7}/s)"
+        f"  peak {result['peak_rss_mb']:7.1f}MB  requests {result['api_requests']}"
+    )
+
+
+def _mock_stats(url: str) -> dict:
+    with urllib.request.urlopen(f"{url}/_mock/stats", timeout=10) as response:
+        return json.loads(response.read())
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="Only run the smaller scenarios")
+    parser.add_argument("--filter", help="Only run the scenarios with this text in their name")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added by the mock to every API response")
+    parser.add_argument(
+        "--rate-limit", type=float, default=0.0, help="Client-side requests per second, 0 to measure without limiter"
+    )
+    parser.add_argument("--max-page-size", type=int, default=0, help="Maximum page size served by the mock")
+    parser.add_argument("--output", default="bench_commands.json", help="File to write the results to")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare the results with a previous results file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown reported as regression, eg. 0.1")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--home", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Run a single scenario, called by the parent process
+    if args.child:
+        print(json.dumps(run_scenario(json.loads(args.child), args.home)))
+        return
+
+    results = run_all(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        sys.exit(1 if compare(args.compare, results, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark the plugin startup time, ie. the time it takes to register the grammar & help of all commands.
+
+Every run happens in a fresh interpreter, so nothing is served from the module cache.
+The "lazy" mode is the plugin as shipped, the "eager" mode also imports every command
+implementation module at startup, which is how commands were loaded before.
+
+Usage:
+    python testing/bench_startup.py [--runs 10]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in a subprocess, prints a JSON summary
+BENCH_SCRIPT = """
+import os
+import sys
+import json
+import time
+import importlib
+
+start = time.perf_counter()
+from openad_plugin_ds.main import OpenADPlugin
+OpenADPlugin()
+
+if {eager}:
+    commands_dir = os.path.join(os.path.dirname(sys.modules["openad_plugin_ds.main"].__file__), "commands")
+    for name in sorted(os.listdir(commands_dir)):
+        if os.path.exists(os.path.join(commands_dir, name, name + ".py")):
+            importlib.import_module(f"openad_plugin_ds.commands.{{name}}.{{name}}")
+
+duration = time.perf_counter() - start
+print(json.dumps({{
+    "duration": duration,
+    "modules": len(sys.modules),
+    "deepsearch_loaded": "deepsearch" in sys.modules,
+    "pandas_loaded": "pandas" in sys.modules,
+}}))
+"""
+
+
+def run_once(eager: bool) -> dict:
+    """Measure a single startup in a fresh interpreter"""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")]))}
+    result = subprocess.run(
+        [sys.executable, "-c", BENCH_SCRIPT.format(eager=eager)],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="Number of runs per mode")
+    args = parser.parse_args()
+
+    summary = {}
+    for mode, eager in [("lazy", False), ("eager", True)]:
+        runs = [run_once(eager) for _ in range(args.runs)]
+        summary[mode] = runs[-1] | {"median": statistics.median(run["duration"] for run in runs)}
+        print(
+            f"{mode:<6} median {summary[mode]['median'] * 1000:8.1f} ms"
+            f" - {summary[mode]['modules']} modules"
+            f" - deepsearch loaded: {summary[mode]['deepsearch_loaded']}"
+            f" - pandas loaded: {summary[mode]['pandas_loaded']}"
+        )
+
+    gain = summary["eager"]["median"] - summary["lazy"]["median"]
+    print(f"Lazy loading saves {gain * 1000:.1f} ms ({gain / summary['eager']['median']:.0%}) at startup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,497 @@
+"""
+Local stand-in for the Deep Search server, to run and benchmark the plugin offline.
+
+Implements the endpoints used by the plugin:
+- HEAD/GET /                                            Host validation at login
+- POST /api/cps/user/v1/user/token                      Login, any username & API key are accepted
+- GET  /api/cps/public/v1/elastic/indices/<type>/<domain>   api.elastic.list()
+- POST /api/orchestrator/api/v1/query/run               api.queries.run(): ElasticQuery & KnowledgeLookup tasks,
+                                                        which covers paginated queries and query_chemistry()
+- GET  /_mock/stats, POST /_mock/reset                   Number of requests served, per endpoint
+
+Responses are served from the fixtures in testing/fixtures:
+- collections.json              The collections listed by api.elastic.list(), repeated up to --collections
+- elastic/<index_key>.json      The records of a collection, repeated up to --records records.
+                                The search query matches every record, except for the range & exists filters
+                                of a bool query, so queries sliced by publication date return disjoint results.
+- chemistry/compounds.json      The molecules returned by chemistry queries, repeated up to --records results
+- chemistry/documents.json      The patents returned by chemistry queries, repeated up to --records results
+- recorded/<key>.json           Responses recorded from a live server with --record, replayed as is
+
+Usage:
+    python testing/mock_ds_server.py [--port 8700] [--latency 0.05] [--error-rate 0.01] [--max-page-size 50]
+
+Then point the plugin at it, with any username & API key:
+    export OPENAD_DS_HOST=http://localhost:8700
+    ds login
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import base64
+import bisect
+import random
+import fnmatch
+import hashlib
+import argparse
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+ELASTIC_LIST_PATH = re.compile(r"^/api/cps/public/v1/elastic/indices/(?P<index_type>[^/]+)/(?P<index_domain>[^/]+)$")
+TOKEN_PATH = "/api/cps/user/v1/user/token"
+QUERY_PATH = "/api/orchestrator/api/v1/query/run"
+
+
+class MockConfig:
+    """Behaviour of the mock server, set from the command line"""
+
+    def __init__(self, **kwargs):
+        self.latency = kwargs.get("latency", 0.0)
+        self.jitter = kwargs.get("jitter", 0.0)
+        self.error_rate = kwargs.get("error_rate", 0.0)
+        self.error_status = kwargs.get("error_status", 503)
+        self.retry_after = kwargs.get("retry_after")
+        self.max_page_size = kwargs.get("max_page_size", 0)
+        self.records = kwargs.get("records", 0)
+        self.collections = kwargs.get("collections", 0)
+        self.token_ttl = kwargs.get("token_ttl", 3600)
+        self.record = kwargs.get("record")
+        self.fixtures_dir = kwargs.get("fixtures_dir", FIXTURES_DIR)
+
+
+class Fixtures:
+    """Fixture payloads, loaded once"""
+
+    def __init__(self, fixtures_dir: str, collection_count: int = 0):
+        self.dir = fixtures_dir
+        self.collections = _load_json(os.path.join(fixtures_dir, "collections.json"), [])
+        if collection_count and self.collections:
+            self.collections = [_copy_collection(self.collections, i) for i in range(collection_count)]
+        self.compounds = _load_json(os.path.join(fixtures_dir, "chemistry", "compounds.json"), [])
+        self.documents = _load_json(os.path.join(fixtures_dir, "chemistry", "documents.json"), [])
+        self._records = {}
+
+    def records(self, index_key: str) -> list:
+        """The records of a collection, or of the collection it was copied from, or else of the first fixture"""
+        if index_key not in self._records:
+            path = os.path.join(self.dir, "elastic", f"{re.sub(r'-[0-9]+$', '', index_key)}.json")
+            if not os.path.isfile(path):
+                files = sorted(os.listdir(os.path.join(self.dir, "elastic")))
+                path = os.path.join(self.dir, "elastic", files[0]) if files else None
+            self._records[index_key] = _load_json(path, []) if path else []
+        return self._records[index_key]
+
+    def recorded_path(self, key: str) -> str:
+        return os.path.join(self.dir, "recorded", f"{key}.json")
+
+
+class MockState:
+    """Request counters, shared between the request threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.errors = 0
+
+    def count(self, endpoint: str):
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    def count_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "requests": dict(self.requests),
+                "total": sum(self.requests.values()),
+                "errors_injected": self.errors,
+            }
+
+    def reset(self):
+        with self.lock:
+            self.requests = {}
+            self.errors = 0
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Request handler, the server holds the config, fixtures & state"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # Routes
+    # ------
+
+    def do_HEAD(self):
+        self._send_json(200, None)
+
+    def do_GET(self):
+        path = urllib.parse.urlparse(self.path).path
+        if path == "/_mock/stats":
+            return self._send_json(200, self.server.state.stats())
+        match = ELASTIC_LIST_PATH.match(path)
+        if match:
+            return self._api("elastic.list", lambda: self._elastic_list(match["index_domain"]))
+        return self._send_json(200, {"status": "ok"}) if path in ["", "/"] else self._send_json(404, {})
+
+    def do_POST(self):
+        path = urllib.parse.urlparse(self.path).path
+        body = self._read_body()
+        if path == "/_mock/reset":
+            self.server.state.reset()
+            return self._send_json(200, {})
+        if path == TOKEN_PATH and self.server.config.record:
+            return self._record(None, body)
+        if path == TOKEN_PATH:
+            return self._send_json(200, {"access_token": _make_token(self.server.config.token_ttl)})
+        if path == QUERY_PATH:
+            return self._api("queries.run", lambda: self._query_run(json.loads(body or b"{}")), body)
+        return self._send_json(404, {})
+
+    # API endpoints
+    # -------------
+
+    def _api(self, endpoint: str, handler, body: bytes = b""):
+        """Serve an API endpoint: simulate latency & errors, then replay a recorded response or build one"""
+        config = self.server.config
+        self.server.state.count(endpoint)
+        time.sleep(max(0.0, config.latency + random.uniform(-config.jitter, config.jitter)))
+
+        if config.error_rate and random.random() < config.error_rate:
+            self.server.state.count_error()
+            headers = {"Retry-After": str(config.retry_after)} if config.retry_after is not None else {}
+            return self._send_json(config.error_status, {"message": "Injected error"}, headers)
+
+        key = hashlib.sha256(f"{self.command} {urllib.parse.urlparse(self.path).path} ".encode() + body).hexdigest()
+        if config.record:
+            return self._record(key, body)
+        recorded = _load_json(self.server.fixtures.recorded_path(key), None)
+        if recorded is not None:
+            return self._send_json(200, recorded)
+        return self._send_json(200, handler())
+
+    def _elastic_list(self, index_domain: str) -> list:
+        collections = self.server.fixtures.collections
+        if index_domain != "all":
+            collections = [c for c in collections if index_domain in c["metadata"]["domain"]]
+        return collections
+
+    def _query_run(self, payload: dict) -> dict:
+        """Run the tasks of a query flow, and map their outputs to the query outputs"""
+        template = payload["query"]["template"]
+        task_outputs = {}
+        next_pages = {}
+        for task in template["tasks"]:
+            if task["kind"] == "ElasticQuery":
+                task_outputs[task["id"]], next_page = self._elastic_query(task)
+                if next_page:
+                    next_pages[task["id"]] = next_page
+            elif task["kind"] == "KnowledgeLookup":
+                task_outputs[task["id"]] = self._knowledge_lookup(task)
+            else:
+                task_outputs[task["id"]] = {}
+
+        outputs = {
+            name: task_outputs.get(output["task_id"], {}).get(output["output_id"])
+            for name, output in template.get("outputs", {}).items()
+        }
+        timings = {"overall": 0.0, "tasks": {task_id: {"overall": 0.0, "details": None} for task_id in task_outputs}}
+        return {"result": {"outputs": outputs, "next_pages": next_pages, "timings": timings}}
+
+    def _elastic_query(self, task: dict):
+        """Page through the records of a collection, sorted by position, with search_after as cursor"""
+        params = task["parameters"]
+        records = self.server.fixtures.records(task["@resource"]["index"])
+        positions = range(_scaled_count(len(records), self.server.config.records))
+
+        # Only keep the positions of the records matching the filters of the query
+        elastic_query = params.get("elastic_query") or {}
+        if "bool" in elastic_query:
+            matching = [_matches(record["_source"], elastic_query["bool"]) for record in records]
+            positions = [position for position in positions if matching[position % len(records)]]
+            records_matching = [record for record, match in zip(records, matching) if match]
+        else:
+            records_matching = records
+        total = len(positions)
+
+        limit = params.get("limit", 20)
+        if self.server.config.max_page_size:
+            limit = min(limit, self.server.config.max_page_size)
+        start = bisect.bisect_right(positions, params["search_after"][0]) if params.get("search_after") else 0
+        end = min(total, start + limit)
+
+        highlight = params.get("highlight")
+        items = []
+        for position in positions[start:end]:
+            record = records[position % len(records)]
+            hit = {"_id": f"{record['_id']}-{position}", "_source": _project(record["_source"], params.get("source"))}
+            if highlight:
+                hit["highlight"] = _highlight(record["_source"], highlight)
+            hit["sort"] = [position]
+            items.append(hit)
+
+        aggregations = None
+        if params.get("aggregations"):
+            aggregations = _aggregate(records_matching, params["aggregations"], total)
+
+        next_page = {"search_after": [positions[end - 1]]} if items and end < total else None
+        return {"items": items, "total": total, "aggregations": aggregations}, next_page
+
+    def _knowledge_lookup(self, task: dict) -> dict:
+        """Return a page of molecules or patents, depending on the type of the outer query"""
+        params = task["parameters"]
+        fixtures = self.server.fixtures
+        rows = fixtures.documents if params["function"][0].startswith("documents") else fixtures.compounds
+        total = _scaled_count(len(rows), self.server.config.records)
+        offset, limit = params.get("offset", 0), params.get("limit", 10)
+        result = []
+        for position in range(offset, min(total, offset + limit)):
+            row = dict(rows[position % len(rows)])
+            row["id"] = position
+            row["persistent_id"] = f"{row['persistent_id']}-{position}"
+            result.append(row)
+        return {"result": result}
+
+    def _record(self, key: str, body: bytes):
+        """Forward the request to the live server, and save the response as fixture unless no key is given"""
+        import requests  # pylint: disable=import-outside-toplevel
+
+        headers = {k: v for k, v in self.headers.items() if k.lower() in ["authorization", "x-authorization"]}
+        headers["Content-Type"] = "application/json"
+        url = self.server.config.record.rstrip("/") + self.path
+        response = requests.request(self.command, url, data=body or None, headers=headers, timeout=300)
+        if response.ok and key:
+            with open(self.server.fixtures.recorded_path(key), "w", encoding="utf-8") as f:
+                json.dump(response.json(), f)
+        self._send_raw(response.status_code, response.content)
+
+    # Helpers
+    # -------
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, data, headers: dict = None):
+        self._send_raw(status, b"" if data is None else json.dumps(data).encode("utf-8"), headers)
+
+    def _send_raw(self, status: int, content: bytes, headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(content)
+
+
+class MockServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the mock configuration, fixtures & request counters"""
+
+    daemon_threads = True
+
+    def __init__(self, address, config: MockConfig, verbose: bool = False):
+        super().__init__(address, MockHandler)
+        self.config = config
+        self.fixtures = Fixtures(config.fixtures_dir, config.collections)
+        self.state = MockState()
+        self.verbose = verbose
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+
+def start_mock_server(port: int = 0, verbose: bool = False, **kwargs) -> MockServer:
+    """
+    Start the mock server in a background thread, and return it.
+    Use port 0 to pick a free port, the server's url is available as server.url
+    Stop the server with server.shutdown()
+
+    Keyword arguments are passed on to MockConfig.
+    """
+    server = MockServer(("127.0.0.1", port), MockConfig(**kwargs), verbose=verbose)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _load_json(path: str, default):
+    if not path or not os.path.isfile(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _copy_collection(collections: list, i: int) -> dict:
+    """The i-th collection, fixture collections are repeated with a numbered name & index key"""
+    collection = json.loads(json.dumps(collections[i % len(collections)]))
+    if i >= len(collections):
+        collection["name"] = f"{collection['name']} {i}"
+        collection["source"]["index_key"] = f"{collection['source']['index_key']}-{i}"
+    return collection
+
+
+def _make_token(ttl: int) -> str:
+    """Unsigned JWT token, the plugin only reads its expiry time"""
+
+    def _encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+
+    return ".".join([_encode({"alg": "none", "typ": "JWT"}), _encode({"exp": int(time.time()) + ttl}), ""])
+
+
+def _scaled_count(fixture_count: int, records: int) -> int:
+    """Number of results: the fixture records, or repeated up to the requested number of records"""
+    if not fixture_count:
+        return 0
+    return records or fixture_count
+
+
+def _project(source: dict, paths: list) -> dict:
+    """Only keep the requested paths of a record, paths may contain wildcards"""
+    if paths is None:
+        return source
+    if not paths:
+        return {}
+    result = {}
+    for key, value in source.items():
+        sub_paths = []
+        for path in paths:
+            head, _, tail = path.partition(".")
+            if fnmatch.fnmatch(key, head):
+                if not tail:
+                    result[key] = value
+                    break
+                sub_paths.append(tail)
+        else:
+            if sub_paths and isinstance(value, dict):
+                projected = _project(value, sub_paths)
+                if projected:
+                    result[key] = projected
+            elif sub_paths and isinstance(value, list):
+                result[key] = [_project(item, sub_paths) if isinstance(item, dict) else item for item in value]
+    return result
+
+
+def _matches(source: dict, bool_query: dict) -> bool:
+    """Apply the range & exists filters of a bool query to a record, dates are compared up to the bound's length"""
+    values = dict(_flatten(source))
+    for clause in bool_query.get("filter", []):
+        if "exists" in clause and clause["exists"]["field"] not in values:
+            return False
+        for field, bounds in clause.get("range", {}).items():
+            value = str(values.get(field, ""))
+            if not value:
+                return False
+            if "gte" in bounds and value[: len(bounds["gte"])] < bounds["gte"]:
+                return False
+            if "lt" in bounds and value[: len(bounds["lt"])] >= bounds["lt"]:
+                return False
+    for clause in bool_query.get("must_not", []):
+        if "exists" in clause and clause["exists"]["field"] in values:
+            return False
+    return True
+
+
+def _highlight(source: dict, highlight: dict) -> dict:
+    """Highlight the first word of the first string field matching the requested fields"""
+    pre, post = (highlight.get("pre_tags") or ["<em>"])[0], (highlight.get("post_tags") or ["</em>"])[0]
+    for field in highlight.get("fields", {}):
+        for path, value in _flatten(source):
+            if isinstance(value, str) and fnmatch.fnmatch(path, field):
+                first, _, rest = value.partition(" ")
+                return {path: [f"{pre}{first}{post} {rest}"]}
+    return {}
+
+
+def _flatten(data, prefix: str = ""):
+    """Yield (path, value) for every leaf of a record"""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from _flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(data, list):
+        for item in data:
+            yield from _flatten(item, prefix)
+    else:
+        yield prefix, data
+
+
+def _aggregate(records: list, aggregations: dict, total: int) -> dict:
+    """Compute date histogram & terms aggregations over the fixture records, scaled to the number of results"""
+    scale = total / len(records) if records else 0
+    result = {}
+    for name, aggregation in aggregations.items():
+        kind, options = next(iter(aggregation.items()))
+        counts = {}
+        for record in records:
+            values = [value for path, value in _flatten(record["_source"]) if path == options["field"]]
+            for value in values:
+                if kind == "date_histogram":
+                    value = _date_key(str(value), options.get("calendar_interval", "year"))
+                counts[value] = counts.get(value, 0) + 1
+
+        if kind == "date_histogram":
+            buckets = [
+                {"key_as_string": key, "doc_count": round(count * scale)} for key, count in sorted(counts.items())
+            ]
+        else:
+            top = sorted(counts.items(), key=lambda item: -item[1])[: options.get("size", 10)]
+            buckets = [{"key": key, "doc_count": round(count * scale)} for key, count in top]
+        result[name] = {"buckets": buckets}
+    return result
+
+
+def _date_key(date: str, interval: str) -> str:
+    """Bucket key of an ISO date for a calendar interval"""
+    if interval == "year":
+        return date[:4]
+    if interval == "quarter":
+        return f"{date[:4]}-{(int(date[5:7]) - 1) // 3 * 3 + 1:02d}"
+    if interval == "month":
+        return date[:7]
+    return date[:10]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8700, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every API response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random variation of the latency, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of API requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of the failed requests")
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After header of the failed requests")
+    parser.add_argument("--max-page-size", type=int, default=0, help="Maximum number of records per page, 0 for none")
+    parser.add_argument("--records", type=int, default=0, help="Number of results per query, 0 for the fixtures only")
+    parser.add_argument("--collections", type=int, default=0, help="Number of collections, 0 for the fixtures only")
+    parser.add_argument("--token-ttl", type=int, default=3600, help="Seconds before the login token expires")
+    parser.add_argument("--record", metavar="HOST", help="Forward requests to a live server & record its responses")
+    parser.add_argument("--fixtures-dir", default=FIXTURES_DIR, help="Directory holding the fixtures")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    config = MockConfig(**{k: v for k, v in vars(args).items() if k not in ["port", "verbose"]})
+    server = MockServer(("127.0.0.1", args.port), config, verbose=args.verbose)
+    print(f"Mock Deep Search server running at {server.url}", file=sys.stderr)
+    print(f"Point the plugin at it with: export OPENAD_DS_HOST={server.url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()